@@ -0,0 +1,238 @@
+'''
+Benchmark of the heuristics on the instances of the data folder
+(runtime and quality of the solutions), and comparison of two benchmarks.
+
+Usage:
+  python -m src.scheduling.benchmark run -o results.json [-i jsp1 jsp10] [-H greedy first] [-r 5] [-s 0]
+  python -m src.scheduling.benchmark compare old.json new.json [--time-tolerance 0.2]
+
+@author: Vassilissa Lehoux
+'''
+from typing import Callable, Dict, List, Tuple
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:
+    # Windows : le temps cpu des processus fils n'est pas disponible
+    resource = None
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.solution import Solution
+from src.scheduling.optim.constructive import Greedy, NonDeterminist
+from src.scheduling.optim.local_search import FirstNeighborLocalSearch, BestNeighborLocalSearch
+from src.scheduling.optim.multistart import MultiStart
+from src.scheduling.optim.neighborhoods import MyNeighborhood1, MyNeighborhood2
+
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data")
+
+# Heuristiques comparées : fonction (instance, seed) -> solution, et déterminisme
+HEURISTICS: Dict[str, Tuple[Callable[[Instance, int], Solution], bool]] = {
+    'greedy': (lambda inst, seed: Greedy().run(inst), True),
+    'nondeterminist': (lambda inst, seed: NonDeterminist().run(inst, {'seed': seed}), False),
+    'first': (lambda inst, seed: FirstNeighborLocalSearch().run(inst, NonDeterminist, MyNeighborhood1,
+                                                                {'seed': seed}), False),
+    'best': (lambda inst, seed: BestNeighborLocalSearch().run(inst, NonDeterminist,
+                                                              [MyNeighborhood1, MyNeighborhood2],
+                                                              {'seed': seed}), False),
+    'multistart': (lambda inst, seed: MultiStart({'runs': 10}).run(inst, {'seed': seed}), False),
+}
+
+# Heuristiques qui travaillent dans des processus fils : leur temps cpu est celui du processus courant
+# et des processus fils terminés (None sans le module resource), et leur mémoire n'est pas mesurée
+# (tracemalloc ne voit que les allocations du processus courant)
+CHILD_PROCESS_HEURISTICS = {'multistart'}
+
+FORMAT_VERSION = 1
+
+
+def instance_names(data_folder: str=DATA_FOLDER) -> List[str]:
+    '''
+    Returns the names of the instances of the data folder, in natural order (jsp2 before jsp10)
+    '''
+    names = [name for name in os.listdir(data_folder) if os.path.isdir(os.path.join(data_folder, name))]
+    return sorted(names, key=lambda name: (len(name), name))
+
+
+def _cpu_time(children: bool=False) -> float:
+    '''
+    Returns the cpu time of the current process, plus the one of its terminated child processes
+    if children (None if it is not available)
+    '''
+    if not children:
+        return time.process_time()
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + usage.ru_utime + usage.ru_stime
+
+
+def measure(run: Callable[[Instance, int], Solution], inst: Instance, seed: int, memory: bool=True,
+            children: bool=False) -> Dict:
+    '''
+    Runs the heuristic and returns its measures. The peak memory (of the Python allocations)
+    is measured in a second run with the same seed, as tracemalloc slows the run down.
+    @param children: the heuristic runs in child processes: its cpu time includes theirs
+      and its peak memory is not measured (None)
+    '''
+    wall_start, cpu_start = time.perf_counter(), _cpu_time(children)
+    sol = run(inst, seed)
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = None if cpu_start is None else _cpu_time(children) - cpu_start
+    record = {
+        'seed': seed,
+        'wall_time': wall_time,
+        'cpu_time': cpu_time,
+        'peak_memory': None,
+        'cmax': sol.cmax,
+        'sum_ci': sol.sum_ci,
+        'energy': sol.total_energy_consumption,
+        'objective': sol.objective,
+        'feasible': sol.is_feasible,
+    }
+    if memory and not children:
+        tracemalloc.start()
+        run(inst, seed)
+        record['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return record
+
+
+def run_benchmark(instances: List[str], heuristics: List[str], repeats: int=5, seed: int=0,
+                  memory: bool=True, data_folder: str=DATA_FOLDER, log=None) -> Dict:
+    '''
+    Runs each heuristic on each instance (repeats times with the seeds seed, seed + 1... for the
+    non deterministic heuristics, once for the deterministic ones) and returns the results.
+    '''
+    records = []
+    for name in instances:
+        inst = Instance.from_file(os.path.join(data_folder, name))
+        for heuristic in heuristics:
+            run, deterministic = HEURISTICS[heuristic]
+            for repeat in range(1 if deterministic else repeats):
+                record = {'instance': name, 'heuristic': heuristic, 'repeat': repeat}
+                record.update(measure(run, inst, seed + repeat, memory, heuristic in CHILD_PROCESS_HEURISTICS))
+                records.append(record)
+                if log is not None:
+                    print(f"{name} {heuristic} #{repeat}: objective={record['objective']} "
+                          f"time={record['wall_time']:.3f}s", file=log)
+    return {
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeats': repeats,
+        'seed': seed,
+        'records': records,
+    }
+
+
+def summarize(results: Dict) -> Dict[Tuple[str, str], Dict]:
+    '''
+    Aggregates the runs of each (instance, heuristic): best objective (the best run is kept),
+    number of feasible runs and median wall and cpu times (None if the cpu time was not measured).
+    '''
+    groups = {}
+    for record in results['records']:
+        groups.setdefault((record['instance'], record['heuristic']), []).append(record)
+    summary = {}
+    for key, records in groups.items():
+        summary[key] = {
+            'runs': len(records),
+            'feasible': sum(1 for r in records if r['feasible']),
+            'best_objective': min(r['objective'] for r in records),
+            'wall_time': statistics.median(r['wall_time'] for r in records),
+            'cpu_time': None if any(r['cpu_time'] is None for r in records)
+            else statistics.median(r['cpu_time'] for r in records),
+        }
+    return summary
+
+
+def compare(old: Dict, new: Dict, time_tolerance: float=0.2, min_time: float=0.01) -> List[str]:
+    '''
+    Compares two benchmark results and returns the regressions of new with respect to old:
+    a worse best objective, fewer feasible runs, or a median cpu time increased
+    by more than time_tolerance (relative), for the (instance, heuristic) pairs present in both.
+    Times lower than min_time seconds, or not measured, are not compared (too noisy).
+    '''
+    regressions = []
+    old_summary, new_summary = summarize(old), summarize(new)
+    for key in sorted(old_summary.keys() & new_summary.keys()):
+        before, after = old_summary[key], new_summary[key]
+        label = f"{key[0]} {key[1]}"
+        if after['best_objective'] > before['best_objective']:
+            regressions.append(f"{label}: objective {before['best_objective']} -> {after['best_objective']}")
+        if after['feasible'] * before['runs'] < before['feasible'] * after['runs']:
+            regressions.append(f"{label}: feasible runs {before['feasible']}/{before['runs']} -> "
+                               f"{after['feasible']}/{after['runs']}")
+        if before['cpu_time'] is not None and after['cpu_time'] is not None \
+                and max(before['cpu_time'], after['cpu_time']) >= min_time \
+                and after['cpu_time'] > before['cpu_time'] * (1 + time_tolerance):
+            regressions.append(f"{label}: cpu time {before['cpu_time']:.4f}s -> {after['cpu_time']:.4f}s")
+    return regressions
+
+
+def _print_summary(results: Dict, out=sys.stdout):
+    print(f"{'instance':>10} {'heuristic':>15} {'runs':>5} {'feasible':>8} {'best':>8} "
+          f"{'wall (s)':>10} {'cpu (s)':>10}", file=out)
+    summary = summarize(results)
+    for (name, heuristic), s in summary.items():
+        cpu_time = '-' if s['cpu_time'] is None else f"{s['cpu_time']:.4f}"
+        print(f"{name:>10} {heuristic:>15} {s['runs']:>5} {s['feasible']:>8} {s['best_objective']:>8} "
+              f"{s['wall_time']:>10.4f} {cpu_time:>10}", file=out)
+    for heuristic in sorted({heuristic for _, heuristic in summary} & CHILD_PROCESS_HEURISTICS):
+        print(f"{heuristic}: runs in child processes, the cpu time includes them "
+              f"and the peak memory is not measured", file=out)
+
+
+def main(argv: List[str]=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark of the heuristics")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="runs the benchmark")
+    run_parser.add_argument('-i', '--instances', nargs='+', help="instance names (default: all of data)")
+    run_parser.add_argument('-H', '--heuristics', nargs='+', choices=list(HEURISTICS), default=list(HEURISTICS))
+    run_parser.add_argument('-r', '--repeats', type=int, default=5,
+                            help="runs of the non deterministic heuristics")
+    run_parser.add_argument('-s', '--seed', type=int, default=0)
+    run_parser.add_argument('--no-memory', action='store_true', help="do not measure the peak memory")
+    run_parser.add_argument('--data', default=DATA_FOLDER, help="folder of the instances")
+    run_parser.add_argument('-o', '--output', required=True, help="json file of the results")
+
+    compare_parser = commands.add_parser('compare', help="compares two results files")
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--time-tolerance', type=float, default=0.2,
+                                help="relative increase of the cpu time considered as a regression")
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        instances = args.instances or instance_names(args.data)
+        results = run_benchmark(instances, args.heuristics, args.repeats, args.seed,
+                                not args.no_memory, args.data, log=sys.stderr)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+        _print_summary(results)
+        return 0
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    regressions = compare(old, new, args.time_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("No regression")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+'''
+Feasibility checker of the schedule stored in an instance (the schedule of its active solution).
+All the constraints are checked with NumPy operations on the schedule state of the operations
+(see ScheduleState) and on the on/off cycles of the machines: the operations are sorted once
+per machine, and each operation is matched to the cycle of its machine by a binary search.
+
+@author: Vassilissa Lehoux
+'''
+from typing import Dict, List, Sequence
+import bisect
+
+import numpy as np
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.instance.arrays import NOT_ELIGIBLE
+from src.scheduling.instance.operation import Operation
+from src.scheduling.instance.machine import Machine
+
+
+# Types de violations, et leur ampleur :
+# contraintes d'une opération (sujet : (job id, operation id))
+UNSCHEDULED = 'unscheduled'      # opération non planifiée : 1
+ELIGIBILITY = 'eligibility'      # machine non éligible : 1
+PRECEDENCE = 'precedence'        # début avant la fin du prédécesseur : fin du prédécesseur - début
+OVERLAP = 'overlap'              # chevauchement avec une opération de la machine : durée du chevauchement
+MACHINE_OFF = 'machine_off'      # début hors de tout cycle de la machine (arrêtée) : durée de l'opération
+SET_UP = 'set_up'                # début pendant le set-up de la machine : fin du set-up - début
+TEAR_DOWN = 'tear_down'          # fin après le début du tear-down : fin + tear-down - arrêt
+# contraintes d'une machine (sujet : machine id)
+RUNNING = 'running'              # machine pas arrêtée à la fin du planning : 1
+NEGATIVE_START = 'negative_start'  # démarrage avant 0 : - démarrage
+CYCLE_OVERLAP = 'cycle_overlap'  # démarrage avant l'arrêt précédent : arrêt précédent - démarrage
+END_TIME = 'end_time'            # arrêt après la date de fin de la machine : arrêt - date de fin
+
+OPERATION_KINDS = (UNSCHEDULED, ELIGIBILITY, PRECEDENCE, OVERLAP, MACHINE_OFF, SET_UP, TEAR_DOWN)
+MACHINE_KINDS = (RUNNING, NEGATIVE_START, CYCLE_OVERLAP, END_TIME)
+
+# Violations comptées dans le total d'une machine (celles des opérations portent sur leur machine)
+# et dans le total d'un job
+MACHINE_PENALTY_KINDS = (ELIGIBILITY, OVERLAP, MACHINE_OFF, SET_UP, TEAR_DOWN) + MACHINE_KINDS
+JOB_PENALTY_KINDS = (UNSCHEDULED, PRECEDENCE)
+
+# Clés (machine, date) des tris : les dates sont ramenées dans [0, _TIME_RANGE)
+_TIME_RANGE = 1 << 40
+
+
+class Violation(object):
+    '''
+    Violated constraint: its kind (see OPERATION_KINDS and MACHINE_KINDS), the operation
+    ((job id, operation id)) or the machine (machine id) concerned, and its magnitude (> 0).
+    '''
+    __slots__ = ('kind', 'subject', 'magnitude')
+
+    def __init__(self, kind: str, subject, magnitude: int):
+        self.kind = kind
+        self.subject = subject
+        self.magnitude = magnitude
+
+    def __eq__(self, other):
+        return isinstance(other, Violation) and \
+            (self.kind, self.subject, self.magnitude) == (other.kind, other.subject, other.magnitude)
+
+    def __hash__(self):
+        return hash((self.kind, self.subject, self.magnitude))
+
+    def __str__(self):
+        return f"{self.kind} {self.subject}: {self.magnitude}"
+
+    def __repr__(self):
+        return str(self)
+
+
+def totals(violations: List[Violation]) -> Dict[str, int]:
+    '''
+    Returns the sum of the magnitudes of the violations of each kind
+    '''
+    result = {}
+    for violation in violations:
+        result[violation.kind] = result.get(violation.kind, 0) + violation.magnitude
+    return result
+
+
+def _predecessor_rows(instance: Instance) -> np.ndarray:
+    '''
+    Returns the row of the predecessor of each operation in its job, -1 for the first operations
+    '''
+    arrays = instance.as_arrays()
+    predecessors = np.full(instance.nb_operations, -1, dtype=np.int64)
+    predecessors[arrays.job_ops[1:]] = arrays.job_ops[:-1]
+    firsts = arrays.job_ptr[:-1][arrays.job_ptr[:-1] < arrays.job_ptr[1:]]
+    predecessors[arrays.job_ops[firsts]] = -1
+    return predecessors
+
+
+def _keys(columns: np.ndarray, times: np.ndarray) -> np.ndarray:
+    return columns * _TIME_RANGE + np.clip(times, 0, _TIME_RANGE - 1)
+
+
+def check(instance: Instance) -> List[Violation]:
+    '''
+    Returns the violated constraints of the schedule of the instance, empty if it is feasible:
+    the operations of a job start after the end of the previous one, on an eligible machine,
+    without overlapping the other operations of the machine, during an on/off cycle
+    of the machine after its set-up and before its tear-down. The machines are stopped
+    at the end of the planning, and their cycles are in [0, end_time] and do not overlap.
+    '''
+    arrays = instance.as_arrays()
+    state = instance.schedule_state
+    machines = instance.machines
+    violations: List[Violation] = []
+
+    def operation_violations(kind: str, rows: np.ndarray, magnitudes: np.ndarray):
+        # Dans l'ordre des opérations de l'instance
+        order = np.argsort(rows, kind='stable')
+        for row, magnitude in zip(rows[order].tolist(), magnitudes[order].tolist()):
+            violations.append(Violation(kind, (int(arrays.op_job[row]), int(arrays.op_id[row])), magnitude))
+
+    # Opérations planifiées et colonne de leur machine
+    assigned = np.array(state.stamp, dtype=np.int64) == state.generation
+    machine = np.where(assigned, np.array(state.machine, dtype=np.int64), -1)
+    start = np.array(state.start, dtype=np.int64)
+    end = start + np.array(state.duration, dtype=np.int64)
+    # Table machine id -> colonne, -1 pour un identifiant inconnu
+    machine_ids = arrays.machine_ids.astype(np.int64)
+    column_of = np.full(max(int(machine_ids.max(initial=0)), int(machine.max(initial=0))) + 2, -1, dtype=np.int64)
+    column_of[machine_ids] = np.arange(len(machine_ids))
+    columns = column_of[np.where(machine >= 0, machine, -1)]
+
+    rows = np.flatnonzero(~assigned)
+    operation_violations(UNSCHEDULED, rows, np.ones(len(rows), dtype=np.int64))
+    eligible = columns >= 0
+    eligible[eligible] = arrays.processing_time[np.flatnonzero(eligible), columns[eligible]] != NOT_ELIGIBLE
+    rows = np.flatnonzero(assigned & ~eligible)
+    operation_violations(ELIGIBILITY, rows, np.ones(len(rows), dtype=np.int64))
+
+    predecessors = _predecessor_rows(instance)
+    rows = np.flatnonzero(assigned & (predecessors >= 0))
+    previous = predecessors[rows]
+    late = assigned[previous] & (start[rows] < end[previous])
+    rows, previous = rows[late], previous[late]
+    operation_violations(PRECEDENCE, rows, end[previous] - start[rows])
+
+    # Opérations triées par (machine, début) : la fin maximale des opérations précédentes
+    # de la même machine est le maximum cumulé des clés (machine, fin)
+    placed = np.flatnonzero(columns >= 0)
+    placed = placed[np.lexsort((start[placed], columns[placed]))]
+    if len(placed) > 1:
+        end_keys = np.maximum.accumulate(_keys(columns[placed], end[placed]))
+        previous_end_keys = end_keys[:-1]
+        following = placed[1:]
+        same_machine = previous_end_keys >= columns[following] * _TIME_RANGE
+        previous_end = previous_end_keys - columns[following] * _TIME_RANGE
+        overlap = same_machine & (start[following] < previous_end)
+        operation_violations(OVERLAP, following[overlap], (previous_end - start[following])[overlap])
+
+    # Cycles de toutes les machines, dans l'ordre des colonnes
+    cycle_column, cycle_start, cycle_stop = [], [], []
+    for column, m in enumerate(machines):
+        start_times, stop_times = m.start_times, m.stop_times
+        if len(start_times) != len(stop_times):
+            violations.append(Violation(RUNNING, m.machine_id, 1))
+            # Un cycle non terminé ne sert qu'à rattacher ses opérations
+            stop_times = list(stop_times) + [_TIME_RANGE - 1] * (len(start_times) - len(stop_times))
+        if start_times and start_times[0] < 0:
+            violations.append(Violation(NEGATIVE_START, m.machine_id, -start_times[0]))
+        for i in range(1, len(start_times)):
+            if start_times[i] < stop_times[i - 1]:
+                violations.append(Violation(CYCLE_OVERLAP, m.machine_id, stop_times[i - 1] - start_times[i]))
+        if len(m.stop_times) and max(m.stop_times) > m.end_time:
+            violations.append(Violation(END_TIME, m.machine_id, max(m.stop_times) - m.end_time))
+        cycle_column.extend([column] * len(start_times))
+        cycle_start.extend(start_times)
+        cycle_stop.extend(stop_times)
+    cycle_column = np.array(cycle_column, dtype=np.int64)
+    cycle_start = np.array(cycle_start, dtype=np.int64)
+    cycle_stop = np.array(cycle_stop, dtype=np.int64)
+
+    # Cycle d'une opération : le premier cycle de sa machine qui s'arrête après son début,
+    # s'il a démarré avant ce début (sinon la machine est arrêtée quand l'opération commence)
+    if len(placed):
+        stop_keys = _keys(cycle_column, cycle_stop)
+        order = np.argsort(stop_keys, kind='stable')
+        found = np.searchsorted(stop_keys[order], _keys(columns[placed], start[placed]), side='right')
+        if len(order):
+            cycles = order[np.minimum(found, len(order) - 1)]
+            on = (found < len(order)) & (cycle_column[cycles] == columns[placed]) \
+                & (cycle_start[cycles] <= start[placed])
+        else:
+            cycles = np.zeros(len(placed), dtype=np.int64)
+            on = np.zeros(len(placed), dtype=bool)
+        operation_violations(MACHINE_OFF, placed[~on], (end - start)[placed[~on]])
+
+        rows, cycles = placed[on], cycles[on]
+        set_up_end = cycle_start[cycles] + arrays.set_up_time[columns[rows]]
+        early = start[rows] < set_up_end
+        operation_violations(SET_UP, rows[early], (set_up_end - start[rows])[early])
+        tear_down_start = cycle_stop[cycles] - arrays.tear_down_time[columns[rows]]
+        late = end[rows] > tear_down_start
+        operation_violations(TEAR_DOWN, rows[late], (end[rows] - tear_down_start)[late])
+
+    return violations
+
+
+def machine_penalty(machine: Machine, operations: Sequence[Operation], starts: Sequence[int],
+                    ends: Sequence[int], start_times: Sequence[int], stop_times: Sequence[int]) -> int:
+    '''
+    Returns the sum of the magnitudes of the violations of kinds MACHINE_PENALTY_KINDS of
+    the machine if it processed the operations between starts and ends, with the given
+    start and stop times (a schedule that may not be the one stored in the machine)
+    '''
+    total = 0
+    if stop_times and max(stop_times) > machine.end_time:
+        total += max(stop_times) - machine.end_time
+    if len(start_times) != len(stop_times):
+        total += 1
+        stop_times = list(stop_times) + [_TIME_RANGE - 1] * (len(start_times) - len(stop_times))
+    if start_times and start_times[0] < 0:
+        total -= start_times[0]
+    for i in range(1, len(start_times)):
+        if start_times[i] < stop_times[i - 1]:
+            total += stop_times[i - 1] - start_times[i]
+
+    # Cycles triés par date d'arrêt, comme dans check
+    cycles = sorted(range(len(stop_times)), key=lambda i: stop_times[i])
+    sorted_stops = [stop_times[i] for i in cycles]
+    previous_end = None
+    for i in sorted(range(len(operations)), key=lambda i: (starts[i], operations[i].index)):
+        op, start, end = operations[i], starts[i], ends[i]
+        if machine.machine_id not in op.machine_options:
+            total += 1
+        if previous_end is not None and start < previous_end:
+            total += previous_end - start
+        previous_end = end if previous_end is None else max(previous_end, end)
+        found = bisect.bisect_right(sorted_stops, start)
+        if found == len(sorted_stops) or start_times[cycles[found]] > start:
+            total += end - start
+            continue
+        cycle = cycles[found]
+        if start < start_times[cycle] + machine.set_up_time:
+            total += start_times[cycle] + machine.set_up_time - start
+        if end > stop_times[cycle] - machine.tear_down_time:
+            total += end - stop_times[cycle] + machine.tear_down_time
+    return total
+
+
+def job_penalty(assigned: Sequence[bool], starts: Sequence[int], ends: Sequence[int]) -> int:
+    '''
+    Returns the sum of the magnitudes of the violations of kinds JOB_PENALTY_KINDS of a job
+    whose operations (in precedence order) are assigned or not, between starts and ends
+    '''
+    total = 0
+    for i in range(len(assigned)):
+        if not assigned[i]:
+            total += 1
+        elif i > 0 and assigned[i - 1] and starts[i] < ends[i - 1]:
+            total += ends[i - 1] - starts[i]
+    return total
@@ -0,0 +1,104 @@
+'''
+Gantt chart exporters that do not need matplotlib: the planning of a solution
+is read once from its assignment and cycles and written as JSON or SVG.
+Solution.gantt remains the matplotlib version.
+
+@author: Vassilissa Lehoux
+'''
+from typing import Dict, List
+from xml.sax.saxutils import escape
+import json
+
+from src.scheduling.solution import Solution
+
+
+# Couleurs de la palette tab20 de matplotlib (les jobs utilisent les couleurs à partir de l'indice 2)
+TAB20 = ['#1f77b4', '#aec7e8', '#ff7f0e', '#ffbb78', '#2ca02c', '#98df8a', '#d62728', '#ff9896',
+         '#9467bd', '#c5b0d5', '#8c564b', '#c49c94', '#e377c2', '#f7b6d2', '#7f7f7f', '#c7c7c7',
+         '#bcbd22', '#dbdb8d', '#17becf', '#9edae5']
+
+
+def gantt_data(sol: Solution) -> Dict:
+    '''
+    Returns the planning of the solution as a dictionary that can be serialized in JSON:
+    for each machine, its operations (job, operation, start, end) in the order of
+    the machine and its on/off cycles (start, stop), with the set-up and tear-down times.
+    '''
+    instance = sol.inst
+    cycles = sol.cycles
+    # Opérations de chaque machine, dans l'ordre des dates de début
+    operations = {machine.machine_id: [] for machine in instance.machines}
+    for (job_id, operation_id), (machine_id, start) in sorted(sol.assignment.items(), key=lambda item: item[1][1]):
+        duration = instance.operation(job_id, operation_id).machine_options[machine_id][0]
+        operations[machine_id].append({'job': job_id, 'operation': operation_id, 'start': start,
+                                       'end': start + duration})
+    machines = []
+    for machine in instance.machines:
+        start_times, stop_times = cycles[machine.machine_id]
+        machines.append({'machine': machine.machine_id,
+                         'set_up_time': machine.set_up_time,
+                         'tear_down_time': machine.tear_down_time,
+                         'cycles': [list(cycle) for cycle in zip(start_times, stop_times)],
+                         'operations': operations[machine.machine_id]})
+    return {'instance': sol.inst.name, 'cmax': sol.cmax, 'sum_ci': sol.sum_ci,
+            'total_energy_consumption': sol.total_energy_consumption, 'objective': sol.objective,
+            'machines': machines}
+
+
+def to_json(sol: Solution, filepath: str):
+    '''
+    Writes the planning of the solution (see gantt_data) in a json file
+    '''
+    with open(filepath, 'w') as f:
+        json.dump(gantt_data(sol), f)
+
+
+def to_svg(sol: Solution, filepath: str, colors: List[str]=TAB20, scale: float=None):
+    '''
+    Writes the Gantt chart of the solution in a svg file, with the colors of Solution.gantt
+    (colors[0] for the set-ups, colors[1] for the tear-downs, colors[job id + 2] for the operations).
+    @param scale: width in pixels of a time unit, by default the chart is 1200 pixels wide
+    '''
+    data = gantt_data(sol)
+    machines = data['machines']
+    horizon = max([1] + [stop + machine['tear_down_time'] for machine in machines for _, stop in machine['cycles']]
+                  + [op['end'] for machine in machines for op in machine['operations']])
+    if scale is None:
+        scale = 1200 / horizon
+    # Marges pour les noms des machines et l'axe du temps
+    left, top, row = 50, 30, 40
+    width = left + horizon * scale + 10
+    height = top + row * len(machines) + 30
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height}" font-family="sans-serif">',
+             f'<text x="{width / 2:.0f}" y="20" text-anchor="middle" font-size="14">'
+             f'{escape(str(data["instance"]))} - Gantt Chart</text>']
+
+    def bar(start: float, length: float, y: float, color: str, label: str):
+        x = left + start * scale
+        w = length * scale
+        parts.append(f'<g><title>{label}</title><rect x="{x:.2f}" y="{y + 4}" width="{w:.2f}" height="{row - 8}" '
+                     f'fill="{color}" stroke="black" stroke-width="0.5"/>'
+                     f'<text x="{x + w / 2:.2f}" y="{y + row / 2}" font-size="8" text-anchor="middle" '
+                     f'dominant-baseline="middle" transform="rotate(-90 {x + w / 2:.2f} {y + row / 2})">'
+                     f'{label}</text></g>')
+
+    for index, machine in enumerate(machines):
+        y = top + index * row
+        parts.append(f'<text x="{left - 5}" y="{y + row / 2}" font-size="12" text-anchor="end" '
+                     f'dominant-baseline="middle">M{machine["machine"] + 1}</text>')
+        for start, stop in machine['cycles']:
+            bar(start, machine['set_up_time'], y, colors[0], "set up")
+            bar(stop, machine['tear_down_time'], y, colors[1], "tear down")
+        for op in machine['operations']:
+            bar(op['start'], op['end'] - op['start'], y, colors[(op['job'] + 2) % len(colors)],
+                f"O{op['operation']}_J{op['job']}")
+
+    axis = top + row * len(machines)
+    parts.append(f'<line x1="{left}" y1="{axis}" x2="{left + horizon * scale:.2f}" y2="{axis}" stroke="black"/>')
+    step = max(1, 10 ** (len(str(horizon)) - 1) // 2)
+    for t in range(0, horizon + 1, step):
+        parts.append(f'<text x="{left + t * scale:.2f}" y="{axis + 15}" font-size="10" text-anchor="middle">{t}</text>')
+    parts.append('</svg>')
+    with open(filepath, 'w') as f:
+        f.write('\n'.join(parts))
@@ -0,0 +1,129 @@
+'''
+Columnar (NumPy) view of an instance.
+Operations are indexed by their position in Instance.operations
+and machines by their position in Instance.machines.
+
+@author: Vassilissa Lehoux
+'''
+from typing import Dict
+
+import numpy as np
+
+
+# Valeur des matrices temps/énergie quand la machine ne peut pas traiter l'opération
+NOT_ELIGIBLE = -1
+
+
+class InstanceArrays(object):
+    '''
+    Dense arrays describing an instance:
+      - op_job, op_id, op_rank: job id, operation id and rank in the job of each operation
+      - job_ids, job_ptr, job_ops: job ids and CSR structure of the jobs, the operations
+        of the j-th job, in precedence order, are the rows job_ops[job_ptr[j]:job_ptr[j+1]]
+      - machine_ids: id of each machine column
+      - processing_time, energy: (nb_operations x nb_machines) matrices,
+        NOT_ELIGIBLE when the operation cannot be executed on the machine
+      - set_up_time, set_up_energy, tear_down_time, tear_down_energy,
+        min_consumption, end_time: one value per machine
+    Arrays are read-only: they are shared by all the users of the instance.
+    '''
+
+    FIELDS = ('op_job', 'op_id', 'op_rank', 'job_ids', 'job_ptr', 'job_ops', 'machine_ids',
+              'processing_time', 'energy', 'set_up_time', 'set_up_energy',
+              'tear_down_time', 'tear_down_energy', 'min_consumption', 'end_time')
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        '''
+        Constructor
+        @param arrays: one array per name of FIELDS
+        '''
+        for name in self.FIELDS:
+            array = arrays[name]
+            if array.flags.writeable:
+                array.setflags(write=False)
+            setattr(self, name, array)
+        self.machine_index: Dict[int, int] = {int(m): i for i, m in enumerate(self.machine_ids)}
+
+    @classmethod
+    def from_instance(cls, instance) -> 'InstanceArrays':
+        '''
+        Builds the arrays from the objects of the instance.
+        '''
+        operations = instance.operations
+        machines = instance.machines
+        machine_index = {m.machine_id: i for i, m in enumerate(machines)}
+        nb_ops = len(operations)
+
+        processing_time = np.full((nb_ops, len(machines)), NOT_ELIGIBLE, dtype=np.int32)
+        energy = np.full((nb_ops, len(machines)), NOT_ELIGIBLE, dtype=np.int32)
+        op_job = np.empty(nb_ops, dtype=np.int32)
+        op_id = np.empty(nb_ops, dtype=np.int32)
+        row_of = {}
+        for row, op in enumerate(operations):
+            row_of[id(op)] = row
+            op_job[row] = op.job_id
+            op_id[row] = op.operation_id
+            for machine_id, (duration, op_energy) in op.machine_options.items():
+                if machine_id not in machine_index:
+                    raise ValueError(f"L'opération {op.job_id}-{op.operation_id} référence "
+                                     f"la machine inconnue {machine_id}")
+                processing_time[row, machine_index[machine_id]] = duration
+                energy[row, machine_index[machine_id]] = op_energy
+
+        jobs = instance.jobs
+        op_rank = np.empty(nb_ops, dtype=np.int32)
+        job_ops = np.empty(nb_ops, dtype=np.int32)
+        job_ptr = np.zeros(len(jobs) + 1, dtype=np.int32)
+        for j, job in enumerate(jobs):
+            job_ptr[j + 1] = job_ptr[j] + job.operation_nb
+            for rank, op in enumerate(job.operations):
+                row = row_of[id(op)]
+                op_rank[row] = rank
+                job_ops[job_ptr[j] + rank] = row
+
+        def machine_column(attribute):
+            return np.array([getattr(m, attribute) for m in machines], dtype=np.int32)
+
+        return cls({
+            'op_job': op_job,
+            'op_id': op_id,
+            'op_rank': op_rank,
+            'job_ids': np.array([job.job_id for job in jobs], dtype=np.int32),
+            'job_ptr': job_ptr,
+            'job_ops': job_ops,
+            'machine_ids': machine_column('machine_id'),
+            'processing_time': processing_time,
+            'energy': energy,
+            'set_up_time': machine_column('set_up_time'),
+            'set_up_energy': machine_column('set_up_energy'),
+            'tear_down_time': machine_column('tear_down_time'),
+            'tear_down_energy': machine_column('tear_down_energy'),
+            'min_consumption': machine_column('min_consumption'),
+            'end_time': machine_column('end_time'),
+        })
+
+    @property
+    def nb_operations(self) -> int:
+        return self.op_job.shape[0]
+
+    @property
+    def nb_machines(self) -> int:
+        return self.machine_ids.shape[0]
+
+    @property
+    def nb_jobs(self) -> int:
+        return self.job_ids.shape[0]
+
+    @property
+    def eligible(self) -> np.ndarray:
+        '''
+        Boolean (nb_operations x nb_machines) matrix of the eligible machines
+        '''
+        return self.processing_time != NOT_ELIGIBLE
+
+    @property
+    def nbytes(self) -> int:
+        '''
+        Memory used by the arrays
+        '''
+        return sum(getattr(self, name).nbytes for name in self.FIELDS)
@@ -0,0 +1,150 @@
+'''
+On-disk binary cache of the instances.
+The columnar arrays of an instance are stored in a single binary file in a
+__cache__ folder inside the instance folder. The file is memory-mapped on
+reload (and its pages shared between processes) instead of parsing the csv
+files again. The cache is only used when asked for (Instance.from_file(use_cache=True)).
+
+File layout: 8 bytes (little endian) giving the size of a json header,
+the json header (version, csv stamps, offset/dtype/shape of each array),
+then the arrays, each aligned on ALIGNMENT bytes.
+
+@author: Vassilissa Lehoux
+'''
+from typing import Dict, List, Optional
+import hashlib
+import json
+import mmap
+import os
+
+import numpy as np
+
+from src.scheduling.instance.arrays import InstanceArrays
+
+
+CACHE_FOLDER = "__cache__"
+# A incrémenter si le format du fichier change
+CACHE_VERSION = 1
+ALIGNMENT = 64
+
+
+def cache_filepath(folderpath: str) -> str:
+    '''
+    Returns the path of the cache file of the instance in folderpath
+    '''
+    return os.path.join(folderpath, CACHE_FOLDER, f"{os.path.basename(folderpath)}.bin")
+
+
+def _csv_files(folderpath: str) -> List[str]:
+    name = os.path.basename(folderpath)
+    return [os.path.join(folderpath, f"{name}_mach.csv"),
+            os.path.join(folderpath, f"{name}_op.csv")]
+
+
+def _file_hash(filepath: str) -> str:
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _stamp(filepath: str) -> Dict:
+    stat = os.stat(filepath)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _read_header(f) -> Dict:
+    header_size = int.from_bytes(f.read(8), 'little')
+    return json.loads(f.read(header_size))
+
+
+def _write(filepath: str, header: Dict, arrays: Optional[InstanceArrays]):
+    '''
+    Writes the header and the arrays in filepath.
+    If arrays is None, only the header of the existing file is replaced.
+    '''
+    if arrays is None:
+        with open(filepath, 'rb') as f:
+            old_header = _read_header(f)
+            f.seek(old_header['data_offset'])
+            data = f.read()
+    else:
+        data = bytearray()
+        header['arrays'] = {}
+        for name in InstanceArrays.FIELDS:
+            array = np.ascontiguousarray(getattr(arrays, name))
+            data.extend(bytes(-len(data) % ALIGNMENT))
+            header['arrays'][name] = {'offset': len(data), 'dtype': array.dtype.str,
+                                      'shape': list(array.shape)}
+            data.extend(array.tobytes())
+
+    # Les tableaux commencent sur une frontière alignée après l'en-tête
+    header['data_offset'] = 0
+    header_size = len(json.dumps(header).encode()) + 32
+    header['data_offset'] = 8 + header_size + (-(8 + header_size) % ALIGNMENT)
+    encoded_header = json.dumps(header).encode().ljust(header['data_offset'] - 8)
+
+    # Écriture atomique : un autre processus ne lit jamais un fichier à moitié écrit
+    tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmp_filepath, 'wb') as f:
+        f.write(len(encoded_header).to_bytes(8, 'little'))
+        f.write(encoded_header)
+        f.write(data)
+    os.replace(tmp_filepath, filepath)
+
+
+def load(folderpath: str) -> Optional[InstanceArrays]:
+    '''
+    Returns the memory-mapped arrays of the instance in folderpath,
+    None if there is no cache or if the csv files changed since it was built.
+    '''
+    filepath = cache_filepath(folderpath)
+    try:
+        with open(filepath, 'rb') as f:
+            header = _read_header(f)
+            if header['version'] != CACHE_VERSION:
+                return None
+
+            restamp = False
+            for csv_filepath, file_meta in zip(_csv_files(folderpath), header['files']):
+                stamp = _stamp(csv_filepath)
+                if stamp['mtime_ns'] == file_meta['mtime_ns'] and stamp['size'] == file_meta['size']:
+                    continue
+                # Fichier touché (copie, checkout...) : on ne reconstruit que si le contenu a changé
+                if _file_hash(csv_filepath) != file_meta['sha1']:
+                    return None
+                file_meta.update(stamp)
+                restamp = True
+
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data_offset = header['data_offset']
+        arrays = {name: np.ndarray(tuple(spec['shape']), dtype=np.dtype(spec['dtype']), buffer=buffer,
+                                   offset=data_offset + spec['offset'])
+                  for name, spec in header['arrays'].items()}
+        result = InstanceArrays(arrays)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    if restamp:
+        try:
+            _write(filepath, header, None)
+        except OSError:
+            pass
+    return result
+
+
+def save(folderpath: str, arrays: InstanceArrays) -> bool:
+    '''
+    Stores the arrays of the instance in the cache of folderpath.
+    Returns False if the cache could not be written (read-only folder for instance).
+    '''
+    filepath = cache_filepath(folderpath)
+    try:
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        files = []
+        for csv_filepath in _csv_files(folderpath):
+            file_meta = _stamp(csv_filepath)
+            file_meta['sha1'] = _file_hash(csv_filepath)
+            files.append(file_meta)
+        _write(filepath, {'version': CACHE_VERSION, 'files': files}, arrays)
+    except OSError:
+        return False
+    return True
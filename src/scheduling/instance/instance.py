@@ -8,8 +8,10 @@ import os
 import csv
 
 from src.scheduling.instance.job import Job
-from src.scheduling.instance.operation import Operation
+from src.scheduling.instance.operation import Operation, ScheduleState
 from src.scheduling.instance.machine import Machine
+from src.scheduling.instance.arrays import InstanceArrays, NOT_ELIGIBLE
+from src.scheduling.instance import cache
 
 
 class Instance(object):
@@ -19,18 +21,55 @@ class Instance(object):
 
     def __init__(self, instance_name):
         self._instance_name = instance_name
+        self._folderpath : str = None
         self._jobs : dict[int, Job] = {}
         self._machines : dict[int, Machine] = {}
         self._operations: List[Operation] = []
-        # self._operations : Dict[Tuple[int, int], Operation] = {} # Note : on pourrait passer par un dictionnaire pour augmenter la performance
+        self._operation_index: Dict[Tuple[int, int], Operation] = {}
+        self._arrays: InstanceArrays = None
+        # Informations de planification de toutes les opérations, indexées comme _operations
+        self._schedule_state: ScheduleState = ScheduleState()
+        # Référence faible vers la solution dont le planning est porté par les opérations
+        # et les machines (voir Solution.clone)
+        self._schedule_owner = None
+        # Tables précalculées au chargement (voir _precompute), indexées comme _operations
+        self._fastest: List[List[int]] = []
+        self._cheapest: List[List[int]] = []
+        self._remaining_work: List[int] = []
+        self._load_bounds: Dict[int, int] = {}
+        # Opérations de chaque identifiant d'opération (plusieurs si l'identifiant est ambigu)
+        self._operations_by_id: Dict[int, List[Operation]] = {}
 
     @classmethod
-    def from_file(cls, folderpath: str) -> 'Instance':
+    def from_file(cls, folderpath: str, use_cache: bool=False) -> 'Instance':
         """
         Méthode "factory" pour créer une instance à partir d'un dossier de données.
+        @param use_cache: if True, the instance is read from the binary cache of the folder
+          when it is up to date, and the cache is (re)built after reading the csv files otherwise
+          (the cache is written in a __cache__ folder inside the data folder).
+          An instance whose operations reference unknown machines is not cached.
         """
+        if use_cache:
+            arrays = cache.load(folderpath)
+            if arrays is not None:
+                inst = cls.from_arrays(os.path.basename(folderpath), arrays)
+                inst._folderpath = folderpath
+                return inst
+
+        inst = cls._read_csv(folderpath)
+        if use_cache:
+            try:
+                arrays = inst.as_arrays()
+            except ValueError:
+                return inst
+            cache.save(folderpath, arrays)
+        return inst
+
+    @classmethod
+    def _read_csv(cls, folderpath: str) -> 'Instance':
         instance_name = os.path.basename(folderpath)
         inst = cls(instance_name)
+        inst._folderpath = folderpath
 
         # Lecture des informations sur les machines
         mach_filepath = os.path.join(folderpath, f"{inst._instance_name}_mach.csv")
@@ -45,7 +84,8 @@ class Instance(object):
                                       tear_down_energy, min_consumption, end_time)
                 inst._machines[machine_id] = new_machine
 
-        # Lecture des informations sur les opérations
+        # Lecture des informations sur les opérations, en une seule passe :
+        # l'index (job_id, operation_id) -> Operation évite de parcourir la liste à chaque ligne
         op_filepath = os.path.join(folderpath, f"{inst._instance_name}_op.csv")
         with open(op_filepath, 'r') as csv_file:
             csv_reader = csv.reader(csv_file)
@@ -53,33 +93,109 @@ class Instance(object):
             for row in csv_reader:
                 job_id, op_id, machine_id, proc_time, energy = map(int, row)
 
-                # Créer le Job s'il n'existe pas encore
-                if job_id not in inst._jobs:
-                    inst._jobs[job_id] = Job(job_id)
-
-                # On doit chercher dans la liste si l'opération existe déjà
-                current_op = None
-                for op in inst._operations:
-                    if op.job_id == job_id and op.operation_id == op_id:
-                        current_op = op
-                        break  # On a trouvé l'opération, on arrête la recherche
-
-                # Si on n'a pas trouvé l'opération, il faut la créer
+                current_op = inst._operation_index.get((job_id, op_id))
                 if current_op is None:
-                    current_op = Operation(job_id, op_id)
+                    current_op = Operation(job_id, op_id, inst._schedule_state)
+                    inst._operation_index[(job_id, op_id)] = current_op
                     inst._operations.append(current_op)
-                    # Ajouter l'opération à son job (crée les contraintes de précédence)
-                    inst._jobs[job_id].add_operation(current_op)
 
-                # Ajouter l'option de machine à l'opération (qu'elle soit nouvelle ou trouvée)
                 current_op.machine_options[machine_id] = (proc_time, energy)
 
+        # Les contraintes de précédence sont créées une fois toutes les opérations lues,
+        # dans l'ordre du fichier
+        for op in inst._operations:
+            if op.job_id not in inst._jobs:
+                inst._jobs[op.job_id] = Job(op.job_id)
+            inst._jobs[op.job_id].add_operation(op)
+
+        inst._precompute()
+        return inst
+
+    @classmethod
+    def from_arrays(cls, instance_name: str, arrays: InstanceArrays) -> 'Instance':
+        """
+        Creates the instance objects from its columnar view.
+        The arrays are kept as the view of the instance (no copy).
+        """
+        inst = cls(instance_name)
+        machine_ids = arrays.machine_ids.tolist()
+        for machine_id, set_up_time, set_up_energy, tear_down_time, tear_down_energy, \
+                min_consumption, end_time in zip(machine_ids, arrays.set_up_time.tolist(),
+                                                 arrays.set_up_energy.tolist(),
+                                                 arrays.tear_down_time.tolist(),
+                                                 arrays.tear_down_energy.tolist(),
+                                                 arrays.min_consumption.tolist(),
+                                                 arrays.end_time.tolist()):
+            inst._machines[machine_id] = Machine(machine_id, set_up_time, set_up_energy, tear_down_time,
+                                                 tear_down_energy, min_consumption, end_time)
+
+        for job_id, op_id, durations, energies in zip(arrays.op_job.tolist(), arrays.op_id.tolist(),
+                                                      arrays.processing_time.tolist(),
+                                                      arrays.energy.tolist()):
+            op = Operation(job_id, op_id, inst._schedule_state)
+            op.machine_options = {machine_id: (duration, energy)
+                                  for machine_id, duration, energy in zip(machine_ids, durations, energies)
+                                  if duration != NOT_ELIGIBLE}
+            inst._operation_index[(job_id, op_id)] = op
+            inst._operations.append(op)
+
+        job_ptr = arrays.job_ptr.tolist()
+        job_ops = arrays.job_ops.tolist()
+        for j, job_id in enumerate(arrays.job_ids.tolist()):
+            job = Job(job_id)
+            for row in job_ops[job_ptr[j]:job_ptr[j + 1]]:
+                job.add_operation(inst._operations[row])
+            inst._jobs[job_id] = job
+
+        inst._arrays = arrays
+        inst._precompute()
         return inst
 
+    def _precompute(self):
+        '''
+        Computes the tables used by the heuristics, once the instance is loaded:
+          - the eligible machines of each operation sorted by processing time
+            (ties broken by energy) and by energy (ties broken by processing time)
+          - the remaining work of each operation: sum of the minimum processing times
+            of the next operations of its job
+          - the load lower bound of each machine: sum of the processing times
+            of the operations that can only be executed on it
+          - the operations of each operation id
+        '''
+        self._fastest = []
+        self._cheapest = []
+        self._load_bounds = {machine_id: 0 for machine_id in self._machines}
+        for op in self._operations:
+            options = op.machine_options
+            self._fastest.append(sorted(options, key=lambda m: (options[m][0], options[m][1], m)))
+            self._cheapest.append(sorted(options, key=lambda m: (options[m][1], options[m][0], m)))
+            if len(options) == 1:
+                (machine_id, (duration, _)), = options.items()
+                if machine_id in self._load_bounds:
+                    self._load_bounds[machine_id] += duration
+
+        self._remaining_work = [0] * len(self._operations)
+        for job in self._jobs.values():
+            remaining = 0
+            for op in reversed(job.operations):
+                self._remaining_work[op.index] = remaining
+                remaining += self.min_processing_time(op)
+
+        self._operations_by_id = {}
+        for op in self._operations:
+            self._operations_by_id.setdefault(op.operation_id, []).append(op)
+
     @property
     def name(self):
         return self._instance_name
 
+    @property
+    def folderpath(self) -> str:
+        '''
+        Returns the folder the instance was read from, None if it was not read from a folder
+        '''
+        return self._folderpath
+
     @property
     def machines(self) -> List[Machine]:
         return list(self._machines.values())
@@ -104,6 +220,69 @@ class Instance(object):
     def nb_operations(self):
         return len(self._operations)
 
+    @property
+    def schedule_state(self) -> ScheduleState:
+        '''
+        Returns the schedule information of the operations
+        '''
+        return self._schedule_state
+
+    def reset_schedule(self):
+        '''
+        Unschedules all the operations (in O(1)) and resets the machines and the jobs
+        '''
+        self._schedule_state.reset()
+        for machine in self._machines.values():
+            machine.reset(operations=False)
+        for job in self._jobs.values():
+            job.reset(operations=False)
+
+    def as_arrays(self) -> InstanceArrays:
+        '''
+        Returns the columnar (NumPy) view of the instance.
+        Computed on first call: the instance must be fully loaded.
+        Raises ValueError if an operation references a machine that is not in the instance.
+        '''
+        if self._arrays is None:
+            self._arrays = InstanceArrays.from_instance(self)
+        return self._arrays
+
+    def fastest_machines(self, op: Operation) -> List[int]:
+        '''
+        Returns the ids of the eligible machines of the operation, from the shortest
+        processing time to the longest (ties broken by energy, then by id), in O(1)
+        '''
+        return self._fastest[op.index]
+
+    def cheapest_machines(self, op: Operation) -> List[int]:
+        '''
+        Returns the ids of the eligible machines of the operation, from the lowest
+        energy consumption to the highest (ties broken by processing time, then by id), in O(1)
+        '''
+        return self._cheapest[op.index]
+
+    def min_processing_time(self, op: Operation) -> int:
+        '''
+        Returns the shortest processing time of the operation on its eligible machines,
+        0 if it has none
+        '''
+        fastest = self._fastest[op.index]
+        return op.machine_options[fastest[0]][0] if fastest else 0
+
+    def remaining_work(self, op: Operation) -> int:
+        '''
+        Returns a lower bound of the time between the end of the operation and the end of its job:
+        the sum of the minimum processing times of the next operations of the job, in O(1)
+        '''
+        return self._remaining_work[op.index]
+
+    def machine_load_bound(self, machine_id: int) -> int:
+        '''
+        Returns a lower bound of the processing time of the machine in any complete solution:
+        the sum of the processing times of the operations that can only be executed on it
+        '''
+        return self._load_bounds.get(machine_id, 0)
+
     def __str__(self):
         return f"{self.name}_M{self.nb_machines}_J{self.nb_jobs}_O{self.nb_operations}"
 
@@ -113,5 +292,32 @@ class Instance(object):
     def get_job(self, job_id) -> Job:
         return self._jobs.get(job_id)
 
-    def get_operation(self, operation_id) -> Operation:
-        return self._operations[operation_id] if operation_id < len(self._operations) else None
\ No newline at end of file
+    def get_operation(self, job_id, operation_id=None) -> Operation:
+        '''
+        Returns the operation operation_id of the job job_id.
+        With a single argument, returns the operation at that position
+        in the list of operations.
+        '''
+        if operation_id is None:
+            return self._operations[job_id] if job_id < len(self._operations) else None
+        return self.operation(job_id, operation_id)
+
+    def operation(self, job_id: int, operation_id: int) -> Operation:
+        '''
+        Returns the operation operation_id of the job job_id in O(1),
+        None if it does not exist.
+        '''
+        return self._operation_index.get((job_id, operation_id))
+
+    def operation_with_id(self, operation_id: int) -> Operation:
+        '''
+        Returns the operation of id operation_id in O(1), None if it does not exist.
+        Raises ValueError if the id is ambiguous (several jobs have an operation with this id).
+        '''
+        operations = self._operations_by_id.get(operation_id)
+        if not operations:
+            return None
+        if len(operations) > 1:
+            raise ValueError(f"Identifiant d'opération ambigu : {operation_id} "
+                             f"(jobs {', '.join(str(op.job_id) for op in operations)})")
+        return operations[0]
@@ -30,12 +30,15 @@ class Job(object):
         '''
         return self._job_id
 
-    def reset(self):
+    def reset(self, operations: bool=True):
         '''
         Resets the planned operations
+        @param operations: if False, the operations are not reset
+          (they have been reset at once with their schedule state)
         '''
-        for op in self._operations:
-            op.reset()
+        if operations:
+            for op in self._operations:
+                op.reset()
 
         self._current_operation_index = 0
         self._next_operation_index = 0
@@ -63,6 +66,30 @@ class Job(object):
         if not self.planned:
             self._next_operation_index += 1
 
+    def unschedule_operation(self):
+        '''
+        The last scheduled operation is the next operation to schedule again
+        '''
+        if self._next_operation_index > 0:
+            self._next_operation_index -= 1
+
+    def update_next_operation(self):
+        '''
+        Recomputes the next operation to schedule from the assigned operations
+        (the operations of a job are assigned in precedence order)
+        '''
+        index = 0
+        while index < len(self._operations) and self._operations[index].assigned:
+            index += 1
+        self._next_operation_index = index
+
+    @property
+    def last_scheduled_operation(self) -> Operation:
+        '''
+        Returns the last scheduled operation, None if none is scheduled
+        '''
+        return self._operations[self._next_operation_index - 1] if self._next_operation_index > 0 else None
+
     @property
     def planned(self):
         '''
@@ -3,8 +3,9 @@ Machine on which operation are executed.
 
 @author: Vassilissa Lehoux
 '''
-from typing import List
+from typing import List, Tuple
 from src.scheduling.instance.operation import Operation
+from src.scheduling.instance.timeline import Timeline
 
 
 class Machine(object):
@@ -13,6 +14,10 @@ class Machine(object):
     When operations are scheduled on the machine, contains the relative information. 
     '''
 
+    # Si True, les totaux maintenus incrémentalement sont comparés à un recalcul complet
+    # à chaque lecture (débogage uniquement, la lecture devient linéaire)
+    check_aggregates : bool = False
+
     def __init__(self, machine_id: int, set_up_time: int, set_up_energy: int, tear_down_time: int,
                  tear_down_energy:int, min_consumption: int, end_time: int):
         '''
@@ -30,19 +35,35 @@ class Machine(object):
         self._min_consumption : int = min_consumption
         self._end_time : int = end_time
 
-        self._scheduled_operations : List[Operation] = []
+        # Opérations planifiées, ordonnées par date de début
+        self._timeline : Timeline = Timeline()
         self._start_times : List[int] = []
         self._stop_times : List[int] = []
+        # Incrémenté à chaque modification du planning de la machine
+        self._version : int = 0
 
         self.reset()
 
-    def reset(self):
-        for op in self._scheduled_operations:
-            op.reset()
+    def reset(self, operations: bool=True):
+        '''
+        Removes the planning of the machine
+        @param operations: if False, the scheduled operations are not reset
+          (they have been reset at once with their schedule state)
+        '''
+        if operations:
+            for op in self._timeline.items:
+                op.reset()
 
-        self._scheduled_operations = []
+        self._timeline.clear()
         self._start_times = []
         self._stop_times = []
+        self._version += 1
+
+        # Totaux mis à jour à chaque modification du planning
+        self._processing_energy : int = 0
+        self._processing_time : int = 0
+        # Temps de marche des cycles terminés (démarrage -> arrêt)
+        self._closed_on_time : int = 0
 
     @property
     def set_up_time(self) -> int:
@@ -52,6 +73,22 @@ class Machine(object):
     def tear_down_time(self) -> int:
         return self._tear_down_time
 
+    @property
+    def set_up_energy(self) -> int:
+        return self._set_up_energy
+
+    @property
+    def tear_down_energy(self) -> int:
+        return self._tear_down_energy
+
+    @property
+    def min_consumption(self) -> int:
+        return self._min_consumption
+
+    @property
+    def end_time(self) -> int:
+        return self._end_time
+
     @property
     def machine_id(self) -> int:
         return self._machine_id
@@ -59,9 +96,25 @@ class Machine(object):
     @property
     def scheduled_operations(self) -> List:
         '''
-        Returns the list of the scheduled operations on the machine.
+        Returns the list of the scheduled operations on the machine,
+        ordered by start time.
+        '''
+        return self._timeline.items
+
+    @property
+    def version(self) -> int:
+        '''
+        Returns a counter incremented each time the planning of the machine changes:
+        two equal versions of the machine have the same planning.
         '''
-        return self._scheduled_operations
+        return self._version
+
+    @property
+    def timeline(self) -> Timeline:
+        '''
+        Returns the timeline of the operations scheduled on the machine.
+        '''
+        return self._timeline
 
     @property
     def available_time(self) -> int:
@@ -70,13 +123,12 @@ class Machine(object):
         after processing its last operation of after its last set up.
         """
         # Cas la machine a été démarrée mais n'a pas d'opération
-        if len(self._start_times) > len(self._stop_times) and not self._scheduled_operations:
+        if len(self._start_times) > len(self._stop_times) and not self._timeline:
             return self._start_times[-1] + self._set_up_time
 
         # Cas la machine est en marche et a déjà des opérations
-        if self._scheduled_operations:
-            last_op = self._scheduled_operations[-1]
-            return last_op.end_time
+        if self._timeline:
+            return self._timeline.last_end
 
         # Cas la machine est éteinte, elle est dispo à partir du dernier arrêt.
         if self._stop_times:
@@ -85,20 +137,41 @@ class Machine(object):
         # Cas initial ou elle a jamais été démarrée
         return self._set_up_time
 
-    def add_operation(self, operation: Operation, start_time: int) -> int:
+    def earliest_start(self, operation: Operation, start_time: int=0, insertion: bool=False,
+                       resume: bool=False) -> int:
+        '''
+        Returns the time at which add_operation would start the operation.
+        @param insertion: if True and the machine is running, the operation can be
+          inserted in the first idle gap long enough for it instead of at the end of the schedule.
+        @param resume: if True, a stopped machine is considered as running
+          (its last stop will be cancelled before adding the operation)
+        '''
+        is_off = len(self._start_times) == len(self._stop_times)
+        if resume and self._stop_times:
+            is_off = False
+        op_ready_time = operation.min_start_time
+
+        if insertion and not is_off:
+            # On cherche le premier trou de la timeline après la mise en route de la machine
+            ready_time = max(self._start_times[-1] + self._set_up_time, op_ready_time, start_time)
+            duration, _ = operation.machine_options[self.machine_id]
+            return self._timeline.earliest_gap(ready_time, duration)
+
+        # L'opération ne peut commencer qu'après sa disponibilité et celle de la machine
+        return max(self.available_time, op_ready_time, start_time)
+
+    def add_operation(self, operation: Operation, start_time: int=0, insertion: bool=False) -> int:
         '''
         Adds an operation on the machine, at the end of the schedule,
         as soon as possible after time start_time.
         Returns the actual start time.
+        @param insertion: if True and the machine is running, the operation is inserted
+          in the first idle gap long enough for it (gap filling)
         '''
 
         is_off = len(self._start_times) == len(self._stop_times)
 
-        machine_available_time = self.available_time
-        op_ready_time = operation.min_start_time
-
-        # L'opération ne peut commencer qu'après sa disponibilité et celle de la machine
-        potential_start_time = max(machine_available_time, op_ready_time, start_time)
+        potential_start_time = self.earliest_start(operation, start_time, insertion)
 
         if is_off:
             # Cas ou la machine est éteinte, on doit prendre en compte le temps de démarrage
@@ -110,14 +183,40 @@ class Machine(object):
             # Cas ou la machine est déjà en marche, on peut commencer l'opération dès que possible
             actual_start = potential_start_time
 
+        self.place_operation(operation, actual_start)
+        return actual_start
+
+    def place_operation(self, operation: Operation, start_time: int):
+        '''
+        Schedules the operation on the machine at exactly start_time,
+        without checking the constraints nor changing the start and stop times of the machine.
+        '''
         # On ajoute l'opération en lien à la machine
-        operation.schedule(self.machine_id, actual_start, check_success=False)
+        operation.schedule(self.machine_id, start_time, check_success=False)
 
-        # On ajoute l'opération à la liste de la machine et pourquoi pas la trié par ordre de début au cas ou (pourrait être utile pour la suite)
-        self._scheduled_operations.append(operation)
-        self._scheduled_operations.sort(key=lambda op: op.start_time)
+        # On ajoute l'opération à la timeline de la machine, qui reste triée par date de début
+        self._timeline.insert(operation, start_time, operation.end_time)
+        self._processing_energy += operation.energy
+        self._processing_time += operation.processing_time
+        self._version += 1
 
-        return actual_start
+    def remove_operation(self, operation: Operation):
+        '''
+        Removes a scheduled operation from the machine and resets it.
+        The start and stop times of the machine are left unchanged.
+        '''
+        self._timeline.remove(operation)
+        self._processing_energy -= operation.energy
+        self._processing_time -= operation.processing_time
+        self._version += 1
+        operation.reset()
+
+    def earliest_gap(self, at_time: int, duration: int) -> int:
+        '''
+        Returns the earliest time after at_time at which an operation of
+        the given duration can be processed without overlapping the scheduled operations.
+        '''
+        return self._timeline.earliest_gap(at_time, duration)
 
     def stop(self, at_time):
         """
@@ -125,21 +224,65 @@ class Machine(object):
         """
         assert self.available_time <= at_time, "On ne peut pas arrêter une machine en cours d'exécution"
         assert len(self._start_times) == len(self._stop_times) + 1, "On ne peut pas arrêter une machine qui n'a pas été démarrée"
-        assert at_time + self.tear_down_time <= self._end_time, "On ne peut pas arrêter une machine après la fin du planning"
+        # Un arrêt après la fin du planning (end_time) rend la solution non réalisable,
+        # mais on doit pouvoir le représenter pour évaluer les solutions non réalisables
 
         self._stop_times.append(at_time)
+        self._closed_on_time += at_time - self._start_times[len(self._stop_times) - 1]
+        self._version += 1
+
+    def cancel_stop(self):
+        """
+        Cancels the last stop of the machine: the machine is running again
+        after its last operation.
+        """
+        assert self._stop_times and len(self._start_times) == len(self._stop_times), "La machine n'est pas arrêtée"
+
+        at_time = self._stop_times.pop()
+        self._closed_on_time -= at_time - self._start_times[len(self._stop_times)]
+        self._version += 1
+
+    def set_cycles(self, start_times: List[int], stop_times: List[int]):
+        '''
+        Replaces the start and stop times of the machine.
+        There is at most one more start time than stop times (the machine is then still running).
+        '''
+        assert len(stop_times) <= len(start_times) <= len(stop_times) + 1, "Dates de démarrage et d'arrêt incohérentes"
+        self._start_times = list(start_times)
+        self._stop_times = list(stop_times)
+        self._closed_on_time = sum(stop - start for start, stop in zip(self._start_times, self._stop_times))
+        self._version += 1
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Returns True if the machine has been started and not stopped since.
+        """
+        return len(self._start_times) > len(self._stop_times)
 
     @property
     def working_time(self) -> int:
         '''
         Total time during which the machine is running
         '''
+        total_time = self._closed_on_time
+        # On traite le cas où la machine est encore en marche à la fin du planning pour ne pas oublier la dernière opération
+        if len(self._start_times) > len(self._stop_times):
+            total_time += self.available_time - self._start_times[-1]
+
+        if self.check_aggregates:
+            assert total_time == self._computed_working_time(), f"Temps de marche de {self} incohérent"
+        return total_time
+
+    def _computed_working_time(self) -> int:
+        '''
+        Working time computed from the start and stop times
+        '''
         total_time = 0
         # On additionne le temps ou la machine a tourné
         for i in range(len(self._stop_times)):
             total_time += self._stop_times[i] - self._start_times[i]
 
-        # On traite le cas où la machine est encore en marche à la fin du planning pour ne pas oublier la dernière opération
         if len(self._start_times) > len(self._stop_times):
             total_time += self.available_time - self._start_times[-1]
 
@@ -166,34 +309,105 @@ class Machine(object):
         """
         Total energy consumption of the machine during planning exectution.
         """
-        # 1. Il y a le coup de démarrage et d'arrêt de la machine
-        energy_setup = len(self.start_times) * self._set_up_energy
-        energy_teardown = len(self.stop_times) * self._tear_down_energy
+        energy = self._energy(self._processing_energy, self._closed_on_time, self._processing_time)
+        if self.check_aggregates:
+            assert energy == self._computed_energy_consumption(), f"Énergie de {self} incohérente"
+        return energy
 
-        # 2. Il y a a aussi l'énergie consommée par les opérations
-        energy_processing = sum(op.energy for op in self._scheduled_operations)
+    @property
+    def processing_time(self) -> int:
+        '''
+        Total processing time of the scheduled operations
+        '''
+        return self._processing_time
 
-        # 3. Il y a l'énergie de la machine à vide
-        # On calcule le temps de fonctionnement de la machine
-        total_on_time = 0
-        for i in range(len(self._stop_times)):
-            total_on_time += self._stop_times[i] - self._start_times[i]
+    @property
+    def processing_energy(self) -> int:
+        '''
+        Total energy consumption of the scheduled operations
+        '''
+        return self._processing_energy
 
-        # Pareil ici on calcul le temps de fonctionnement de la dernière opération si la machine est encore en marche pour calculer le temps à vide
-        total_setup_time = len(self.start_times) * self._set_up_time
-        total_teardown_time = len(self.stop_times) * self._tear_down_time
+    def cycle_energy(self, first_start: int, last_end: int, processing_time: int, processing_energy: int) -> int:
+        '''
+        Energy consumption of the machine running a single cycle, as planned by Solution.schedule:
+        started to process its first operation at first_start and stopped at its end time
+        (or after its tear down if the last operation ends at last_end too late).
+        '''
+        total_on_time = max(self._end_time, last_end + self._tear_down_time) - first_start + self._set_up_time
+        total_idle_time = total_on_time - self._set_up_time - self._tear_down_time - processing_time
+        return self._set_up_energy + self._tear_down_energy + processing_energy \
+            + max(0, total_idle_time) * self._min_consumption
+
+    def plan_cycles(self, starts: List[int], ends: List[int]) -> Tuple[List[int], List[int]]:
+        '''
+        Returns the start and stop times minimizing the energy consumption of the machine
+        processing operations from starts to ends (ordered by start time, without overlap).
+        The machine is started just in time for the first operation and stopped after the tear down
+        following the last one. It is stopped during an idle gap if the gap is long enough for
+        a tear down and a set up, and if their energy is lower than the consumption of the machine
+        running idle during the gap: the cost of each gap does not depend on the decisions taken for
+        the other gaps, so deciding them one after the other gives the optimal cycles in linear time.
+        '''
+        if not starts:
+            return [], []
+        start_times = [starts[0] - self._set_up_time]
+        stop_times = []
+        restart_time = self._tear_down_time + self._set_up_time
+        restart_energy = self._tear_down_energy + self._set_up_energy
+        last_end = ends[0]
+        for end, next_start in zip(ends, starts[1:]):
+            last_end = max(last_end, end)
+            gap = next_start - last_end
+            if gap >= restart_time and restart_energy < gap * self._min_consumption:
+                stop_times.append(last_end + self._tear_down_time)
+                start_times.append(next_start - self._set_up_time)
+        stop_times.append(max(last_end, ends[-1]) + self._tear_down_time)
+        return start_times, stop_times
+
+    def planned_energy(self, starts: List[int], ends: List[int], processing_time: int, processing_energy: int) -> int:
+        '''
+        Energy consumption of the machine processing operations from starts to ends
+        with the cycles of plan_cycles
+        '''
+        start_times, stop_times = self.plan_cycles(starts, ends)
+        total_on_time = sum(stop - start for start, stop in zip(start_times, stop_times))
+        total_idle_time = total_on_time - len(start_times) * (self._set_up_time + self._tear_down_time) \
+            - processing_time
+        return len(start_times) * (self._set_up_energy + self._tear_down_energy) + processing_energy \
+            + max(0, total_idle_time) * self._min_consumption
+
+    def _energy(self, energy_processing: int, total_on_time: int, total_processing_time: int) -> int:
+        '''
+        Energy consumption given the totals of the operations and the running time
+        of the machine (the number of start/stop is read from the start and stop times).
+        '''
+        # 1. Il y a le coup de démarrage et d'arrêt de la machine
+        energy_setup = len(self._start_times) * self._set_up_energy
+        energy_teardown = len(self._stop_times) * self._tear_down_energy
 
-        # Pareil temps total de traitement des opérations pour le calcul du temps à vide
-        total_processing_time = sum(op.processing_time for op in self._scheduled_operations)
+        # 2. Temps de démarrage et d'arrêt, pour le calcul du temps à vide
+        total_setup_time = len(self._start_times) * self._set_up_time
+        total_teardown_time = len(self._stop_times) * self._tear_down_time
 
-        # Calcul du temps d'inactivité
+        # 3. Calcul du temps d'inactivité et de l'énergie consommée à vide
         total_idle_time = total_on_time - total_setup_time - total_teardown_time - total_processing_time
-
-        # Calcule de l'énergie consommée à vide
         energy_idle = max(0, total_idle_time) * self._min_consumption
 
         return energy_setup + energy_teardown + energy_processing + energy_idle
 
+    def _computed_energy_consumption(self) -> int:
+        '''
+        Energy consumption computed from the scheduled operations
+        and the start and stop times
+        '''
+        energy_processing = sum(op.energy for op in self._timeline.items)
+        total_processing_time = sum(op.processing_time for op in self._timeline.items)
+        total_on_time = 0
+        for i in range(len(self._stop_times)):
+            total_on_time += self._stop_times[i] - self._start_times[i]
+        return self._energy(energy_processing, total_on_time, total_processing_time)
+
     def __str__(self):
         return f"M{self.machine_id}"
 
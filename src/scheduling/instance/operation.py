@@ -20,14 +20,55 @@ class OperationScheduleInfo(object):
         self.energy_consumption : int = energy_consumption
 
 
+class ScheduleState(object):
+    '''
+    Schedule information of a set of operations, stored in flat lists
+    indexed by the index of the operation in the state (its position in Instance.operations).
+    An operation is scheduled if its stamp is the current generation of the state:
+    reset unschedules all the operations in O(1) by incrementing the generation.
+    Python lists are used rather than arrays: they are only read element by element,
+    and reading a list does not allocate a new int object.
+    '''
+
+    def __init__(self):
+        self.generation : int = 0
+        self.stamp : List[int] = []
+        self.machine : List[int] = []
+        self.start : List[int] = []
+        self.duration : List[int] = []
+        self.energy : List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.stamp)
+
+    def add(self) -> int:
+        '''
+        Adds an unscheduled operation to the state and returns its index
+        '''
+        self.stamp.append(-1)
+        self.machine.append(-1)
+        self.start.append(-1)
+        self.duration.append(-1)
+        self.energy.append(-1)
+        return len(self.stamp) - 1
+
+    def reset(self):
+        '''
+        Unschedules all the operations
+        '''
+        self.generation += 1
+
+
 class Operation(object):
     '''
     Operation of the jobs
     '''
 
-    def __init__(self, job_id: int, operation_id: int):
+    def __init__(self, job_id: int, operation_id: int, state: ScheduleState=None):
         '''
         Constructor
+        @param state: the schedule state shared by the operations of the instance,
+          a state of its own is created for an operation created alone
         '''
 
         # Bon j'ai vu qu'on pouvait typer les variables avec # type: + le type et j'en abuse car je déteste les langages non typés
@@ -35,7 +76,9 @@ class Operation(object):
         self._operation_id : int = operation_id
         self._predecessor : List[Operation] = []
         self._successor : List[Operation] = []
-        self._schedule_info : OperationScheduleInfo or None  = None
+        # Informations de planification stockées dans l'état partagé, à la position _index
+        self._state : ScheduleState = state if state is not None else ScheduleState()
+        self._index : int = self._state.add()
 
         # On a besoin à un moment d'avoir les informations de processing_time et d'energy condommé pour la méthode schedule (à voir comment on alimente ça)
         self._machine_options: Dict[int, Tuple[int, int]] = {}
@@ -60,7 +103,43 @@ class Operation(object):
         '''
         Removes scheduling informations
         '''
-        self._schedule_info = None
+        self._state.stamp[self._index] = -1
+
+    @property
+    def index(self) -> int:
+        '''
+        Returns the index of the operation in its schedule state
+        '''
+        return self._index
+
+    @property
+    def _schedule_info(self) -> OperationScheduleInfo:
+        '''
+        Schedule information of the operation, None if it is not scheduled
+        (a copy: the information is stored in the schedule state)
+        '''
+        state, i = self._state, self._index
+        if state.stamp[i] != state.generation:
+            return None
+        return OperationScheduleInfo(state.machine[i], state.start[i], state.duration[i], state.energy[i])
+
+    @_schedule_info.setter
+    def _schedule_info(self, info: OperationScheduleInfo):
+        if info is None:
+            self.reset()
+        else:
+            self._set(info.machine_id, info.schedule_time, info.duration, info.energy_consumption)
+
+    def _set(self, machine_id: int, at_time: int, duration: int, energy: int):
+        '''
+        Stores the schedule information in the schedule state
+        '''
+        state, i = self._state, self._index
+        state.stamp[i] = state.generation
+        state.machine[i] = machine_id
+        state.start[i] = at_time
+        state.duration[i] = duration
+        state.energy[i] = energy
 
     def add_predecessor(self, operation):
         '''
@@ -104,7 +183,8 @@ class Operation(object):
         Returns True if the operation is assigned
         and False otherwise
         '''
-        return self._schedule_info is not None
+        state = self._state
+        return state.stamp[self._index] == state.generation
 
     @property
     def assigned_to(self) -> int:
@@ -112,7 +192,8 @@ class Operation(object):
         Returns the machine ID it is assigned to if any
         and -1 otherwise
         '''
-        return self._schedule_info.machine_id if self.assigned else -1
+        state, i = self._state, self._index
+        return state.machine[i] if state.stamp[i] == state.generation else -1
 
     @property
     def processing_time(self) -> int:
@@ -120,7 +201,8 @@ class Operation(object):
         Returns the processing time if is assigned,
         -1 otherwise
         '''
-        return self._schedule_info.schedule_time if self.assigned else -1
+        state, i = self._state, self._index
+        return state.duration[i] if state.stamp[i] == state.generation else -1
 
     @property
     def start_time(self) -> int:
@@ -128,7 +210,8 @@ class Operation(object):
         Returns the start time if is assigned,
         -1 otherwise
         '''
-        return self._schedule_info.schedule_time if self.assigned else -1
+        state, i = self._state, self._index
+        return state.start[i] if state.stamp[i] == state.generation else -1
 
     @property
     def end_time(self) -> int:
@@ -136,7 +219,8 @@ class Operation(object):
         Returns the end time if is assigned,
         -1 otherwise
         '''
-        return (self.start_time + self.processing_time) if self.assigned else -1
+        state, i = self._state, self._index
+        return state.start[i] + state.duration[i] if state.stamp[i] == state.generation else -1
 
     @property
     def energy(self) -> int:
@@ -144,7 +228,8 @@ class Operation(object):
         Returns the energy consumption if is assigned,
         -1 otherwise
         '''
-        return self._schedule_info.energy_consumption if self.assigned else -1
+        state, i = self._state, self._index
+        return state.energy[i] if state.stamp[i] == state.generation else -1
 
     def is_ready(self, at_time) -> bool:
         '''
@@ -171,7 +256,7 @@ class Operation(object):
             return False
 
         duration, energy = self.machine_options[machine_id]
-        self._schedule_info = OperationScheduleInfo(machine_id, at_time, duration, energy)
+        self._set(machine_id, at_time, duration, energy)
 
         return True
 
@@ -183,7 +268,7 @@ class Operation(object):
         if not self.predecessors:
             return 0
         else:
-            return max([pred.end_time for pred in self.predecessors if pred.assigned])
+            return max([pred.end_time for pred in self.predecessors if pred.assigned], default=0)
 
     def schedule_at_min_time(self, machine_id: int, min_time: int) -> bool:
         '''
@@ -199,7 +284,7 @@ class Operation(object):
         Returns a string representing the operation.
         '''
         base_str = f"O{self.operation_id}_J{self.job_id}"
-        if self._schedule_info:
+        if self.assigned:
             return base_str + f"_M{self.assigned_to}_ci{self.processing_time}_e{self.energy}"
         else:
             return base_str
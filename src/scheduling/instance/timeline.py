@@ -0,0 +1,291 @@
+'''
+Timeline of the operations scheduled on a machine.
+Intervals [start, end) are kept in a treap ordered by start time and
+augmented with the largest idle gap and the size of each subtree, so that insertions,
+removals, "earliest gap of length d after t" and position queries are logarithmic.
+
+@author: Vassilissa Lehoux
+'''
+from typing import List, Tuple
+import itertools
+
+
+_uids = itertools.count()
+
+
+class _Node(object):
+    '''
+    Interval of the timeline
+    '''
+    __slots__ = ('key', 'priority', 'item', 'start', 'end', 'gap', 'max_gap', 'size', 'left', 'right')
+
+    def __init__(self, item, start: int, end: int):
+        uid = next(_uids)
+        # Clé unique même pour deux intervalles de même début (durée nulle)
+        self.key: Tuple[int, int] = (start, uid)
+        # Priorité pseudo-aléatoire déterministe (hachage multiplicatif de Knuth),
+        # pour ne pas consommer le générateur aléatoire des heuristiques
+        self.priority: int = (uid * 2654435761) & 0xffffffff
+        self.item = item
+        self.start: int = start
+        self.end: int = end
+        # Temps libre entre la fin de l'intervalle précédent et le début de celui-ci
+        self.gap: int = 0
+        self.max_gap: int = 0
+        # Nombre d'intervalles du sous-arbre
+        self.size: int = 1
+        self.left: _Node = None
+        self.right: _Node = None
+
+
+def _update(node: _Node):
+    max_gap = node.gap
+    size = 1
+    if node.left is not None:
+        size += node.left.size
+        if node.left.max_gap > max_gap:
+            max_gap = node.left.max_gap
+    if node.right is not None:
+        size += node.right.size
+        if node.right.max_gap > max_gap:
+            max_gap = node.right.max_gap
+    node.max_gap = max_gap
+    node.size = size
+
+
+def _split(node: _Node, key) -> Tuple[_Node, _Node]:
+    '''
+    Splits the subtree in (keys < key, keys >= key)
+    '''
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, key)
+    _update(node)
+    return left, node
+
+
+def _merge(left: _Node, right: _Node) -> _Node:
+    '''
+    Merges two subtrees, all the keys of left being lower than the keys of right
+    '''
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _leftmost(node: _Node) -> _Node:
+    while node.left is not None:
+        node = node.left
+    return node
+
+
+def _rightmost(node: _Node) -> _Node:
+    while node.right is not None:
+        node = node.right
+    return node
+
+
+def _set_leftmost_gap(node: _Node, gap: int):
+    '''
+    Changes the gap of the leftmost node of the subtree and updates the left spine
+    '''
+    spine = []
+    while node is not None:
+        spine.append(node)
+        node = node.left
+    spine[-1].gap = gap
+    for spine_node in reversed(spine):
+        _update(spine_node)
+
+
+class Timeline(object):
+    '''
+    Ordered set of non overlapping intervals [start, end), each carrying an item
+    (the scheduled operation).
+    '''
+
+    def __init__(self):
+        self._root: _Node = None
+        self._nodes = {}
+        self._items: List = None
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, item) -> bool:
+        return id(item) in self._nodes
+
+    def clear(self):
+        self._root = None
+        self._nodes = {}
+        self._items = None
+
+    def insert(self, item, start: int, end: int):
+        '''
+        Inserts the item on the interval [start, end).
+        '''
+        node = _Node(item, start, end)
+        left, right = _split(self._root, node.key)
+        if left is not None:
+            node.gap = start - _rightmost(left).end
+            node.max_gap = node.gap
+        if right is not None:
+            _set_leftmost_gap(right, _leftmost(right).start - end)
+        self._root = _merge(_merge(left, node), right)
+        self._nodes[id(item)] = node
+        self._items = None
+
+    def remove(self, item):
+        '''
+        Removes the item from the timeline.
+        '''
+        node = self._nodes.pop(id(item))
+        left, right = _split(self._root, node.key)
+        _, right = _split(right, (node.key[0], node.key[1] + 1))
+        if right is not None:
+            gap = _leftmost(right).start - _rightmost(left).end if left is not None else 0
+            _set_leftmost_gap(right, gap)
+        self._root = _merge(left, right)
+        self._items = None
+
+    @property
+    def items(self) -> List:
+        '''
+        Items ordered by start time. The list is cached until the next modification.
+        '''
+        if self._items is None:
+            items = []
+            stack = []
+            node = self._root
+            while stack or node is not None:
+                while node is not None:
+                    stack.append(node)
+                    node = node.left
+                node = stack.pop()
+                items.append(node.item)
+                node = node.right
+            self._items = items
+        return self._items
+
+    def previous(self, item):
+        '''
+        Returns the item scheduled just before item, None if it is the first one.
+        '''
+        key = self._nodes[id(item)].key
+        previous = None
+        node = self._root
+        while node is not None:
+            if node.key < key:
+                previous = node
+                node = node.right
+            else:
+                node = node.left
+        return previous.item if previous is not None else None
+
+    def next(self, item):
+        '''
+        Returns the item scheduled just after item, None if it is the last one.
+        '''
+        key = self._nodes[id(item)].key
+        following = None
+        node = self._root
+        while node is not None:
+            if node.key > key:
+                following = node
+                node = node.left
+            else:
+                node = node.right
+        return following.item if following is not None else None
+
+    def index(self, item) -> int:
+        '''
+        Returns the position of item in items (number of items scheduled before it).
+        '''
+        return self._count_before(self._nodes[id(item)].key)
+
+    def rank(self, at_time: int) -> int:
+        '''
+        Returns the number of items starting strictly before at_time
+        (the position at which an item starting at at_time would be inserted).
+        '''
+        return self._count_before((at_time, -1))
+
+    def _count_before(self, key) -> int:
+        count = 0
+        node = self._root
+        while node is not None:
+            if node.key < key:
+                count += 1 + (node.left.size if node.left is not None else 0)
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    @property
+    def last_end(self) -> int:
+        '''
+        End of the last interval, None if the timeline is empty.
+        '''
+        return _rightmost(self._root).end if self._root is not None else None
+
+    @property
+    def first_start(self) -> int:
+        '''
+        Start of the first interval, None if the timeline is empty.
+        '''
+        return _leftmost(self._root).start if self._root is not None else None
+
+    def earliest_gap(self, at_time: int, duration: int) -> int:
+        '''
+        Returns the earliest time t >= at_time such that [t, t + duration)
+        does not overlap any interval of the timeline.
+        '''
+        # Intervalle précédent (début <= at_time) et suivant (début > at_time)
+        previous = following = None
+        node = self._root
+        while node is not None:
+            if node.start <= at_time:
+                previous = node
+                node = node.right
+            else:
+                following = node
+                node = node.left
+
+        start = at_time if previous is None else max(at_time, previous.end)
+        if following is None or following.start - start >= duration:
+            return start
+
+        # Premier trou assez grand après l'intervalle suivant, grâce au max_gap des sous-arbres
+        node = self._first_gap(self._root, following.key, duration)
+        if node is None:
+            return self.last_end
+        return node.start - node.gap
+
+    def _first_gap(self, node: _Node, key, duration: int) -> _Node:
+        '''
+        Returns the first node with a key greater than key whose gap is at least duration.
+        '''
+        while node is not None and node.max_gap >= duration:
+            if node.key <= key:
+                node = node.right
+                continue
+            if node.left is not None and node.left.max_gap >= duration:
+                found = self._first_gap(node.left, key, duration)
+                if found is not None:
+                    return found
+            if node.gap >= duration:
+                return node
+            node = node.right
+        return None
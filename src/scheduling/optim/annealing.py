@@ -0,0 +1,212 @@
+'''
+Simulated annealing: random moves of the neighborhoods are applied if they improve
+the solution, or with a probability decreasing with their cost and the temperature.
+
+@author: Vassilissa Lehoux
+'''
+from typing import Dict, Iterator, List
+import math
+import random
+
+import numpy as np
+
+from src.scheduling.optim.heuristics import Heuristic
+from src.scheduling.optim.local_search import Budget
+from src.scheduling.instance.instance import Instance
+from src.scheduling.solution import Solution
+from src.scheduling.optim.constructive import NonDeterminist
+from src.scheduling.optim.moves import Move
+from src.scheduling.optim.neighborhoods import MoveNeighborhood, MyNeighborhood1, MyNeighborhood2
+
+
+# Nombre maximal de tirages pour obtenir un mouvement valide
+MAX_DRAWS = 100
+# Nombre de mouvements tirés pour estimer la température initiale
+TEMPERATURE_SAMPLE = 256
+
+
+def cooling_schedule(name: str, t0: float, alpha: float):
+    '''
+    Returns the function giving the temperature at a temperature level k (k >= 0):
+      - geometric: t0 * alpha^k
+      - linear: t0 * max(0, 1 - alpha * k)
+      - logarithmic: t0 / (1 + alpha * ln(1 + k))
+    '''
+    if name == 'geometric':
+        return lambda k: t0 * alpha ** k
+    if name == 'linear':
+        return lambda k: t0 * max(0.0, 1.0 - alpha * k)
+    if name == 'logarithmic':
+        return lambda k: t0 / (1.0 + alpha * math.log(1.0 + k))
+    raise ValueError(f"Schéma de refroidissement inconnu : {name}")
+
+
+class SimulatedAnnealing(Heuristic):
+    '''
+    Simulated annealing. Moves are drawn at random from the neighborhoods (Neighborhood.random_move)
+    one at a time and scored against the current solution with Solution.delta (incremental
+    evaluation). A worsening move of cost delta is accepted if delta <= T * e, e being drawn from
+    an exponential distribution (e = -ln(u)), which accepts it with probability min(1, exp(-delta / T)).
+    The exponential draws are generated with NumPy by batches of batch_size and used in turn:
+    the batch size does not change the search, only the number of calls to the generator.
+    The temperature decreases after each level of moves_per_level evaluated moves. Without
+    improvement of the best solution during reheat_after levels, the temperature goes back to
+    reheat * the initial temperature.
+    The best solution is kept as a snapshot and restored at the end.
+    Parameters:
+      - t0 (None): initial temperature, by default the one accepting with probability 1/2
+        the mean cost of a sample of worsening moves
+      - cooling ('geometric'): cooling schedule (geometric, linear, logarithmic), see cooling_schedule
+      - alpha (0.95): parameter of the cooling schedule
+      - moves_per_level (512): number of evaluated moves at each temperature
+      - batch_size (256): number of acceptance thresholds drawn at once
+      - min_temperature (0.01): the search stops below this temperature
+      - reheat (0.5): fraction of the initial temperature used to reheat, 0 to never reheat
+      - reheat_after (20): number of levels without improvement before a reheat
+      - max_iterations (200): maximum number of temperature levels
+      - max_no_improvement (None): maximum number of levels without improving the best solution
+      - time_limit (None): time limit in seconds
+      - seed (None): seed of the random generator (also given to the initialization)
+      - callback (None): function called with (step, solution) for the initial solution
+        and for each new best solution
+      - penalty_weight (0): weight of the violated constraints in the value optimized by the search
+        (see Solution.configure)
+      - plan_cycles (False): the machines are stopped during their idle times when it saves energy
+        (see Solution.configure)
+    '''
+
+    def __init__(self, params: Dict=dict()):
+        '''
+        Constructor
+        @param params: The parameters of your heuristic method if any as a
+               dictionary. Implementation should provide default values in the function.
+        '''
+        self._params = params
+
+    def run(self, instance: Instance, InitClass, NeighborClass, params: Dict=dict()) -> Solution:
+        '''
+        Computes a solution for the given instance.
+        Implementation should provide default values in the function
+        (the function will be evaluated with an empty dictionary).
+
+        @param instance: the instance to solve
+        @param InitClass: the class for the heuristic computing the initialization
+        @param NeighborClass: the class of neighborhood, or a list of neighborhood classes
+          (they must implement random_move)
+        @param params: the parameters for the run, also given to the initialization
+          and to the neighborhoods
+        '''
+        callback = {**self._params, **params}.get('callback')
+        sol = None
+        for step, sol in enumerate(self.iterate(instance, InitClass, NeighborClass, params)):
+            if callback is not None:
+                callback(step, sol)
+        return sol
+
+    @staticmethod
+    def _draw(sol: Solution, neighborhoods: List[MoveNeighborhood], rng: random.Random) -> Move:
+        '''
+        Draws a move of a random neighborhood, None if no valid move was found in MAX_DRAWS draws
+        '''
+        for _ in range(MAX_DRAWS):
+            move = rng.choice(neighborhoods).random_move(sol, rng)
+            if move is not None:
+                return move
+        return None
+
+    def _initial_temperature(self, sol: Solution, neighborhoods: List[MoveNeighborhood],
+                             rng: random.Random, size: int) -> float:
+        '''
+        Temperature accepting with probability 1/2 the mean cost of the worsening moves of a sample
+        '''
+        moves = (self._draw(sol, neighborhoods, rng) for _ in range(size))
+        deltas = [delta[3] for delta in (sol.delta(move) for move in moves if move is not None)
+                  if delta is not None and delta[3] > 0]
+        return float(np.mean(deltas)) / math.log(2) if deltas else 1.0
+
+    def iterate(self, instance: Instance, InitClass, NeighborClass, params: Dict=dict()) -> Iterator[Solution]:
+        '''
+        Runs the search and yields the initial solution, each new best solution
+        and finally the best solution found (the same solution object is modified by the search).
+        '''
+        params = {'max_iterations': 200, **self._params, **params}
+        budget = Budget(params)
+        rng = random.Random(params.get('seed'))
+        np_rng = np.random.default_rng(rng.getrandbits(64))
+        batch_size = params.get('batch_size', 256)
+        moves_per_level = params.get('moves_per_level', 512)
+        min_temperature = params.get('min_temperature', 0.01)
+        reheat = params.get('reheat', 0.5)
+        reheat_after = params.get('reheat_after', 20)
+
+        sol = InitClass(params).run(instance, params)
+        sol.configure(params)
+        if not isinstance(NeighborClass, (list, tuple)):
+            NeighborClass = [NeighborClass]
+        neighborhood_params = {**params, 'deadline': budget.deadline}
+        neighborhoods = [Neighborhood(instance, neighborhood_params) for Neighborhood in NeighborClass]
+        yield sol
+
+        t0 = params.get('t0')
+        if t0 is None:
+            t0 = self._initial_temperature(sol, neighborhoods, rng, TEMPERATURE_SAMPLE)
+        temperature_at = cooling_schedule(params.get('cooling', 'geometric'), t0, params.get('alpha', 0.95))
+
+        value = best_value = sol.value
+        best = sol.snapshot()
+        level = 0          # Nombre de paliers de température depuis le dernier réchauffage
+        iteration = 0
+        no_improvement = 0
+        temperature = t0
+        # Tirages exponentiels des seuils d'acceptation, utilisés dans l'ordre
+        exponentials: List[float] = []
+        while not budget.exhausted(iteration, no_improvement):
+            improved = False
+            evaluated = 0
+            while evaluated < moves_per_level and not budget.expired:
+                move = self._draw(sol, neighborhoods, rng)
+                if move is None:
+                    break
+                evaluated += 1
+                delta = sol.delta(move)
+                if delta is None:
+                    continue
+                if delta[3] > 0:
+                    # Critère de Metropolis : delta <= -T ln(u) avec probabilité exp(-delta / T)
+                    if not exponentials:
+                        exponentials = np_rng.standard_exponential(batch_size).tolist()[::-1]
+                    if delta[3] > temperature * exponentials.pop():
+                        continue
+                sol.apply(move)
+                value += delta[3]
+                if value < best_value:
+                    best_value = value
+                    best = sol.snapshot()
+                    improved = True
+                    yield sol
+            if evaluated == 0:
+                break
+
+            iteration += 1
+            no_improvement = 0 if improved else no_improvement + 1
+            level += 1
+            if reheat > 0 and no_improvement and no_improvement % reheat_after == 0:
+                temperature_at = cooling_schedule(params.get('cooling', 'geometric'), reheat * t0,
+                                                  params.get('alpha', 0.95))
+                level = 0
+            temperature = temperature_at(level)
+            if temperature < min_temperature:
+                break
+
+        if sol.value != best_value:
+            sol.restore(best)
+            yield sol
+
+
+if __name__ == "__main__":
+    # To play with the simulated annealing
+    from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+    import os
+    inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+    sol = SimulatedAnnealing({'max_iterations': 50}).run(inst, NonDeterminist, [MyNeighborhood1, MyNeighborhood2])
+    print(sol)
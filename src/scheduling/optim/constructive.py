@@ -3,17 +3,63 @@ Constructive heuristics that returns preferably **feasible** solutions.
 
 @author: Vassilissa Lehoux
 '''
-from typing import Dict
+from typing import Dict, List, Tuple
 import random
 
 from src.scheduling.instance.instance import Instance
+from src.scheduling.instance.operation import Operation
+from src.scheduling.instance.machine import Machine
 from src.scheduling.solution import Solution
 from src.scheduling.optim.heuristics import Heuristic
 
 
+def _candidates(sol: Solution, insertion: bool) -> List[Tuple[int, int, Operation, Machine]]:
+    '''
+    Returns (end time, energy, operation, machine) for each available operation
+    on each of its eligible machines, if it was scheduled now.
+    '''
+    candidates = []
+    for op in sol.available_operations:
+        for machine_id, (duration, energy) in op.machine_options.items():
+            machine = sol.inst.get_machine(machine_id)
+            end_time = sol.earliest_start(op, machine, insertion) + duration
+            candidates.append((end_time, energy, op, machine))
+    return candidates
+
+
+def _greedy_choice(sol: Solution, insertion: bool) -> Tuple[Operation, Machine]:
+    '''
+    Returns the available operation and the machine that finish the earliest (ties broken by
+    energy, operation id then machine id), None if all the operations are scheduled.
+    The machines of an operation are taken from the fastest (Instance.fastest_machines):
+    once its ready time plus the processing time is after the best end time, the
+    following machines can not finish earlier and are not evaluated.
+    '''
+    best, choice = None, None
+    for op in sol.available_operations:
+        ready_time = op.min_start_time
+        for machine_id in sol.inst.fastest_machines(op):
+            duration, energy = op.machine_options[machine_id]
+            if best is not None and ready_time + duration > best[0]:
+                break
+            machine = sol.inst.get_machine(machine_id)
+            key = (sol.earliest_start(op, machine, insertion) + duration, energy, op.operation_id, machine_id)
+            if best is None or key < best:
+                best, choice = key, (op, machine)
+    return choice
+
+
 class Greedy(Heuristic):
     '''
     A deterministic greedy method to return a solution.
+    At each step, it schedules the available operation and the machine
+    that finish the earliest (ties broken by energy consumption):
+    the choice is never reconsidered.
+    With n operations, j jobs and m machines, each step evaluates at most j * m
+    pairs (O(log n) each for the start time), hence O(n * j * m * log n); the machines
+    that can not finish before the best pair found are skipped (see _greedy_choice).
+    Parameters:
+      - insertion (False): operations can be inserted in the idle gaps of the machines
     '''
 
     def __init__(self, params: Dict=dict()):
@@ -22,7 +68,7 @@ class Greedy(Heuristic):
         @param params: The parameters of your heuristic method if any as a
                dictionary. Implementation should provide default values in the function.
         '''
-        pass
+        self._params = params
 
     def run(self, instance: Instance, params: Dict=dict()) -> Solution:
         '''
@@ -33,13 +79,28 @@ class Greedy(Heuristic):
         @param instance: the instance to solve
         @param params: the parameters for the run
         '''
-        pass
+        params = {**self._params, **params}
+        insertion = params.get('insertion', False)
+
+        sol = Solution(instance, params)
+        choice = _greedy_choice(sol, insertion)
+        while choice is not None:
+            sol.schedule(*choice, insertion)
+            choice = _greedy_choice(sol, insertion)
+        return sol
 
 
 class NonDeterminist(Heuristic):
     '''
     Heuristic that returns different values for different runs with the same parameters
     (or different values for different seeds and otherwise same parameters)
+    Randomized version of the greedy heuristic (GRASP construction): at each step,
+    the (operation, machine) pair is drawn among the pairs whose end time is at most
+    best + alpha * (worst - best). Same complexity as Greedy.
+    Parameters:
+      - alpha (0.3): 0 gives the greedy choice (with random ties), 1 a uniform choice
+      - seed (None): seed of the random generator
+      - insertion (False): operations can be inserted in the idle gaps of the machines
     '''
 
     def __init__(self, params: Dict=dict()):
@@ -48,7 +109,7 @@ class NonDeterminist(Heuristic):
         @param params: The parameters of your heuristic method if any as a
                dictionary. Implementation should provide default values in the function.
         '''
-        raise "Not implemented error"
+        self._params = params
 
     def run(self, instance: Instance, params: Dict=dict()) -> Solution:
         '''
@@ -59,7 +120,21 @@ class NonDeterminist(Heuristic):
         @param instance: the instance to solve
         @param params: the parameters for the run
         '''
-        raise "Not implemented error"
+        params = {**self._params, **params}
+        alpha = params.get('alpha', 0.3)
+        insertion = params.get('insertion', False)
+        rng = random.Random(params.get('seed'))
+
+        sol = Solution(instance, params)
+        candidates = _candidates(sol, insertion)
+        while candidates:
+            best = min(c[0] for c in candidates)
+            worst = max(c[0] for c in candidates)
+            threshold = best + alpha * (worst - best)
+            _, _, op, machine = rng.choice([c for c in candidates if c[0] <= threshold])
+            sol.schedule(op, machine, insertion)
+            candidates = _candidates(sol, insertion)
+        return sol
 
 
 if __name__ == "__main__":
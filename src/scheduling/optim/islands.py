@@ -0,0 +1,279 @@
+'''
+Island model: several processes run a metaheuristic from different random starts
+and periodically send their best solution to the next island (ring migration).
+
+@author: Vassilissa Lehoux
+'''
+from typing import Dict, List, Tuple
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+import numpy as np
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.solution import Solution
+from src.scheduling.optim.heuristics import Heuristic
+from src.scheduling.optim.constructive import NonDeterminist
+from src.scheduling.optim.local_search import FirstNeighborLocalSearch
+from src.scheduling.optim.neighborhoods import MyNeighborhood2
+from src.scheduling.optim.multistart import run_seeds, load_instance
+
+
+# Attente maximale d'un message des îles avant de vérifier qu'elles sont encore en vie, en secondes
+POLL_INTERVAL = 0.5
+
+
+class Migrant(object):
+    '''
+    Best solution of an island, in a compact form sent between the processes:
+    the schedule is stored in NumPy arrays following the order of instance.operations
+    and instance.machines (identical in all the processes), instead of a graph of objects.
+      - schedule: (machine id, start time) of each operation, (-1, -1) if not scheduled
+      - cycle_counts: number of start times of each machine
+      - stop_counts: number of stop times of each machine (one less than cycle_counts
+        for a machine still running)
+      - cycle_times: start times then stop times of the machines, concatenated
+    '''
+    __slots__ = ('island', 'elapsed', 'feasible', 'objective', 'schedule', 'cycle_counts', 'stop_counts',
+                 'cycle_times')
+
+    def __init__(self, island: int, elapsed: float, sol: Solution):
+        self.island = island
+        self.elapsed = elapsed
+        self.feasible = sol.is_feasible
+        self.objective = sol.objective
+        instance = sol.inst
+        assignment = sol.assignment
+        self.schedule = np.array([assignment.get((op.job_id, op.operation_id), (-1, -1))
+                                  for op in instance.operations], dtype=np.int64).reshape(-1, 2)
+        cycles = sol.cycles
+        starts = [cycles[machine.machine_id][0] for machine in instance.machines]
+        stops = [cycles[machine.machine_id][1] for machine in instance.machines]
+        self.cycle_counts = np.array([len(times) for times in starts], dtype=np.int64)
+        self.stop_counts = np.array([len(times) for times in stops], dtype=np.int64)
+        self.cycle_times = np.array([t for times in starts + stops for t in times], dtype=np.int64)
+
+    def better_than(self, other: 'Migrant') -> bool:
+        '''
+        Returns True if the migrant is better than other (None is worse than any migrant):
+        feasible first, then lowest objective
+        '''
+        if other is None:
+            return True
+        return (not self.feasible, self.objective) < (not other.feasible, other.objective)
+
+    def load(self, sol: Solution):
+        '''
+        Replaces the schedule of the solution (of a copy of the instance) by the one of the migrant
+        '''
+        instance = sol.inst
+        assignment = {(op.job_id, op.operation_id): (int(machine_id), int(start))
+                      for op, (machine_id, start) in zip(instance.operations, self.schedule.tolist())
+                      if machine_id >= 0}
+        times = self.cycle_times.tolist()
+        cycles = {}
+        start_offset = 0
+        stop_offset = int(self.cycle_counts.sum())
+        for machine, count, stop_count in zip(instance.machines, self.cycle_counts.tolist(),
+                                              self.stop_counts.tolist()):
+            cycles[machine.machine_id] = (times[start_offset:start_offset + count],
+                                          times[stop_offset:stop_offset + stop_count])
+            start_offset += count
+            stop_offset += stop_count
+        sol.load(assignment, cycles)
+
+    def __str__(self):
+        return f"island {self.island} ({self.elapsed:.2f}s): objective={self.objective}, feasible={self.feasible}"
+
+    def __repr__(self):
+        return str(self)
+
+
+class _Immigrant(Heuristic):
+    '''
+    Initialization of a run of an island from the migrant given in the parameter 'start'
+    '''
+
+    def __init__(self, params: Dict=dict()):
+        self._params = params
+
+    def run(self, instance: Instance, params: Dict=dict()) -> Solution:
+        params = {**self._params, **params}
+        sol = Solution(instance, params)
+        params['start'].load(sol)
+        return sol
+
+
+def _island(island: int, seed: int, folderpath: str, name: str, arrays, use_cache: bool, HeuristicClass, InitClass,
+            NeighborClass, params: Dict, time_limit: float, interval: float,
+            inbox: multiprocessing.Queue, outbox: multiprocessing.Queue):
+    '''
+    Process of an island: runs the heuristic until time_limit, sends its best solution every
+    interval seconds, then its trajectory. A run starts from a received migrant better than
+    the best solution of the island, else from the result of the previous run if it was
+    interrupted by the migration, else from a random start.
+    '''
+    origin = time.perf_counter()
+    instance = load_instance(folderpath, name, arrays, use_cache)
+    heuristic = HeuristicClass(params)
+    rng = random.Random(seed)
+    best, immigrant, interrupted = None, None, None
+    # (temps écoulé, objectif) à chaque amélioration de la meilleure solution de l'île
+    trajectory: List[Tuple[float, float]] = []
+    runs = 0
+    next_migration = origin + interval
+    while time.perf_counter() - origin < time_limit:
+        run_end = min(next_migration, origin + time_limit)
+        run_params = {'seed': rng.getrandbits(32), 'time_limit': max(0.0, run_end - time.perf_counter())}
+        Init = InitClass
+        start = immigrant if immigrant is not None else interrupted
+        if start is not None:
+            Init, run_params['start'], immigrant = _Immigrant, start, None
+        sol = heuristic.run(instance, Init, NeighborClass, run_params)
+        runs += 1
+        result = Migrant(island, time.perf_counter() - origin, sol)
+        interrupted = result if time.perf_counter() >= run_end else None
+        if result.better_than(best):
+            best = result
+            trajectory.append((result.elapsed, result.objective))
+
+        # Les migrants reçus entre deux runs ne sont utilisés que s'ils améliorent l'île
+        try:
+            while True:
+                migrant = inbox.get_nowait()
+                if migrant.better_than(best) and migrant.better_than(immigrant):
+                    immigrant = migrant
+        except queue.Empty:
+            pass
+        if time.perf_counter() >= next_migration:
+            outbox.put(('best', island, best))
+            next_migration = time.perf_counter() + interval
+    outbox.put(('done', island, (best, trajectory, runs)))
+
+
+class IslandModel(Heuristic):
+    '''
+    Island model. Each island is a process running a metaheuristic (FirstNeighborLocalSearch
+    by default) from NonDeterminist starts with its own seeds. Every interval seconds, an island
+    sends its best solution to the coordinator, which forwards it to the next island (ring):
+    the next run of that island starts from it if it is better than its own best solution.
+    A run interrupted by a migration is resumed by the next run.
+    The solutions are sent as Migrant objects (NumPy arrays), not as Solution objects.
+    The coordinator keeps the global best and the trajectory of each island. An island whose
+    process fails (exception, killed process) is dropped: it has no trajectory.
+    Parameters:
+      - islands (nb of cores): number of islands (processes)
+      - time_limit (10): duration of the search in seconds
+      - interval (1): time between two migrations of an island, in seconds (the runs of the
+        heuristic are limited to the time left before the next migration)
+      - seed (0): seed from which the seeds of the islands are generated
+      - heuristic (FirstNeighborLocalSearch): class of the metaheuristic, its run must take
+        (instance, InitClass, NeighborClass, params) and accept 'seed' and 'time_limit' parameters
+      - init (NonDeterminist): class of the initialization of the runs
+      - neighborhoods (MyNeighborhood2): class or list of classes of the neighborhoods
+      - callback (None): function called by the coordinator with each received Migrant
+      - use_cache (False): the islands load the instance through its binary cache (see Instance.from_file)
+      - the other parameters are given to the heuristic
+    '''
+
+    def __init__(self, params: Dict=dict()):
+        '''
+        Constructor
+        @param params: The parameters of your heuristic method if any as a
+               dictionary. Implementation should provide default values in the function.
+        '''
+        self._params = params
+
+    def run(self, instance: Instance, params: Dict=dict()) -> Solution:
+        '''
+        Computes a solution for the given instance.
+        Implementation should provide default values in the function
+        (the function will be evaluated with an empty dictionary).
+
+        @param instance: the instance to solve
+        @param params: the parameters for the run
+        '''
+        best, _ = self.run_results(instance, params)
+        if best is None:
+            raise RuntimeError("Toutes les îles ont échoué")
+        sol = Solution(instance, {**self._params, **params})
+        best.load(sol)
+        return sol
+
+    def run_results(self, instance: Instance,
+                    params: Dict=dict()) -> Tuple[Migrant, Dict[int, List[Tuple[float, float]]]]:
+        '''
+        Runs the islands and returns the global best solution and the trajectory of each island:
+        the list of (elapsed time, objective) of the improvements of its best solution.
+        The best solution is None if all the islands failed.
+        '''
+        params = {**self._params, **params}
+        islands = params.get('islands') or os.cpu_count() or 1
+        time_limit = params.get('time_limit', 10)
+        interval = params.get('interval', 1)
+        callback = params.get('callback')
+        heuristic_params = {key: value for key, value in params.items()
+                            if key not in ('islands', 'time_limit', 'interval', 'seed', 'heuristic',
+                                           'init', 'neighborhoods', 'callback', 'use_cache')}
+
+        folderpath = instance.folderpath
+        arrays = None if folderpath is not None else instance.as_arrays()
+        outbox = multiprocessing.Queue()
+        inboxes = [multiprocessing.Queue() for _ in range(islands)]
+        processes = []
+        for island, seed in enumerate(run_seeds(params.get('seed', 0), islands)):
+            process = multiprocessing.Process(
+                target=_island,
+                args=(island, seed, folderpath, instance.name, arrays, params.get('use_cache', False),
+                      params.get('heuristic', FirstNeighborLocalSearch), params.get('init', NonDeterminist),
+                      params.get('neighborhoods', MyNeighborhood2), heuristic_params, time_limit, interval,
+                      inboxes[island], outbox),
+                daemon=True)
+            process.start()
+            processes.append(process)
+
+        best = None
+        trajectories = {}
+        running = set(range(islands))
+        try:
+            while running:
+                try:
+                    kind, island, content = outbox.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    # Une île terminée normalement a envoyé 'done' avant de s'arrêter
+                    running.difference_update([island for island in running
+                                               if processes[island].exitcode not in (None, 0)])
+                    continue
+                if kind == 'done':
+                    running.discard(island)
+                    content, trajectories[island], _ = content
+                else:
+                    following = (island + 1) % islands
+                    if following != island and following in running:
+                        inboxes[following].put(content)
+                if content is None:
+                    continue
+                if callback is not None:
+                    callback(content)
+                if content.better_than(best):
+                    best = content
+        finally:
+            # Les migrants non lus par une île terminée ne doivent pas bloquer la fin du coordinateur
+            for inbox in inboxes:
+                inbox.cancel_join_thread()
+            for process in processes:
+                process.join()
+        return best, trajectories
+
+
+if __name__ == "__main__":
+    # Islands of local searches on all the cores
+    from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+    inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+    best, trajectories = IslandModel({'time_limit': 5}).run_results(inst)
+    print(f"best: {best}")
+    for island, trajectory in sorted(trajectories.items()):
+        print(island, trajectory)
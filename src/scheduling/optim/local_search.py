@@ -4,7 +4,8 @@ then improve it.
 
 @author: Vassilissa Lehoux
 '''
-from typing import Dict
+from typing import Callable, Dict, Iterator
+import time
 
 from src.scheduling.optim.heuristics import Heuristic
 from src.scheduling.instance.instance import Instance
@@ -13,6 +14,54 @@ from src.scheduling.optim.constructive import NonDeterminist
 from src.scheduling.optim.neighborhoods import MyNeighborhood1
 
 
+class Budget(object):
+    '''
+    Stopping criteria of an iterative search, read from the parameters of the run:
+      - time_limit (None): wall-clock time limit in seconds, from the creation of the budget
+      - max_iterations (None): maximum number of iterations
+      - max_no_improvement (None): maximum number of consecutive iterations without improvement
+    Checking the budget reads the clock once.
+    '''
+
+    def __init__(self, params: Dict=dict()):
+        '''
+        Constructor
+        '''
+        time_limit = params.get('time_limit')
+        self.deadline: float = time.perf_counter() + time_limit if time_limit is not None else None
+        self.max_iterations: int = params.get('max_iterations')
+        self.max_no_improvement: int = params.get('max_no_improvement')
+
+    @property
+    def expired(self) -> bool:
+        '''
+        Returns True if the time limit is reached
+        '''
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def exhausted(self, iteration: int, no_improvement: int=0) -> bool:
+        '''
+        Returns True if the search must stop after iteration iterations,
+        the last no_improvement of them without improvement
+        '''
+        if self.max_iterations is not None and iteration >= self.max_iterations:
+            return True
+        if self.max_no_improvement is not None and no_improvement >= self.max_no_improvement:
+            return True
+        return self.expired
+
+
+def _run(iterations: Iterator[Solution], callback: Callable[[int, Solution], None]) -> Solution:
+    '''
+    Consumes the incumbents of a search and returns the last one
+    '''
+    sol = None
+    for step, sol in enumerate(iterations):
+        if callback is not None:
+            callback(step, sol)
+    return sol
+
+
 class FirstNeighborLocalSearch(Heuristic):
     '''
     Vanilla local search will first create a solution,
@@ -22,6 +71,17 @@ class FirstNeighborLocalSearch(Heuristic):
     replaces it.
     The algorithm stops when no solution is better than the current solution
     in its neighborhood.
+    It can be stopped earlier (anytime mode, the current solution being the best so far):
+      - time_limit (None): time limit in seconds (the exploration of a neighborhood
+        is interrupted at the deadline)
+      - max_iterations (None): maximum number of steps
+      - max_no_improvement (None): see Budget (a step without improvement ends the search anyway)
+      - callback (None): function called with (step, solution) for the initial solution
+        and after each improvement
+      - penalty_weight (0): weight of the violated constraints in the value optimized by the search
+        (see Solution.configure)
+      - plan_cycles (False): the machines are stopped during their idle times when it saves energy
+        (see Solution.configure)
     '''
 
     def __init__(self, params: Dict=dict()):
@@ -30,7 +90,7 @@ class FirstNeighborLocalSearch(Heuristic):
         @param params: The parameters of your heuristic method if any as a
                dictionary. Implementation should provide default values in the function.
         '''
-        raise "Not implemented error"
+        self._params = params
 
     def run(self, instance: Instance, InitClass, NeighborClass, params: Dict=dict()) -> Solution:
         '''
@@ -41,9 +101,35 @@ class FirstNeighborLocalSearch(Heuristic):
         @param instance: the instance to solve
         @param InitClass: the class for the heuristic computing the initialization
         @param NeighborClass: the class of neighborhood used in the vanilla local search
-        @param params: the parameters for the run
+        @param params: the parameters for the run, also given to the initialization
+          and to the neighborhood
+        '''
+        return _run(self.iterate(instance, InitClass, NeighborClass, params),
+                    {**self._params, **params}.get('callback'))
+
+    def iterate(self, instance: Instance, InitClass, NeighborClass, params: Dict=dict()) -> Iterator[Solution]:
         '''
-        raise "Not implemented error"
+        Runs the search and yields the incumbent: the initial solution, then the solution
+        after each improvement. The same solution object is modified by the search
+        (see Solution.clone to keep an incumbent).
+        '''
+        params = {**self._params, **params}
+        budget = Budget(params)
+        sol = InitClass(params).run(instance, params)
+        sol.configure(params)
+        neighborhood = NeighborClass(instance, {**params, 'deadline': budget.deadline})
+        yield sol
+
+        value = sol.value
+        iteration = 0
+        while not budget.exhausted(iteration):
+            sol = neighborhood.first_better_neighbor(sol)
+            iteration += 1
+            new_value = sol.value
+            if new_value >= value:
+                return
+            value = new_value
+            yield sol
 
 
 class BestNeighborLocalSearch(Heuristic):
@@ -55,6 +141,21 @@ class BestNeighborLocalSearch(Heuristic):
     replaces it.
     The algorithm stops when no solution is better than the current solution
     in its neighborhood.
+    Several neighborhoods can be given: the best neighbor of each of them is
+    taken in turn (the algorithm stops when none improves the solution).
+    Parameters:
+      - max_iterations (None): maximum number of improving steps (rounds over the neighborhoods)
+      - time_limit (None): time limit in seconds (the exploration of a neighborhood
+        is interrupted at the deadline)
+      - max_no_improvement (None): maximum number of consecutive neighborhood explorations
+        without improvement
+      - callback (None): function called with (step, solution) for the initial solution
+        and after each improvement
+      - penalty_weight (0): weight of the violated constraints in the value optimized by the search
+        (see Solution.configure)
+      - plan_cycles (False): the machines are stopped during their idle times when it saves energy
+        (see Solution.configure)
+    The current solution is always the best so far: the search can be stopped at any time.
     '''
 
     def __init__(self, params: Dict=dict()):
@@ -63,7 +164,7 @@ class BestNeighborLocalSearch(Heuristic):
         @param params: The parameters of your heuristic method if any as a
                dictionary. Implementation should provide default values in the function.
         '''
-        raise "Not implemented error"
+        self._params = params
 
     def run(self, instance: Instance, InitClass, NeighborClass, params: Dict=dict()) -> Solution:
         '''
@@ -73,10 +174,49 @@ class BestNeighborLocalSearch(Heuristic):
 
         @param instance: the instance to solve
         @param InitClass: the class for the heuristic computing the initialization
-        @param NeighborClass: the class of neighborhood used in the vanilla local search
-        @param params: the parameters for the run
+        @param NeighborClass: the class of neighborhood used in the vanilla local search,
+          or a list of neighborhood classes
+        @param params: the parameters for the run, also given to the initialization
+          and to the neighborhoods
         '''
-        raise "Not implemented error"
+        return _run(self.iterate(instance, InitClass, NeighborClass, params),
+                    {**self._params, **params}.get('callback'))
+
+    def iterate(self, instance: Instance, InitClass, NeighborClass, params: Dict=dict()) -> Iterator[Solution]:
+        '''
+        Runs the search and yields the incumbent: the initial solution, then the solution
+        after each improvement. The same solution object is modified by the search
+        (see Solution.clone to keep an incumbent).
+        '''
+        params = {**self._params, **params}
+        budget = Budget(params)
+        sol = InitClass(params).run(instance, params)
+        sol.configure(params)
+        if not isinstance(NeighborClass, (list, tuple)):
+            NeighborClass = [NeighborClass]
+        neighborhood_params = {**params, 'deadline': budget.deadline}
+        neighborhoods = [Neighborhood(instance, neighborhood_params) for Neighborhood in NeighborClass]
+        yield sol
+
+        value = sol.value
+        iteration = 0
+        no_improvement = 0
+        improved = True
+        while improved and not budget.exhausted(iteration):
+            improved = False
+            for neighborhood in neighborhoods:
+                sol = neighborhood.best_neighbor(sol)
+                new_value = sol.value
+                if new_value < value:
+                    value = new_value
+                    improved = True
+                    no_improvement = 0
+                    yield sol
+                else:
+                    no_improvement += 1
+                if budget.exhausted(iteration, no_improvement):
+                    return
+            iteration += 1
 
 
 if __name__ == "__main__":
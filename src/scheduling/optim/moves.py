@@ -0,0 +1,135 @@
+'''
+Moves used by the neighborhoods.
+A move modifies a complete solution: it is described by the new sequences of
+operations of the machines it changes. The start times are then recomputed by
+Solution.delta (without applying the move) or Solution.apply.
+
+@author: Vassilissa Lehoux
+'''
+from typing import Dict, List, Tuple
+from abc import ABC, abstractmethod
+
+from src.scheduling.instance.operation import Operation
+
+
+def _op_key(op: Operation) -> Tuple[int, int]:
+    return (op.job_id, op.operation_id)
+
+
+class Move(ABC):
+    '''
+    Base class of the moves.
+    '''
+
+    @abstractmethod
+    def machine_sequences(self, sol) -> Dict[int, List[Operation]]:
+        '''
+        Returns the new sequence of operations of each machine modified by the move,
+        indexed by machine id.
+        '''
+        pass
+
+    @property
+    @abstractmethod
+    def key(self) -> Tuple:
+        '''
+        Compact description of the move
+        '''
+        pass
+
+    @abstractmethod
+    def attribute(self, sol) -> Tuple:
+        '''
+        Hashable description of what the move establishes in the solution
+        (used by the tabu search), computed before the move is applied
+        '''
+        pass
+
+    @abstractmethod
+    def reverse_attribute(self, sol) -> Tuple:
+        '''
+        Attribute of the moves undoing this move, computed before the move is applied
+        '''
+        pass
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.key == other.key
+
+    def __hash__(self):
+        return hash((type(self).__name__, self.key))
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.key}"
+
+
+class Swap(Move):
+    '''
+    Swaps the operations at positions position and position + 1 on a machine.
+    '''
+
+    def __init__(self, machine_id: int, position: int):
+        self._machine_id = machine_id
+        self._position = position
+
+    def machine_sequences(self, sol) -> Dict[int, List[Operation]]:
+        sequence = list(sol.inst.get_machine(self._machine_id).scheduled_operations)
+        i = self._position
+        sequence[i], sequence[i + 1] = sequence[i + 1], sequence[i]
+        return {self._machine_id: sequence}
+
+    @property
+    def key(self) -> Tuple:
+        return (self._machine_id, self._position)
+
+    def _pair(self, sol) -> Tuple[Operation, Operation]:
+        operations = sol.inst.get_machine(self._machine_id).scheduled_operations
+        return operations[self._position], operations[self._position + 1]
+
+    def attribute(self, sol) -> Tuple:
+        # L'opération suivante passe avant la précédente
+        first, second = self._pair(sol)
+        return ('before', _op_key(second), _op_key(first))
+
+    def reverse_attribute(self, sol) -> Tuple:
+        first, second = self._pair(sol)
+        return ('before', _op_key(first), _op_key(second))
+
+
+class Reassign(Move):
+    '''
+    Moves an operation at a given position of the sequence of a machine
+    (possibly its own machine).
+    '''
+
+    def __init__(self, operation: Operation, machine_id: int, position: int):
+        self._operation = operation
+        self._machine_id = machine_id
+        self._position = position
+
+    @property
+    def operation(self) -> Operation:
+        return self._operation
+
+    def machine_sequences(self, sol) -> Dict[int, List[Operation]]:
+        op = self._operation
+        old_machine_id = op.assigned_to
+        old_sequence = [o for o in sol.inst.get_machine(old_machine_id).scheduled_operations if o is not op]
+        if old_machine_id == self._machine_id:
+            new_sequence = old_sequence
+            sequences = {}
+        else:
+            new_sequence = list(sol.inst.get_machine(self._machine_id).scheduled_operations)
+            sequences = {old_machine_id: old_sequence}
+        new_sequence.insert(self._position, op)
+        sequences[self._machine_id] = new_sequence
+        return sequences
+
+    @property
+    def key(self) -> Tuple:
+        return (self._operation.job_id, self._operation.operation_id, self._machine_id, self._position)
+
+    def attribute(self, sol) -> Tuple:
+        return ('machine', _op_key(self._operation), self._machine_id)
+
+    def reverse_attribute(self, sol) -> Tuple:
+        return ('machine', _op_key(self._operation), self._operation.assigned_to)
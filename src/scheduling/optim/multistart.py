@@ -0,0 +1,189 @@
+'''
+Multi-start of a non deterministic heuristic: seeded runs are spread over
+a pool of processes and the best solution is kept.
+
+@author: Vassilissa Lehoux
+'''
+from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import os
+import time
+
+import numpy as np
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.solution import Solution
+from src.scheduling.optim.heuristics import Heuristic
+from src.scheduling.optim.constructive import NonDeterminist
+
+
+class RunResult(object):
+    '''
+    Compact result of a run, sent back by the workers:
+    the run number and its seed, the objective values and the schedule
+    (see Solution.assignment and Solution.cycles).
+    '''
+    __slots__ = ('run', 'seed', 'feasible', 'objective', 'cmax', 'sum_ci',
+                 'total_energy_consumption', 'assignment', 'cycles')
+
+    def __init__(self, run: int, seed: int, sol: Solution):
+        self.run = run
+        self.seed = seed
+        self.feasible = sol.is_feasible
+        self.objective = sol.objective
+        self.cmax = sol.cmax
+        self.sum_ci = sol.sum_ci
+        self.total_energy_consumption = sol.total_energy_consumption
+        self.assignment = sol.assignment
+        self.cycles = sol.cycles
+
+    def better_than(self, other: 'RunResult') -> bool:
+        '''
+        Returns True if the result is better than other (None is worse than any result):
+        feasible first, then lowest objective, then lowest run number.
+        '''
+        if other is None:
+            return True
+        return (not self.feasible, self.objective, self.run) < (not other.feasible, other.objective, other.run)
+
+    def __str__(self):
+        return f"run {self.run} (seed {self.seed}): objective={self.objective}, feasible={self.feasible}"
+
+    def __repr__(self):
+        return str(self)
+
+
+# Instance et heuristique d'un processus du pool, créées une fois par l'initialiseur
+_worker_instance: Instance = None
+_worker_heuristic: Heuristic = None
+
+
+def load_instance(folderpath: str, name: str, arrays, use_cache: bool=False) -> Instance:
+    '''
+    Loads the instance from its folder (through its cache if use_cache) or from its arrays
+    '''
+    if folderpath is not None:
+        return Instance.from_file(folderpath, use_cache)
+    return Instance.from_arrays(name, arrays)
+
+
+def _init_worker(folderpath: str, name: str, arrays, use_cache: bool, HeuristicClass, params: Dict):
+    global _worker_instance, _worker_heuristic
+    _worker_instance = load_instance(folderpath, name, arrays, use_cache)
+    _worker_heuristic = HeuristicClass(params)
+
+
+def _worker_run(run: int, seed: int) -> RunResult:
+    sol = _worker_heuristic.run(_worker_instance, {'seed': seed})
+    return RunResult(run, seed, sol)
+
+
+def run_seeds(seed: int, runs: int) -> List[int]:
+    '''
+    Returns the seeds of the runs of a multi-start: they only depend on seed
+    (and not on the number of processes), and the random streams are independent.
+    '''
+    return [int(s) for s in np.random.SeedSequence(seed).generate_state(runs)]
+
+
+class MultiStart(Heuristic):
+    '''
+    Runs a non deterministic heuristic (NonDeterminist by default) several times with
+    different seeds and keeps the best solution. The runs are executed by a pool of
+    processes, each process loading the instance once (with use_cache, the binary cache
+    of the instance is memory-mapped, so its pages are shared). Only the objective and the schedule of the
+    runs are sent back: the time is spent in the runs and scales with the number of cores.
+    The run i always uses the same seed: with a number of runs, the result does not depend
+    on the number of processes.
+    Parameters:
+      - runs (10): maximum number of runs (None for no limit, a time limit must then be given)
+      - time_limit (None): no run is started after time_limit seconds (the runs already submitted
+        are finished)
+      - workers (nb of cores): number of processes, 1 runs everything in the calling process
+      - seed (0): seed from which the seeds of the runs are generated
+      - heuristic (NonDeterminist): class of the heuristic, its run must accept a 'seed' parameter
+      - use_cache (False): the processes load the instance through its binary cache
+        (see Instance.from_file), built in the folder of the instance if needed
+      - the other parameters are given to the heuristic
+    '''
+
+    def __init__(self, params: Dict=dict()):
+        '''
+        Constructor
+        @param params: The parameters of your heuristic method if any as a
+               dictionary. Implementation should provide default values in the function.
+        '''
+        self._params = params
+
+    def run(self, instance: Instance, params: Dict=dict()) -> Solution:
+        '''
+        Computes a solution for the given instance.
+        Implementation should provide default values in the function
+        (the function will be evaluated with an empty dictionary).
+
+        @param instance: the instance to solve
+        @param params: the parameters for the run
+        '''
+        best, _ = self.run_results(instance, params)
+        sol = Solution(instance, {**self._params, **params})
+        sol.load(best.assignment, best.cycles)
+        return sol
+
+    def run_results(self, instance: Instance, params: Dict=dict()) -> Tuple[RunResult, int]:
+        '''
+        Executes the runs and returns the best result and the number of runs done.
+        '''
+        params = {**self._params, **params}
+        runs = params.get('runs', 10)
+        time_limit = params.get('time_limit')
+        workers = params.get('workers') or os.cpu_count() or 1
+        HeuristicClass = params.get('heuristic', NonDeterminist)
+        heuristic_params = {key: value for key, value in params.items()
+                            if key not in ('runs', 'time_limit', 'workers', 'seed', 'heuristic', 'use_cache')}
+        assert runs is not None or time_limit is not None, "Il faut un nombre de runs ou une limite de temps"
+
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        # Les graines sont générées par blocs quand le nombre de runs n'est pas borné
+        seeds = run_seeds(params.get('seed', 0), runs if runs is not None else 1024)
+
+        def seed_of(run: int) -> int:
+            nonlocal seeds
+            while run >= len(seeds):
+                seeds = run_seeds(params.get('seed', 0), 2 * len(seeds))
+            return seeds[run]
+
+        def can_start(run: int) -> bool:
+            return (runs is None or run < runs) and (deadline is None or time.perf_counter() < deadline)
+
+        best = None
+        run = 0
+        if workers == 1:
+            heuristic = HeuristicClass(heuristic_params)
+            while can_start(run):
+                result = RunResult(run, seed_of(run), heuristic.run(instance, {'seed': seed_of(run)}))
+                if result.better_than(best):
+                    best = result
+                run += 1
+            return best, run
+
+        folderpath = instance.folderpath
+        arrays = None if folderpath is not None else instance.as_arrays()
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(folderpath, instance.name, arrays, params.get('use_cache', False),
+                                           HeuristicClass,
+                                           heuristic_params)) as pool:
+            # Deux runs en attente par processus suffisent à occuper le pool
+            pending = set()
+            while True:
+                while len(pending) < 2 * workers and can_start(run):
+                    pending.add(pool.submit(_worker_run, run, seed_of(run)))
+                    run += 1
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result.better_than(best):
+                        best = result
+        return best, run
+
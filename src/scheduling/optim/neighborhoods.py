@@ -4,10 +4,15 @@ They must derive from the Neighborhood class.
 
 @author: Vassilissa Lehoux
 '''
-from typing import Dict
+from typing import Dict, Iterator, List, Tuple
+from abc import ABC, abstractmethod
+import random
+import time
 
 from src.scheduling.instance.instance import Instance
+from src.scheduling.instance.operation import Operation
 from src.scheduling.solution import Solution
+from src.scheduling.optim.moves import Move, Swap, Reassign
 
 
 class Neighborhood(object):
@@ -37,53 +42,262 @@ class Neighborhood(object):
         raise "Not implemented error"
 
 
-class MyNeighborhood1(Neighborhood):
+# Nombre de mouvements évalués entre deux lectures de l'horloge
+DEADLINE_CHECK_PERIOD = 32
+
+
+def _until(moves: Iterator[Move], deadline: float) -> Iterator[Move]:
+    '''
+    Stops the iterator when time.perf_counter() reaches the deadline (None for no deadline)
+    '''
+    if deadline is None:
+        yield from moves
+        return
+    for count, move in enumerate(moves):
+        if count % DEADLINE_CHECK_PERIOD == 0 and time.perf_counter() >= deadline:
+            return
+        yield move
+
+
+def _evaluated(sol: Solution, moves: Iterator[Move],
+               deadline: float=None) -> Iterator[Tuple[Move, Tuple[int, int, int, int]]]:
+    '''
+    Yields the valid moves of the iterator with their delta, until the deadline
+    '''
+    for move in _until(moves, deadline):
+        delta = sol.delta(move)
+        if delta is not None:
+            yield move, delta
+
+
+def _best_move(evaluated_moves: Iterator[Tuple[Move, Tuple[int, int, int, int]]]) -> Move:
+    '''
+    Returns the move of the iterator that improves the most the objective, None if none improves it
+    (streaming reduction: only the best move is kept).
+    '''
+    best_move, best_delta = None, 0
+    for move, delta in evaluated_moves:
+        if delta[3] < best_delta:
+            best_move, best_delta = move, delta[3]
+    return best_move
+
+
+def _first_better_move(evaluated_moves: Iterator[Tuple[Move, Tuple[int, int, int, int]]]) -> Move:
+    '''
+    Returns the first move of the iterator that improves the objective, None if none improves it:
+    the following moves are not generated.
+    '''
+    for move, delta in evaluated_moves:
+        if delta[3] < 0:
+            return move
+    return None
+
+
+class MoveNeighborhood(Neighborhood, ABC):
     '''
-    Give the Neighborhood a meaningful name and add here a short description.
+    Base class of the neighborhoods described by their moves (see moves.py).
+    The neighbors are generated lazily with their Solution.delta (iter_moves) and the chosen
+    move is applied to the solution itself: the memory used does not depend on the size
+    of the neighborhood.
+    Subclasses implement moves, and random_move to be used by the simulated annealing.
     '''
 
     def __init__(self, instance: Instance, params: Dict=dict()):
         '''
         Constructor
+        @param params: 'deadline' (None): time.perf_counter() value at which the exploration
+          of the neighborhood stops
         '''
-        raise "Not implemented error"
+        super().__init__(instance, params)
+        self._deadline = params.get('deadline')
+
+    @abstractmethod
+    def moves(self, sol: Solution) -> Iterator[Move]:
+        '''
+        Returns the moves of the neighborhood of the solution
+        '''
+        pass
+
+    def random_move(self, sol: Solution, rng: random.Random) -> Move:
+        '''
+        Returns a move of the neighborhood of the solution drawn at random,
+        None if the drawn move is not valid (the caller draws again)
+        '''
+        raise NotImplementedError(f"{type(self).__name__} ne tire pas de mouvements aléatoires")
+
+    def iter_moves(self, sol: Solution) -> Iterator[Tuple[Move, Tuple[int, int, int, int]]]:
+        '''
+        Generates lazily the moves of the neighborhood of the solution with their delta,
+        until the deadline
+        '''
+        return _evaluated(sol, self.moves(sol), self._deadline)
 
     def best_neighbor(self, sol: Solution) -> Solution:
         '''
         Returns the best solution in the neighborhood of the solution.
         Can be the solution itself.
         '''
-        raise "Not implemented error"
+        move = _best_move(self.iter_moves(sol))
+        if move is not None:
+            sol.apply(move)
+        return sol
 
     def first_better_neighbor(self, sol: Solution) -> Solution:
         '''
         Returns the first solution in the neighborhood of the solution
         that improves other it and the solution itself if none is better.
         '''
-        raise "Not implemented error"
+        move = _first_better_move(self.iter_moves(sol))
+        if move is not None:
+            sol.apply(move)
+        return sol
+
+
+class MyNeighborhood1(MoveNeighborhood):
+    '''
+    Swap neighborhood: swaps two consecutive operations on a machine.
+    Its size is sum over the machines of (nb of operations on the machine - 1) <= nb of operations.
+    It does not change the assignment of the operations to the machines:
+    all the solutions can not be reached.
+    '''
+
+    def moves(self, sol: Solution) -> Iterator[Move]:
+        '''
+        Returns the moves of the neighborhood of the solution
+        '''
+        for machine in self._instance.machines:
+            operations = machine.scheduled_operations
+            for position in range(len(operations) - 1):
+                # Échanger deux opérations d'un même job crée un cycle
+                if operations[position] not in operations[position + 1].predecessors:
+                    yield Swap(machine.machine_id, position)
+
+    def random_move(self, sol: Solution, rng: random.Random) -> Move:
+        '''
+        Returns the swap of a random operation with the next one on its machine,
+        None if it is the last one or if they belong to the same job
+        '''
+        op = rng.choice(self._instance.operations)
+        timeline = self._instance.get_machine(op.assigned_to).timeline
+        following = timeline.next(op)
+        if following is None or op in following.predecessors:
+            return None
+        return Swap(op.assigned_to, timeline.index(op))
+
+
+class MyNeighborhood2(MoveNeighborhood):
+    '''
+    Reassignment neighborhood: moves an operation to any position of another eligible machine.
+    Its size is at most nb of operations * nb of machines * (nb of operations + 1),
+    polynomial in the size of the instance.
+    The machines of an operation are tried from the fastest (Instance.fastest_machines),
+    so that the first improving moves found are the most promising ones.
+    '''
+
+    def moves(self, sol: Solution) -> Iterator[Move]:
+        '''
+        Returns the moves of the neighborhood of the solution
+        '''
+        for op in self._instance.operations:
+            for machine_id in self._instance.fastest_machines(op):
+                if machine_id == op.assigned_to:
+                    continue
+                for position in range(len(self._instance.get_machine(machine_id).scheduled_operations) + 1):
+                    yield Reassign(op, machine_id, position)
+
+    def random_move(self, sol: Solution, rng: random.Random) -> Move:
+        '''
+        Returns the move of a random operation to a random position of another random eligible machine,
+        None if the operation has a single eligible machine
+        '''
+        op = rng.choice(self._instance.operations)
+        machine_ids = [machine_id for machine_id in self._instance.fastest_machines(op)
+                       if machine_id != op.assigned_to]
+        if not machine_ids:
+            return None
+        machine_id = rng.choice(machine_ids)
+        position = rng.randint(0, len(self._instance.get_machine(machine_id).scheduled_operations))
+        return Reassign(op, machine_id, position)
 
 
-class MyNeighborhood2(Neighborhood):
+class CriticalPathNeighborhood(MoveNeighborhood):
     '''
-    Give the Neighborhood a meaningful name and add here a short description.
+    Critical path neighborhood, for the makespan part of the objective: only the moves of the
+    operations of a critical path (see Solution.critical_path) can decrease the makespan.
+    It contains:
+      - the swaps of two consecutive operations of the critical path processed one after
+        the other on the same machine,
+      - the reassignments of an operation of the critical path to another eligible machine
+        (from the fastest, see Instance.fastest_machines), at the position matching its start
+        time or the positions just before and after.
+    Its size is at most 4 * nb of machines * length of the critical path, instead of
+    nb of operations * nb of machines * (nb of operations + 1) for MyNeighborhood2.
+    The critical path is recomputed only when the planning of a machine changed, and only from
+    its first operation on a changed machine. The positions on the machines are read
+    from their timelines (logarithmic).
     '''
 
     def __init__(self, instance: Instance, params: Dict=dict()):
         '''
         Constructor
+        @param params: 'deadline' (None): time.perf_counter() value at which the exploration
+          of the neighborhood stops
         '''
-        raise "Not implemented error"
+        super().__init__(instance, params)
+        # Chemin critique et versions des machines pour lesquelles il a été calculé
+        self._path: List[Operation] = []
+        self._versions: Tuple[int, ...] = None
+        # Mouvements du voisinage pour le chemin critique _moves_path (tirages aléatoires)
+        self._moves: List[Move] = []
+        self._moves_path: List[Operation] = None
 
-    def best_neighbor(self, sol: Solution) -> Solution:
+    def critical_path(self, sol: Solution) -> List[Operation]:
         '''
-        Returns the best solution in the neighborhood of the solution.
-        Can be the solution itself.
+        Returns the critical path of the solution, recomputed if a machine changed since the last call
         '''
-        raise "Not implemented error"
+        versions = self._machine_versions()
+        if not sol.is_active or self._versions is None:
+            self._path = sol.critical_path()
+        elif self._versions != versions:
+            changed = [machine.machine_id for machine, old, new in zip(self._instance.machines, self._versions, versions)
+                       if old != new]
+            self._path = sol.critical_path(self._path, changed)
+        else:
+            return self._path
+        self._versions = self._machine_versions()
+        return self._path
 
-    def first_better_neighbor(self, sol: Solution) -> Solution:
+    def _machine_versions(self) -> Tuple[int, ...]:
+        return tuple(machine.version for machine in self._instance.machines)
+
+    def moves(self, sol: Solution) -> Iterator[Move]:
         '''
-        Returns the first solution in the neighborhood of the solution
-        that improves other it and the solution itself if none is better.
+        Returns the moves of the neighborhood of the solution
         '''
-        raise "Not implemented error"
+        path = self.critical_path(sol)
+        for op, following in zip(path, path[1:]):
+            # Échanger deux opérations d'un même job crée un cycle
+            if following.assigned_to == op.assigned_to and op not in following.predecessors:
+                timeline = self._instance.get_machine(op.assigned_to).timeline
+                if timeline.next(op) is following:
+                    yield Swap(op.assigned_to, timeline.index(op))
+
+        for op in path:
+            for machine_id in self._instance.fastest_machines(op):
+                if machine_id == op.assigned_to:
+                    continue
+                timeline = self._instance.get_machine(machine_id).timeline
+                position = timeline.rank(op.start_time)
+                for p in range(max(0, position - 1), min(len(timeline), position + 1) + 1):
+                    yield Reassign(op, machine_id, p)
+
+    def random_move(self, sol: Solution, rng: random.Random) -> Move:
+        '''
+        Returns a random move of the neighborhood (the moves are listed again
+        only when the planning of a machine changed)
+        '''
+        path = self.critical_path(sol)
+        if self._moves_path is not path:
+            self._moves = list(self.moves(sol))
+            self._moves_path = path
+        return rng.choice(self._moves) if self._moves else None
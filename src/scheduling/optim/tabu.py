@@ -0,0 +1,163 @@
+'''
+Tabu search: a local search that moves at each step to the best neighbor
+that is not tabu, even if it is worse than the current solution.
+
+@author: Vassilissa Lehoux
+'''
+from typing import Dict, Hashable, Iterator, List
+
+from src.scheduling.optim.heuristics import Heuristic
+from src.scheduling.optim.local_search import Budget
+from src.scheduling.instance.instance import Instance
+from src.scheduling.solution import Solution
+from src.scheduling.optim.constructive import NonDeterminist
+from src.scheduling.optim.neighborhoods import MyNeighborhood1, MyNeighborhood2
+
+
+class TabuList(object):
+    '''
+    Tabu attributes of the last tenure moves: a ring buffer of fixed size
+    and the number of occurrences of each attribute in the buffer,
+    so that adding an attribute and testing if it is tabu are O(1).
+    '''
+
+    def __init__(self, tenure: int):
+        '''
+        Constructor
+        @param tenure: number of iterations during which an attribute stays tabu
+        '''
+        self._buffer: List[Hashable] = [None] * tenure
+        self._next: int = 0
+        self._counts: Dict[Hashable, int] = {}
+
+    def add(self, attribute: Hashable):
+        '''
+        Makes the attribute tabu, the oldest attribute of the list is no longer tabu
+        '''
+        if not self._buffer:
+            return
+        oldest = self._buffer[self._next]
+        if oldest is not None:
+            count = self._counts[oldest] - 1
+            if count:
+                self._counts[oldest] = count
+            else:
+                del self._counts[oldest]
+        self._buffer[self._next] = attribute
+        self._counts[attribute] = self._counts.get(attribute, 0) + 1
+        self._next = (self._next + 1) % len(self._buffer)
+
+    def __contains__(self, attribute: Hashable) -> bool:
+        return attribute in self._counts
+
+    def __len__(self) -> int:
+        return sum(self._counts.values())
+
+
+class TabuSearch(Heuristic):
+    '''
+    Tabu search. At each iteration, the best move of the neighborhoods (evaluated with
+    Solution.delta through iter_moves) is applied, even if it worsens the solution,
+    unless it is tabu. Applying a move makes the moves undoing it tabu for tenure
+    iterations (see Move.reverse_attribute). A tabu move is allowed if it gives a solution
+    better than the best one found (aspiration criterion).
+    The best solution is kept as a snapshot and restored at the end.
+    Parameters:
+      - tenure (10): number of iterations during which a move attribute is tabu
+      - max_iterations (1000): maximum number of iterations
+      - max_no_improvement (100): maximum number of consecutive iterations without improving
+        the best solution
+      - time_limit (None): time limit in seconds
+      - callback (None): function called with (step, solution) for the initial solution
+        and for each new best solution
+      - penalty_weight (0): weight of the violated constraints in the value optimized by the search
+        (see Solution.configure)
+      - plan_cycles (False): the machines are stopped during their idle times when it saves energy
+        (see Solution.configure)
+    '''
+
+    def __init__(self, params: Dict=dict()):
+        '''
+        Constructor
+        @param params: The parameters of your heuristic method if any as a
+               dictionary. Implementation should provide default values in the function.
+        '''
+        self._params = params
+
+    def run(self, instance: Instance, InitClass, NeighborClass, params: Dict=dict()) -> Solution:
+        '''
+        Computes a solution for the given instance.
+        Implementation should provide default values in the function
+        (the function will be evaluated with an empty dictionary).
+
+        @param instance: the instance to solve
+        @param InitClass: the class for the heuristic computing the initialization
+        @param NeighborClass: the class of neighborhood, or a list of neighborhood classes
+          (their moves must define Move.attribute and Move.reverse_attribute)
+        @param params: the parameters for the run, also given to the initialization
+          and to the neighborhoods
+        '''
+        callback = {**self._params, **params}.get('callback')
+        sol = None
+        for step, sol in enumerate(self.iterate(instance, InitClass, NeighborClass, params)):
+            if callback is not None:
+                callback(step, sol)
+        return sol
+
+    def iterate(self, instance: Instance, InitClass, NeighborClass, params: Dict=dict()) -> Iterator[Solution]:
+        '''
+        Runs the search and yields the initial solution, each new best solution
+        and finally the best solution found (the same solution object is modified by the search).
+        '''
+        params = {'max_iterations': 1000, 'max_no_improvement': 100, **self._params, **params}
+        budget = Budget(params)
+        tabu = TabuList(params.get('tenure', 10))
+        sol = InitClass(params).run(instance, params)
+        sol.configure(params)
+        if not isinstance(NeighborClass, (list, tuple)):
+            NeighborClass = [NeighborClass]
+        neighborhood_params = {**params, 'deadline': budget.deadline}
+        neighborhoods = [Neighborhood(instance, neighborhood_params) for Neighborhood in NeighborClass]
+        yield sol
+
+        value = best_value = sol.value
+        best = sol.snapshot()
+        iteration = 0
+        no_improvement = 0
+        while not budget.exhausted(iteration, no_improvement):
+            chosen, chosen_delta = None, None
+            for neighborhood in neighborhoods:
+                for move, delta in neighborhood.iter_moves(sol):
+                    # Le test tabou n'est fait que pour les mouvements meilleurs que le mouvement retenu
+                    if chosen is not None and delta[3] >= chosen_delta:
+                        continue
+                    if move.attribute(sol) in tabu and value + delta[3] >= best_value:
+                        continue
+                    chosen, chosen_delta = move, delta[3]
+            if chosen is None:
+                break
+
+            tabu.add(chosen.reverse_attribute(sol))
+            sol.apply(chosen)
+            value = sol.value
+            iteration += 1
+            if value < best_value:
+                best_value = value
+                best = sol.snapshot()
+                no_improvement = 0
+                yield sol
+            else:
+                no_improvement += 1
+
+        if value != best_value:
+            sol.restore(best)
+            yield sol
+
+
+if __name__ == "__main__":
+    # To play with the tabu search
+    from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+    import os
+    inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+    sol = TabuSearch().run(inst, NonDeterminist, [MyNeighborhood1, MyNeighborhood2])
+    print(sol)
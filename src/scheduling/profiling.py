@@ -0,0 +1,227 @@
+'''
+Opt-in instrumentation of the hot paths of the scheduling core.
+While a Profiler is enabled, the instrumented methods and properties are replaced
+by wrappers counting the calls and accumulating their (inclusive) time; the original
+functions are put back when it is disabled, so the instrumentation costs nothing
+the rest of the time.
+
+Usage:
+  with Profiler() as profiler:
+      sol = FirstNeighborLocalSearch().run(inst, NonDeterminist, MyNeighborhood1)
+  print(profiler.summary())
+  profiler.dump("profile.json")
+
+@author: Vassilissa Lehoux
+'''
+from typing import Dict, List, Tuple
+import functools
+import inspect
+import json
+import threading
+import time
+
+from src.scheduling.instance.operation import Operation
+from src.scheduling.instance.machine import Machine
+from src.scheduling.solution import Solution
+from src.scheduling.optim.neighborhoods import Neighborhood
+
+
+# Points d'entrée instrumentés (méthodes ou propriétés)
+HOOKS: List[Tuple[type, str]] = [
+    (Operation, 'min_start_time'),
+    (Machine, 'available_time'),
+    (Machine, 'add_operation'),
+    (Solution, 'objective'),
+    (Solution, 'evaluate'),
+    (Solution, 'delta'),
+    (Solution, 'apply'),
+]
+
+# Méthodes des voisinages, instrumentées dans chaque classe concrète de voisinage (même héritées)
+NEIGHBORHOOD_HOOKS = ('best_neighbor', 'first_better_neighbor')
+
+
+def _subclasses(cls: type) -> List[type]:
+    result = [cls]
+    for subclass in cls.__subclasses__():
+        result.extend(_subclasses(subclass))
+    return result
+
+
+class Profiler(object):
+    '''
+    Counts the calls and the time spent in the entry points of HOOKS and in the
+    best_neighbor and first_better_neighbor methods of the neighborhoods.
+    Each call to a neighborhood method is an iteration, for which the number of
+    neighbors generated (moves yielded by the moves method of the neighborhood),
+    evaluated (calls to Solution.delta) and accepted (calls to Solution.apply) is recorded.
+    A single profiler can be enabled at a time.
+    @param trace: if True, every call is also recorded as an event of a trace
+      (Chrome trace event format, it can be opened in chrome://tracing or Perfetto).
+      The trace can become big: the hot paths are called millions of times.
+    '''
+
+    _enabled = None
+
+    def __init__(self, trace: bool=False):
+        self._trace = trace
+        self._originals: List[Tuple[type, str, object]] = []
+        self.reset()
+
+    def reset(self):
+        '''
+        Clears the counters
+        '''
+        self.calls: Dict[str, int] = {}
+        self.times: Dict[str, float] = {}
+        # (voisinage, générés, évalués, acceptés, durée) pour chaque itération
+        self.iterations: List[Tuple[str, int, int, int, float]] = []
+        self.events: List[Dict] = []
+        self._neighbors = [0, 0, 0]
+        self._origin = time.perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return Profiler._enabled is self
+
+    def enable(self):
+        '''
+        Installs the instrumentation
+        '''
+        assert Profiler._enabled is None, "Un profiler est déjà actif"
+        Profiler._enabled = self
+        for cls, name in HOOKS:
+            self._wrap(cls, name, f"{cls.__name__}.{name}")
+        # Les méthodes sont lues avant d'être remplacées : une méthode héritée est mesurée
+        # sous le nom de chaque classe qui l'utilise, sans imbriquer les mesures
+        neighborhoods = [cls for cls in _subclasses(Neighborhood) if not inspect.isabstract(cls)]
+        methods = [(cls, name, getattr(cls, name)) for cls in neighborhoods
+                   for name in NEIGHBORHOOD_HOOKS + ('moves',) if hasattr(cls, name)]
+        for cls, name, function in methods:
+            if name == 'moves':
+                self._wrap_moves(cls, function)
+            else:
+                self._replace(cls, name, self._timed(function, f"{cls.__name__}.{name}", iteration=True))
+        self._count_neighbors(Solution, 'delta', 1)
+        self._count_neighbors(Solution, 'apply', 2)
+
+    def disable(self):
+        '''
+        Removes the instrumentation: the original functions are restored
+        '''
+        for cls, name, original in reversed(self._originals):
+            if original is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, original)
+        self._originals = []
+        if Profiler._enabled is self:
+            Profiler._enabled = None
+
+    def __enter__(self) -> 'Profiler':
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def _replace(self, cls: type, name: str, replacement):
+        # None : la méthode était héritée, le remplacement est supprimé à la désactivation
+        self._originals.append((cls, name, vars(cls).get(name)))
+        setattr(cls, name, replacement)
+
+    def _timed(self, function, label: str, iteration: bool=False):
+        self.calls.setdefault(label, 0)
+        self.times.setdefault(label, 0.0)
+        trace = self._trace
+        profiler = self
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if iteration:
+                saved = profiler._neighbors
+                profiler._neighbors = [0, 0, 0]
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                profiler.calls[label] = profiler.calls.get(label, 0) + 1
+                profiler.times[label] = profiler.times.get(label, 0.0) + duration
+                if trace:
+                    profiler.events.append({'name': label, 'ph': 'X', 'pid': 0, 'tid': threading.get_ident(),
+                                            'ts': (start - profiler._origin) * 1e6, 'dur': duration * 1e6})
+                if iteration:
+                    generated, evaluated, accepted = profiler._neighbors
+                    profiler.iterations.append((label, generated, evaluated, accepted, duration))
+                    profiler._neighbors = [a + b for a, b in zip(saved, profiler._neighbors)]
+        return wrapper
+
+    def _wrap(self, cls: type, name: str, label: str, iteration: bool=False):
+        attribute = vars(cls)[name]
+        if isinstance(attribute, property):
+            self._replace(cls, name, property(self._timed(attribute.fget, label), attribute.fset, attribute.fdel,
+                                              attribute.__doc__))
+        else:
+            self._replace(cls, name, self._timed(attribute, label, iteration))
+
+    def _wrap_moves(self, cls: type, moves):
+        profiler = self
+
+        @functools.wraps(moves)
+        def wrapper(*args, **kwargs):
+            for move in moves(*args, **kwargs):
+                profiler._neighbors[0] += 1
+                yield move
+        self._replace(cls, 'moves', wrapper)
+
+    def _count_neighbors(self, cls: type, name: str, counter: int):
+        # Installé par-dessus la mesure du temps de la méthode
+        function = getattr(cls, name)
+        profiler = self
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler._neighbors[counter] += 1
+            return function(*args, **kwargs)
+        self._replace(cls, name, wrapper)
+
+    @property
+    def neighbors(self) -> Tuple[int, int, int]:
+        '''
+        Returns the total number of neighbors generated, evaluated and accepted
+        (including those outside of the neighborhood methods)
+        '''
+        return tuple(self._neighbors)
+
+    def summary(self) -> str:
+        '''
+        Returns a table of the calls and times of the entry points, by decreasing total time,
+        followed by the neighbors counts
+        '''
+        lines = [f"{'entry point':<40} {'calls':>10} {'total (s)':>12} {'per call (us)':>14}"]
+        for label in sorted(self.calls, key=lambda label: -self.times[label]):
+            calls, total = self.calls[label], self.times[label]
+            per_call = total / calls * 1e6 if calls else 0.0
+            lines.append(f"{label:<40} {calls:>10} {total:>12.4f} {per_call:>14.2f}")
+        generated, evaluated, accepted = self._neighbors
+        lines.append(f"iterations: {len(self.iterations)}, neighbors generated: {generated}, "
+                     f"evaluated: {evaluated}, accepted: {accepted}")
+        return "\n".join(lines)
+
+    def dump(self, filepath: str):
+        '''
+        Writes the counters and the iterations in a json file. If the profiler records
+        a trace, the file is in the Chrome trace event format (the counters are in its metadata).
+        '''
+        data = {
+            'calls': self.calls,
+            'times': self.times,
+            'neighbors': dict(zip(('generated', 'evaluated', 'accepted'), self._neighbors)),
+            'iterations': [dict(zip(('neighborhood', 'generated', 'evaluated', 'accepted', 'time'), it))
+                           for it in self.iterations],
+        }
+        if self._trace:
+            data = {'traceEvents': self.events, 'otherData': data}
+        with open(filepath, 'w') as f:
+            json.dump(data, f)
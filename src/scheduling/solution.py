@@ -3,40 +3,358 @@ Object containing the solution to the optimization problem.
 
 @author: Vassilissa Lehoux
 '''
-from typing import List
-from matplotlib import pyplot as plt
+from typing import Dict, Iterable, Iterator, List, Tuple
+import csv
+import itertools
+import os
+import weakref
+
+import numpy as np
+
 from src.scheduling.instance.instance import Instance
 from src.scheduling.instance.operation import Operation
-
-from matplotlib import colormaps
 from src.scheduling.instance.machine import Machine
+from src.scheduling.feasibility import Violation, check, machine_penalty, job_penalty
+
+
+# Planning d'une machine : identifiant, opérations dans l'ordre, leurs dates de début,
+# dates de démarrage et dates d'arrêt de la machine
+MachineRecord = Tuple[int, Tuple[Operation, ...], Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]]
+
+# Lignes d'un planning : (job, opération, machine, début) et (machine, démarrage, arrêt)
+OperationRow = Tuple[int, int, int, int]
+MachineRow = Tuple[int, int, int]
+# En-têtes des fichiers csv : les opérations y sont désignées par leur seul identifiant
+OPERATION_HEADER = ["operation_id", "machine_id", "start_time"]
+MACHINE_HEADER = ["machine_id", "start_time", "stop_time"]
+# Format binaire : identifiant du format, nombres de lignes, puis les deux tables en int64 little endian
+# (les lignes d'opération y gardent l'identifiant du job)
+BINARY_MAGIC = b"JSPSOL01"
+BINARY_OPERATION_COLUMNS = 4
+BINARY_DTYPE = np.dtype('<i8')
+# Taille du tampon des fichiers csv
+CSV_BUFFER_SIZE = 1 << 16
+
+
+class SolutionSnapshot(object):
+    '''
+    Immutable record of the schedule of a solution: one MachineRecord per machine
+    of the instance (in the order of Instance.machines) and the objective values.
+    The records of the machines that did not change are shared between
+    the successive snapshots of a solution.
+    '''
+    __slots__ = ('machines', 'cmax', 'sum_ci', 'total_energy_consumption', 'objective')
+
+    def __init__(self, machines: Tuple[MachineRecord, ...], cmax: int, sum_ci: int,
+                 total_energy_consumption: int, objective: int):
+        self.machines = machines
+        self.cmax = cmax
+        self.sum_ci = sum_ci
+        self.total_energy_consumption = total_energy_consumption
+        self.objective = objective
+
+    @property
+    def assignment(self) -> Dict[Operation, Tuple[int, int]]:
+        '''
+        Returns the machine id and the start time of each scheduled operation
+        '''
+        result = {}
+        for machine_id, operations, starts, _, _ in self.machines:
+            for op, start in zip(operations, starts):
+                result[op] = (machine_id, start)
+        return result
 
 
 class Solution(object):
     '''
     Solution class
+    The schedule is stored in the operations and machines of the instance.
+    Several solutions of an instance can coexist (see clone): only one of them,
+    the active one, is stored in the objects of the instance, the others are kept
+    as snapshots and restored when they are used.
+    Parameters (see configure):
+      - penalty_weight (0): weight of the magnitude of the violated constraints (penalty)
+        in the value optimized by the local searches (value), 0 ignores the violations
+      - plan_cycles (False): the machines are stopped during their idle times when it saves
+        energy (Machine.plan_cycles) instead of staying on until their end time: the current
+        planning when the parameter is set, then the machines replanned by apply
     '''
 
-    def __init__(self, instance: Instance):
+    # Poids des objectifs dans la fonction objectif agrégée
+    CMAX_WEIGHT = 1
+    SUM_CI_WEIGHT = 1
+    ENERGY_WEIGHT = 1
+    # Pénalité ajoutée à l'évaluation d'une solution non réalisable
+    INFEASIBILITY_PENALTY = 10000
+
+    # Si True, les opérations disponibles maintenues incrémentalement sont comparées
+    # à un parcours complet des jobs à chaque planification (débogage uniquement)
+    check_available_operations : bool = False
+
+    def __init__(self, instance: Instance, params: Dict=dict()):
         '''
         Constructor
+        @param params: the parameters of the evaluation of the solution (see configure)
+        '''
+        self._instance = instance
+        self._penalty_weight: int = 0
+        self._plan_cycles: bool = False
+        # Planning de la solution quand elle n'est pas active
+        self._snapshot: SolutionSnapshot = None
+        # Dernier MachineRecord connu de chaque machine, avec la version de la machine correspondante
+        self._records: Dict[int, Tuple[int, MachineRecord]] = {}
+        self._available: Dict[int, Operation] = {}
+        # Ampleur des violations de chaque machine et de chaque job, et leur somme (None : à calculer)
+        self._machine_penalties: Dict[int, int] = {}
+        self._job_penalties: Dict[int, int] = {}
+        self._penalty: int = None
+        self.reset()
+        self.configure(params)
+
+    def configure(self, params: Dict):
+        '''
+        Sets the parameters of the evaluation of the solution, usually the parameters
+        of the heuristic that optimizes it (see the class documentation)
+        '''
+        self._penalty_weight = params.get('penalty_weight', 0)
+        self._plan_cycles = params.get('plan_cycles', False)
+        if self._plan_cycles:
+            self.plan_cycles()
+
+    @property
+    def penalty_weight(self) -> int:
+        '''
+        Returns the weight of the penalty in value
         '''
-        raise "Not implemented error"
+        return self._penalty_weight
 
+    @property
+    def plans_cycles(self) -> bool:
+        '''
+        Returns True if apply plans the cycles of the replanned machines
+        '''
+        return self._plan_cycles
 
     @property
     def inst(self):
         '''
         Returns the associated instance
         '''
-        raise "Not implemented error"
+        return self._instance
+
+    def _owner(self):
+        '''
+        Returns the active solution of the instance, None if there is none
+        '''
+        owner = self._instance._schedule_owner
+        return owner() if owner is not None else None
+
+    @property
+    def is_active(self) -> bool:
+        '''
+        Returns True if the schedule of the solution is the one stored in the instance
+        '''
+        return self._snapshot is None and self._owner() is self
+
+    def _deactivate_owner(self) -> Dict[int, Tuple[int, MachineRecord]]:
+        '''
+        Stores the active solution of the instance (if it is not this one) in a snapshot.
+        Returns the known records of the machines of the instance.
+        '''
+        owner = self._owner()
+        if owner is None:
+            return {}
+        if owner is self:
+            return self._records
+        owner._snapshot = owner.snapshot()
+        records = owner._records
+        owner._records = {}
+        return records
+
+    def _activate(self):
+        '''
+        Makes the solution the active solution of the instance,
+        restoring its schedule in the operations and machines if needed
+        '''
+        if self.is_active:
+            return
+        snapshot = self._snapshot
+        records = self._deactivate_owner()
+        self._instance._schedule_owner = weakref.ref(self)
+        self._snapshot = None
+        self._materialize(snapshot, records)
+
+    def _materialize(self, snapshot: SolutionSnapshot, records: Dict[int, Tuple[int, MachineRecord]]):
+        '''
+        Stores the schedule of the snapshot in the operations and machines.
+        The machines whose known record is the one of the snapshot are left as they are.
+        '''
+        to_restore = []
+        self._records = {}
+        for machine, record in zip(self._instance.machines, snapshot.machines):
+            known = records.get(machine.machine_id)
+            if known is not None and known[0] == machine.version and known[1] is record:
+                self._records[machine.machine_id] = known
+            else:
+                to_restore.append((machine, record))
+
+        # Toutes les machines sont vidées avant de replacer les opérations,
+        # une opération pouvant changer de machine
+        for machine, _ in to_restore:
+            machine.reset()
+        for machine, record in to_restore:
+            _, operations, starts, start_times, stop_times = record
+            for op, start in zip(operations, starts):
+                machine.place_operation(op, start)
+            machine.set_cycles(start_times, stop_times)
+            self._records[machine.machine_id] = (machine.version, record)
+
+        for job in self._instance.jobs:
+            job.update_next_operation()
+        self._available = {job.job_id: job.next_operation
+                           for job in self._instance.jobs if not job.planned}
+
+    def snapshot(self) -> SolutionSnapshot:
+        '''
+        Returns an immutable record of the schedule of the solution.
+        Only the machines modified since the previous snapshot are copied.
+        '''
+        if not self.is_active:
+            return self._snapshot
+
+        machines = []
+        for machine in self._instance.machines:
+            known = self._records.get(machine.machine_id)
+            if known is None or known[0] != machine.version:
+                operations = tuple(machine.scheduled_operations)
+                record = (machine.machine_id, operations, tuple(op.start_time for op in operations),
+                          tuple(machine.start_times), tuple(machine.stop_times))
+                known = (machine.version, record)
+                self._records[machine.machine_id] = known
+            machines.append(known[1])
+        return SolutionSnapshot(tuple(machines), self.cmax, self.sum_ci,
+                                self.total_energy_consumption, self.objective)
+
+    def restore(self, snapshot: SolutionSnapshot):
+        '''
+        Replaces the schedule of the solution by the one of a snapshot
+        (taken on a solution of the same instance).
+        '''
+        records = self._deactivate_owner()
+        self._instance._schedule_owner = weakref.ref(self)
+        self._snapshot = None
+        self._penalty = None
+        self._materialize(snapshot, records)
+
+    def clone(self) -> 'Solution':
+        '''
+        Returns a copy of the solution. The copy only holds a snapshot of the schedule
+        until it is used: its schedule is then restored in the instance,
+        and the schedule of the active solution is stored in a snapshot.
+        '''
+        clone = Solution.__new__(Solution)
+        clone._instance = self._instance
+        clone._snapshot = self.snapshot()
+        clone._records = {}
+        clone._available = {}
+        clone._machine_penalties = dict(self._machine_penalties)
+        clone._job_penalties = dict(self._job_penalties)
+        clone._penalty = self._penalty
+        clone._penalty_weight = self._penalty_weight
+        clone._plan_cycles = self._plan_cycles
+        return clone
+
+    @property
+    def assignment(self) -> Dict[Tuple[int, int], Tuple[int, int]]:
+        '''
+        Returns the machine id and the start time of each scheduled operation,
+        indexed by (job id, operation id): a compact description of the schedule
+        that does not reference the objects of the instance.
+        '''
+        self._activate()
+        return {(op.job_id, op.operation_id): (op.assigned_to, op.start_time)
+                for op in self._instance.operations if op.assigned}
+
+    @property
+    def cycles(self) -> Dict[int, Tuple[List[int], List[int]]]:
+        '''
+        Returns the start times and the stop times of each machine, indexed by machine id
+        '''
+        self._activate()
+        return {machine.machine_id: (list(machine.start_times), list(machine.stop_times))
+                for machine in self._instance.machines}
 
+    def load(self, assignment: Dict[Tuple[int, int], Tuple[int, int]],
+             cycles: Dict[int, Tuple[List[int], List[int]]]):
+        '''
+        Replaces the schedule of the solution by the one described by assignment and cycles
+        (as returned by the properties of the same name, possibly for another copy of the instance).
+        The constraints are not checked.
+        '''
+        operation_rows = ((job_id, operation_id, machine_id, start_time)
+                          for (job_id, operation_id), (machine_id, start_time) in assignment.items())
+        machine_rows = ((machine_id, start, stop_times[i] if i < len(stop_times) else None)
+                        for machine_id, (start_times, stop_times) in cycles.items()
+                        for i, start in enumerate(start_times))
+        self._load_rows(operation_rows, machine_rows)
+
+    def _load_rows(self, operation_rows: Iterable[OperationRow], machine_rows: Iterable[MachineRow]):
+        '''
+        Replaces the schedule of the solution by the one described by the rows, consumed one at a time
+        (a stop time None means that the machine is still running)
+        '''
+        self.reset()
+        for job_id, operation_id, machine_id, start_time in operation_rows:
+            self._instance.get_machine(machine_id).place_operation(
+                self._instance.operation(job_id, operation_id), start_time)
+        cycles = {}
+        for machine_id, start, stop in machine_rows:
+            start_times, stop_times = cycles.setdefault(machine_id, ([], []))
+            start_times.append(start)
+            if stop is not None:
+                stop_times.append(stop)
+        for machine_id, (start_times, stop_times) in cycles.items():
+            self._instance.get_machine(machine_id).set_cycles(start_times, stop_times)
+
+        for job in self._instance.jobs:
+            job.update_next_operation()
+        self._available = {job.job_id: job.next_operation
+                           for job in self._instance.jobs if not job.planned}
+
+    def _operation_rows(self) -> Iterator[OperationRow]:
+        '''
+        Generates the (job id, operation id, machine id, start time) of the scheduled operations
+        '''
+        self._activate()
+        for op in self._instance.operations:
+            if op.assigned:
+                yield op.job_id, op.operation_id, op.assigned_to, op.start_time
+
+    def _machine_rows(self) -> Iterator[MachineRow]:
+        '''
+        Generates the (machine id, start time, stop time) of the on/off cycles of the machines,
+        the stop time is None if the machine is still running
+        '''
+        self._activate()
+        for machine in self._instance.machines:
+            stop_times = machine.stop_times
+            for i, start in enumerate(machine.start_times):
+                yield machine.machine_id, start, stop_times[i] if i < len(stop_times) else None
 
     def reset(self):
         '''
         Resets the solution: everything needs to be replanned
         '''
-        raise "Not implemented error"
+        self._deactivate_owner()
+        self._instance._schedule_owner = weakref.ref(self)
+        self._snapshot = None
+        self._records = {}
+        self._penalty = None
+        self._instance.reset_schedule()
+
+        # Prochaine opération de chaque job non terminé, dans l'ordre des jobs
+        self._available: Dict[int, Operation] = {job.job_id: job.next_operation
+                                                 for job in self._instance.jobs if not job.planned}
 
     @property
     def is_feasible(self) -> bool:
@@ -44,35 +362,133 @@ class Solution(object):
         Returns True if the solution respects the constraints.
         To call this function, all the operations must be planned.
         '''
-        raise "Not implemented error"
+        return not self.violations
+
+    @property
+    def violations(self) -> List[Violation]:
+        '''
+        Returns the violated constraints of the solution with their magnitude,
+        empty if the solution is feasible (see feasibility.check)
+        '''
+        self._activate()
+        return check(self._instance)
+
+    def _machine_penalty(self, machine: Machine, effect=None) -> int:
+        '''
+        Sum of the magnitudes of the violations of the machine (see feasibility.machine_penalty)
+        in the schedule of the solution, or in the schedule it would have after a move
+        (effect: the result of _propagate)
+        '''
+        if effect is None:
+            operations = machine.scheduled_operations
+            return machine_penalty(machine, operations, [op.start_time for op in operations],
+                                   [op.end_time for op in operations], machine.start_times, machine.stop_times)
+
+        sequences, assignment, starts = effect
+        operations = sequences.get(machine.machine_id)
+        if operations is None:
+            operations = machine.scheduled_operations
+        op_starts = [starts.get(op, op.start_time) for op in operations]
+        op_ends = [self._end_time(op, starts, assignment) for op in operations]
+        start_times, stop_times = self._planned_cycles(machine, op_starts, op_ends)
+        return machine_penalty(machine, operations, op_starts, op_ends, start_times, stop_times)
+
+    def _job_penalty(self, job, effect=None) -> int:
+        '''
+        Sum of the magnitudes of the violations of the job (see feasibility.job_penalty)
+        in the schedule of the solution, or in the schedule it would have after a move
+        '''
+        operations = job.operations
+        assigned = [op.assigned for op in operations]
+        if effect is None:
+            starts = [op.start_time if is_assigned else 0 for op, is_assigned in zip(operations, assigned)]
+            ends = [op.end_time if is_assigned else 0 for op, is_assigned in zip(operations, assigned)]
+        else:
+            _, assignment, new_starts = effect
+            starts = [new_starts.get(op, op.start_time) if is_assigned else 0
+                      for op, is_assigned in zip(operations, assigned)]
+            ends = [self._end_time(op, new_starts, assignment) if is_assigned else 0
+                    for op, is_assigned in zip(operations, assigned)]
+        return job_penalty(assigned, starts, ends)
+
+    def _compute_penalties(self):
+        '''
+        Computes the magnitude of the violations of all the machines and jobs, if unknown
+        '''
+        if self._penalty is not None:
+            return
+        self._activate()
+        self._machine_penalties = {machine.machine_id: self._machine_penalty(machine)
+                                   for machine in self._instance.machines}
+        self._job_penalties = {job.job_id: self._job_penalty(job) for job in self._instance.jobs}
+        self._penalty = sum(self._machine_penalties.values()) + sum(self._job_penalties.values())
+
+    @property
+    def penalty(self) -> int:
+        '''
+        Returns the sum of the magnitudes of the violated constraints (see violations),
+        0 for a feasible solution. The totals of each machine and each job are kept and
+        updated by apply: only the machines and jobs changed by a move are checked again.
+        '''
+        self._compute_penalties()
+        return self._penalty
+
+    @property
+    def penalties(self) -> Tuple[Dict[int, int], Dict[int, int]]:
+        '''
+        Returns the magnitude of the violations of each machine and of each job (see penalty)
+        '''
+        self._compute_penalties()
+        return dict(self._machine_penalties), dict(self._job_penalties)
+
+    @property
+    def value(self) -> int:
+        '''
+        Returns the value minimized by the local searches: the objective plus the penalty
+        weighted by penalty_weight, so that they can go through infeasible solutions
+        '''
+        if not self._penalty_weight:
+            return self.objective
+        return self.objective + self._penalty_weight * self.penalty
 
     @property
     def evaluate(self) -> int:
         '''
-        Computes the value of the solution
+        Computes the value of the solution: an infeasible solution is penalized by
+        INFEASIBILITY_PENALTY and by the magnitude of its violations weighted by penalty_weight
         '''
-        raise "Not implemented error"
+        penalty = self.penalty
+        if penalty == 0:
+            return self.objective
+        return self.objective + self._penalty_weight * penalty + self.INFEASIBILITY_PENALTY
 
     @property
     def objective(self) -> int:
         '''
         Returns the value of the objective function
         '''
-        raise "Not implemented error"
+        return self.CMAX_WEIGHT * self.cmax + self.SUM_CI_WEIGHT * self.sum_ci \
+            + self.ENERGY_WEIGHT * self.total_energy_consumption
 
     @property
     def cmax(self) -> int:
         '''
         Returns the maximum completion time of a job
         '''
-        raise "Not implemented error"
+        if self._snapshot is not None:
+            return self._snapshot.cmax
+        self._activate()
+        return max((job.completion_time for job in self._instance.jobs), default=0)
 
     @property
     def sum_ci(self) -> int:
         '''
         Returns the sum of completion times of all the jobs
         '''
-        raise "Not implemented error"
+        if self._snapshot is not None:
+            return self._snapshot.sum_ci
+        self._activate()
+        return sum(job.completion_time for job in self._instance.jobs)
 
     @property
     def total_energy_consumption(self) -> int:
@@ -80,32 +496,390 @@ class Solution(object):
         Returns the total energy consumption for processing
         all the jobs (including energy for machine switched on but doing nothing).
         '''
-        raise "Not implemented error"
+        if self._snapshot is not None:
+            return self._snapshot.total_energy_consumption
+        self._activate()
+        return sum(machine.total_energy_consumption for machine in self._instance.machines)
+
+    def critical_path(self, previous: List[Operation]=None, changed: Iterable[int]=None) -> List[Operation]:
+        '''
+        Returns a critical path of the complete solution, in start time order: a chain of
+        operations without idle time, each one starting at the end of its predecessor on the
+        machine or in the job, ending with the last operation of a job completed at cmax.
+        Only the moves of operations of this path can decrease the makespan.
+        @param previous: the critical path returned before the machines changed were modified:
+          its end is kept as long as the operations and their job predecessors are on unchanged
+          machines, and the path is only recomputed from the first modified operation
+        @param changed: ids of the machines modified since previous was computed
+        '''
+        self._activate()
+        last = None
+        for job in self._instance.jobs:
+            if job.operations and (last is None or job.completion_time > last.end_time):
+                last = job.operations[-1]
+        path = []
+        op = last
+        if previous and previous[-1] is last and changed is not None:
+            changed = set(changed)
+            # Le choix du prédécesseur d'une opération ne dépend que de sa machine et de ses prédécesseurs
+            position = len(previous) - 1
+            while position > 0 and previous[position].assigned_to not in changed \
+                    and all(pred.assigned_to not in changed for pred in previous[position].predecessors):
+                position -= 1
+            path = previous[position + 1:][::-1]
+            op = previous[position]
+        while op is not None:
+            path.append(op)
+            # Le prédécesseur sur la machine est préféré, pour former des blocs d'opérations
+            previous_op = self._instance.get_machine(op.assigned_to).timeline.previous(op)
+            if previous_op is None or previous_op.end_time != op.start_time:
+                previous_op = next((pred for pred in op.predecessors if pred.end_time == op.start_time), None)
+            op = previous_op
+        path.reverse()
+        return path
 
     def __str__(self) -> str:
         '''
         String representation of the solution
         '''
-        return ""
+        return f"{self._instance}: cmax={self.cmax}, sum_ci={self.sum_ci}, " \
+            f"energy={self.total_energy_consumption}, objective={self.objective}"
+
+    def _propagate(self, move) -> Tuple[Dict[int, List[Operation]], Dict[Operation, int], Dict[Operation, int]]:
+        '''
+        Computes the start times of the operations impacted by a move on a complete solution:
+        the operations after the first change on each modified machine and everything
+        downstream of them (job successors and next operations on the machines).
+        Returns the new sequences of the modified machines, the machine of the operations of these
+        sequences and the new start times of the impacted operations,
+        None if the move creates a cycle (the operations can not be ordered).
+        '''
+        self._activate()
+        sequences = move.machine_sequences(self)
+        assignment = {}
+        machine_previous = {}
+        machine_next = {}
+        changed = []
+        for machine_id, sequence in sequences.items():
+            current = self._instance.get_machine(machine_id).scheduled_operations
+            first_change = 0
+            while first_change < min(len(sequence), len(current)) \
+                    and sequence[first_change] is current[first_change]:
+                first_change += 1
+            changed.extend(sequence[first_change:])
+
+            previous = None
+            for op in sequence:
+                assignment[op] = machine_id
+                machine_previous[op] = previous
+                if previous is not None:
+                    machine_next[previous] = op
+                previous = op
+            if previous is not None:
+                machine_next[previous] = None
+
+        # Cône aval des opérations modifiées
+        cone_next = {}
+        stack = changed
+        while stack:
+            op = stack.pop()
+            if op in cone_next:
+                continue
+            if op in machine_next:
+                following = machine_next[op]
+            else:
+                following = self._instance.get_machine(op.assigned_to).timeline.next(op)
+            cone_next[op] = following
+            stack.extend(op.successors)
+            if following is not None:
+                stack.append(following)
+
+        # Tri topologique (Kahn) du cône : chaque date de début est calculée une seule fois
+        cone_previous = {}
+        indegree = {}
+        ready = []
+        for op in cone_next:
+            if op in machine_previous:
+                previous = machine_previous[op]
+            else:
+                previous = self._instance.get_machine(op.assigned_to).timeline.previous(op)
+            cone_previous[op] = previous
+            degree = sum(1 for pred in op.predecessors if pred in cone_next)
+            if previous in cone_next:
+                degree += 1
+            indegree[op] = degree
+            if degree == 0:
+                ready.append(op)
+
+        starts = {}
+        while ready:
+            op = ready.pop()
+            machine_id = assignment.get(op, op.assigned_to)
+            previous = cone_previous[op]
+            if previous is None:
+                start = self._instance.get_machine(machine_id).set_up_time
+            else:
+                start = self._end_time(previous, starts, assignment)
+            for pred in op.predecessors:
+                start = max(start, self._end_time(pred, starts, assignment))
+            starts[op] = start
+
+            for succ in op.successors + [cone_next[op]]:
+                if succ in indegree:
+                    indegree[succ] -= 1
+                    if indegree[succ] == 0:
+                        ready.append(succ)
+
+        if len(starts) < len(cone_next):
+            return None
+        return sequences, assignment, starts
+
+    def _planned_cycles(self, machine: Machine, starts: List[int], ends: List[int]) -> Tuple[List[int], List[int]]:
+        '''
+        Start and stop times given by apply to a machine processing operations from starts to ends
+        '''
+        if self._plan_cycles:
+            return machine.plan_cycles(starts, ends)
+        if not starts:
+            return [], []
+        # Comme schedule : un seul cycle, de la première opération jusqu'à la fin du planning
+        return [starts[0] - machine.set_up_time], [max(machine.end_time, max(ends) + machine.tear_down_time)]
+
+    def plan_cycles(self) -> int:
+        '''
+        Post-optimization of the energy: the operations keep their machine and start time,
+        and the start and stop times of each machine are replaced by the ones of Machine.plan_cycles.
+        Returns the energy saved.
+        '''
+        self._activate()
+        energy = self.total_energy_consumption
+        for machine in self._instance.machines:
+            operations = machine.scheduled_operations
+            machine.set_cycles(*machine.plan_cycles([op.start_time for op in operations],
+                                                    [op.end_time for op in operations]))
+        self._penalty = None
+        return energy - self.total_energy_consumption
+
+    @staticmethod
+    def _end_time(op: Operation, starts: Dict[Operation, int], assignment: Dict[Operation, int]) -> int:
+        '''
+        End time of an operation given the start times and machines changed by a move
+        '''
+        start = starts.get(op)
+        if start is None:
+            return op.end_time
+        machine_id = assignment.get(op)
+        return start + (op.machine_options[machine_id][0] if machine_id is not None else op.processing_time)
+
+    def delta(self, move) -> Tuple[int, int, int, int]:
+        '''
+        Returns the variation (cmax, sum_ci, total energy consumption, objective) of the solution
+        if the move was applied, without applying it. If penalty_weight is not 0, the variation
+        of the objective is the variation of value (it includes the weighted variation of the penalty).
+        Only the modified machines and the operations downstream of the modification are recomputed.
+        The solution must be complete. Returns None if the move is not valid (it creates a cycle).
+        '''
+        effect = self._propagate(move)
+        if effect is None:
+            return None
+        sequences, assignment, starts = effect
 
-    def to_csv(self):
+        # Dates de fin des jobs impactés
+        delta_sum_ci = 0
+        cmax = 0
+        for job in self._instance.jobs:
+            completion_time = job.completion_time
+            last_op = job.operations[-1] if job.operations else None
+            if last_op in starts:
+                new_completion_time = self._end_time(last_op, starts, assignment)
+                delta_sum_ci += new_completion_time - completion_time
+                completion_time = new_completion_time
+            cmax = max(cmax, completion_time)
+        delta_cmax = cmax - self.cmax
+
+        # Énergie des machines modifiées ou dont une opération est décalée
+        machine_ids = set(sequences)
+        machine_ids.update(assignment.get(op, op.assigned_to) for op in starts)
+        delta_energy = 0
+        for machine_id in machine_ids:
+            machine = self._instance.get_machine(machine_id)
+            sequence = sequences.get(machine_id)
+            if sequence is None:
+                sequence = machine.scheduled_operations
+                processing_time, processing_energy = machine.processing_time, machine.processing_energy
+            else:
+                processing_time = sum(op.machine_options[machine_id][0] for op in sequence)
+                processing_energy = sum(op.machine_options[machine_id][1] for op in sequence)
+            if not sequence:
+                energy = 0
+            elif self._plan_cycles:
+                energy = machine.planned_energy([starts.get(op, op.start_time) for op in sequence],
+                                                [self._end_time(op, starts, assignment) for op in sequence],
+                                                processing_time, processing_energy)
+            else:
+                first_start = starts.get(sequence[0], sequence[0].start_time)
+                last_end = self._end_time(sequence[-1], starts, assignment)
+                energy = machine.cycle_energy(first_start, last_end, processing_time, processing_energy)
+            delta_energy += energy - machine.total_energy_consumption
+
+        delta_objective = self.CMAX_WEIGHT * delta_cmax + self.SUM_CI_WEIGHT * delta_sum_ci \
+            + self.ENERGY_WEIGHT * delta_energy
+
+        # Violations des machines et des jobs impactés, comparées aux totaux gardés
+        if self._penalty_weight:
+            self._compute_penalties()
+            delta_penalty = 0
+            for machine_id in machine_ids:
+                delta_penalty += self._machine_penalty(self._instance.get_machine(machine_id), effect) \
+                    - self._machine_penalties[machine_id]
+            for job_id in {op.job_id for op in starts}:
+                delta_penalty += self._job_penalty(self._instance.get_job(job_id), effect) \
+                    - self._job_penalties[job_id]
+            delta_objective += self._penalty_weight * delta_penalty
+        return delta_cmax, delta_sum_ci, delta_energy, delta_objective
+
+    def apply(self, move):
+        '''
+        Applies a move to a complete solution: the modified machines and the machines
+        of the operations shifted by the move are replanned, the others are left unchanged.
+        '''
+        effect = self._propagate(move)
+        if effect is None:
+            raise ValueError(f"{move} creates a cycle")
+        sequences, assignment, starts = effect
+
+        machine_ids = set(sequences)
+        machine_ids.update(assignment.get(op, op.assigned_to) for op in starts)
+        placements = {}
+        for machine_id in machine_ids:
+            sequence = sequences.get(machine_id)
+            if sequence is None:
+                sequence = self._instance.get_machine(machine_id).scheduled_operations
+            placements[machine_id] = [(op, starts.get(op, op.start_time)) for op in sequence]
+
+        machines = [self._instance.get_machine(machine_id) for machine_id in sorted(machine_ids)]
+        for machine in machines:
+            machine.reset()
+        for machine in machines:
+            placement = placements[machine.machine_id]
+            for op, start in placement:
+                machine.place_operation(op, start)
+            if placement:
+                machine.set_cycles(*self._planned_cycles(machine, [start for _, start in placement],
+                                                         [op.end_time for op, _ in placement]))
+
+        # Mise à jour des violations des machines replanifiées et des jobs dont une opération a bougé
+        if self._penalty is not None:
+            for machine in machines:
+                penalty = self._machine_penalty(machine)
+                self._penalty += penalty - self._machine_penalties[machine.machine_id]
+                self._machine_penalties[machine.machine_id] = penalty
+            for job_id in {op.job_id for op in starts}:
+                penalty = self._job_penalty(self._instance.get_job(job_id))
+                self._penalty += penalty - self._job_penalties[job_id]
+                self._job_penalties[job_id] = penalty
+
+    def _solution_files(self, inst_folder: str, operation_file: str, machine_file: str) -> Tuple[str, str]:
+        if inst_folder is None:
+            inst_folder = self._instance.folderpath or "."
+        name = self._instance.name
+        return (os.path.join(inst_folder, operation_file or f"{name}_sol_op.csv"),
+                os.path.join(inst_folder, machine_file or f"{name}_sol_mach.csv"))
+
+    def to_csv(self, inst_folder: str=None, operation_file: str=None, machine_file: str=None):
         '''
         Save the solution to a csv files with the following formats:
         Operation file:
-          One line per operation
+          One line per scheduled operation
           operation id - machine to which it is assigned - start time
           header: "operation_id,machine_id,start_time"
         Machine file:
           One line per pair of (start time, stop time) for the machine
-          header: "machine_id, start_time, stop_time"
+          (the stop time is empty if the machine is still running)
+          header: "machine_id,start_time,stop_time"
+        The rows are streamed to buffered files.
+        @param inst_folder: folder of the files, the folder of the instance by default
+        @param operation_file: name of the operation file, <instance>_sol_op.csv by default
+        @param machine_file: name of the machine file, <instance>_sol_mach.csv by default
         '''
-        raise "Not implemented error"
+        operation_filepath, machine_filepath = self._solution_files(inst_folder, operation_file, machine_file)
+        with open(operation_filepath, 'w', newline='', buffering=CSV_BUFFER_SIZE) as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(OPERATION_HEADER)
+            csv_writer.writerows((operation_id, machine_id, start_time)
+                                 for _, operation_id, machine_id, start_time in self._operation_rows())
+        with open(machine_filepath, 'w', newline='', buffering=CSV_BUFFER_SIZE) as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(MACHINE_HEADER)
+            csv_writer.writerows((machine_id, start, '' if stop is None else stop)
+                                 for machine_id, start, stop in self._machine_rows())
 
-    def from_csv(self, inst_folder, operation_file, machine_file):
+    def from_csv(self, inst_folder: str=None, operation_file: str=None, machine_file: str=None):
         '''
-        Reads a solution from the instance folder
+        Reads a solution from the instance folder (see to_csv for the format and the default
+        file names): the schedule of the solution is replaced, the rows are streamed from the files.
+        The constraints are not checked.
+        The operations are found from their id (Instance.operation_with_id).
+        Raises ValueError if the header of a file is not the expected one, or if an operation id
+        is unknown or ambiguous (shared by several jobs of the instance).
         '''
-        raise "Not implemented error"
+        operation_filepath, machine_filepath = self._solution_files(inst_folder, operation_file, machine_file)
+        with open(operation_filepath, 'r', newline='', buffering=CSV_BUFFER_SIZE) as operation_csv, \
+                open(machine_filepath, 'r', newline='', buffering=CSV_BUFFER_SIZE) as machine_csv:
+            operation_reader = csv.reader(operation_csv)
+            machine_reader = csv.reader(machine_csv)
+            for filepath, reader, expected in ((operation_filepath, operation_reader, OPERATION_HEADER),
+                                               (machine_filepath, machine_reader, MACHINE_HEADER)):
+                header = next(reader, None)
+                if header != expected:
+                    raise ValueError(f"En-tête inattendu dans {filepath} : {header}, "
+                                     f"attendu : {','.join(expected)}")
+            self._load_rows(self._csv_operation_rows(operation_filepath, operation_reader),
+                            ((int(machine_id), int(start), int(stop) if stop else None)
+                             for machine_id, start, stop in machine_reader))
+
+    def _csv_operation_rows(self, filepath: str, rows: Iterable[List[str]]) -> Iterator[OperationRow]:
+        '''
+        Generates the operation rows of the (operation id, machine id, start time) rows of a csv file
+        '''
+        for operation_id, machine_id, start_time in rows:
+            op = self._instance.operation_with_id(int(operation_id))
+            if op is None:
+                raise ValueError(f"Opération inconnue dans {filepath} : {operation_id}")
+            yield op.job_id, op.operation_id, int(machine_id), int(start_time)
+
+    def to_binary(self, filepath: str):
+        '''
+        Saves the solution in a compact binary file holding the operations and the cycles of
+        the machines, with -1 as the stop time of a running machine:
+        BINARY_MAGIC, the numbers of operation and machine rows (int64), then the operation
+        table (job id, operation id, machine id, start time) and the machine table
+        (machine id, start time, stop time), in little endian int64.
+        '''
+        operations = np.fromiter(itertools.chain.from_iterable(self._operation_rows()), dtype=BINARY_DTYPE)
+        machines = np.fromiter(itertools.chain.from_iterable(
+            (machine_id, start, -1 if stop is None else stop) for machine_id, start, stop in self._machine_rows()),
+            dtype=BINARY_DTYPE)
+        sizes = np.array([len(operations) // BINARY_OPERATION_COLUMNS, len(machines) // len(MACHINE_HEADER)],
+                         dtype=BINARY_DTYPE)
+        with open(filepath, 'wb') as f:
+            f.write(BINARY_MAGIC + sizes.tobytes() + operations.tobytes() + machines.tobytes())
+
+    def from_binary(self, filepath: str):
+        '''
+        Reads a solution saved by to_binary (the file is read in a single call):
+        the schedule of the solution is replaced. The constraints are not checked.
+        '''
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        assert data[:len(BINARY_MAGIC)] == BINARY_MAGIC, f"{filepath} n'est pas un fichier de solution"
+        values = np.frombuffer(data, dtype=BINARY_DTYPE, offset=len(BINARY_MAGIC))
+        nb_operations, nb_cycles = values[:2].tolist()
+        end = 2 + nb_operations * BINARY_OPERATION_COLUMNS
+        operations = values[2:end].reshape(-1, BINARY_OPERATION_COLUMNS).tolist()
+        machines = values[end:end + nb_cycles * len(MACHINE_HEADER)].reshape(-1, len(MACHINE_HEADER)).tolist()
+        self._load_rows(operations, ((machine_id, start, None if stop < 0 else stop)
+                                     for machine_id, start, stop in machines))
 
     @property
     def available_operations(self)-> List[Operation]:
@@ -113,106 +887,140 @@ class Solution(object):
         Returns the available operations for scheduling:
         all constraints have been met for those operations to start
         '''
-        raise "Not implemented error"
+        self._activate()
+        return list(self._available.values())
+
+    def is_available(self, operation: Operation) -> bool:
+        '''
+        Returns True if the operation is available for scheduling, in O(1)
+        '''
+        self._activate()
+        return self._available.get(operation.job_id) is operation
+
+    def _scanned_available_operations(self) -> List[Operation]:
+        '''
+        Available operations computed from the jobs
+        '''
+        return [job.next_operation for job in self._instance.jobs if not job.planned]
 
     @property
     def all_operations(self) -> List[Operation]:
         '''
         Returns all the operations in the instance
         '''
-        raise "Not implemented error"
+        return self._instance.operations
 
-    def schedule(self, operation: Operation, machine: Machine):
+    def earliest_start(self, operation: Operation, machine: Machine, insertion: bool=False) -> int:
+        '''
+        Returns the start time the operation would get if scheduled on the machine
+        with schedule (the operation is not scheduled).
+        '''
+        self._activate()
+        return machine.earliest_start(operation, insertion=insertion, resume=True)
+
+    def schedule(self, operation: Operation, machine: Machine, insertion: bool=False):
         '''
         Schedules the operation at the end of the planning of the machine.
         Starts the machine if stopped.
+        The machine is then kept running until its end time.
         @param operation: an operation that is available for scheduling
+        @param insertion: if True, the operation is scheduled in the first idle gap
+          of the machine long enough for it instead of at the end of its planning
         '''
-        assert(operation in self.available_operations)
-        raise "Not implemented error"
+        self._activate()
+        assert self.is_available(operation), f"{operation} n'est pas disponible"
+        self._penalty = None
+
+        # La machine reste allumée jusqu'à la fin du planning : on annule cet arrêt avant d'ajouter l'opération
+        if machine.stop_times and not machine.is_running:
+            machine.cancel_stop()
+        machine.add_operation(operation, insertion=insertion)
+        machine.stop(max(machine.end_time, machine.available_time + machine.tear_down_time))
+
+        job = self._instance.get_job(operation.job_id)
+        job.schedule_operation()
+        if job.planned:
+            del self._available[job.job_id]
+        else:
+            self._available[job.job_id] = job.next_operation
+
+        if self.check_available_operations:
+            assert self.available_operations == self._scanned_available_operations(), \
+                "Opérations disponibles incohérentes"
+
+    def unschedule(self, operation: Operation):
+        '''
+        Removes from the planning the last scheduled operation of a job.
+        The machine start and stop times are kept, unless no operation remains on the machine
+        (it is then never started).
+        '''
+        self._activate()
+        job = self._instance.get_job(operation.job_id)
+        assert operation.assigned and job.last_scheduled_operation is operation, \
+            f"{operation} n'est pas la dernière opération planifiée de son job"
+        self._penalty = None
+
+        machine = self._instance.get_machine(operation.assigned_to)
+        machine.remove_operation(operation)
+        if not machine.scheduled_operations:
+            machine.reset()
+
+        job.unschedule_operation()
+        self._available[job.job_id] = operation
+
+        if self.check_available_operations:
+            assert sorted(self.available_operations, key=id) == sorted(self._scanned_available_operations(), key=id), \
+                "Opérations disponibles incohérentes"
 
     def gantt(self, colormapname):
         """
         Generate a plot of the planning.
         Standard colormaps can be found at https://matplotlib.org/stable/users/explain/colors/colormaps.html
+        matplotlib is only imported here: see src.scheduling.gantt for exporters without matplotlib.
         """
+        # Import coûteux, fait seulement pour tracer
+        from matplotlib import pyplot as plt
+        from matplotlib import colormaps
+
+        self._activate()
         fig, ax = plt.subplots()
         colormap = colormaps[colormapname]
         for machine in self.inst.machines:
-            machine_operations = sorted(machine.scheduled_operations, key=lambda op: op.start_time)
-            for operation in machine_operations:
+            # Un seul appel à broken_barh par machine pour les opérations, les set-ups et les tear-downs
+            bars, colors = [], []
+            for operation in machine.scheduled_operations:
                 operation_start = operation.start_time
-                operation_end = operation.end_time
-                operation_duration = operation_end - operation_start
-                operation_label = f"O{operation.operation_id}_J{operation.job_id}"
-    
+                operation_duration = operation.end_time - operation_start
+                bars.append((operation_start, operation_duration))
                 # Set color based on job ID
-                color_index = operation.job_id + 2
-                if color_index >= colormap.N:
-                    color_index = color_index % colormap.N
-                color = colormap(color_index)
-    
-                ax.broken_barh(
-                    [(operation_start, operation_duration)],
-                    (machine.machine_id - 0.4, 0.8),
-                    facecolors=color,
-                    edgecolor='black'
-                )
-
-                middle_of_operation = operation_start + operation_duration / 2
-                ax.text(
-                    middle_of_operation,
-                    machine.machine_id,
-                    operation_label,
-                    rotation=90,
-                    ha='center',
-                    va='center',
-                    fontsize=8
-                )
+                colors.append(colormap((operation.job_id + 2) % colormap.N))
+                ax.text(operation_start + operation_duration / 2, machine.machine_id,
+                        f"O{operation.operation_id}_J{operation.job_id}",
+                        rotation=90, ha='center', va='center', fontsize=8)
+            if bars:
+                ax.broken_barh(bars, (machine.machine_id - 0.4, 0.8), facecolors=colors, edgecolor='black')
+
             set_up_time = machine.set_up_time
             tear_down_time = machine.tear_down_time
+            if machine.start_times:
+                ax.broken_barh([(start, set_up_time) for start in machine.start_times],
+                               (machine.machine_id - 0.4, 0.8), facecolors=colormap(0), edgecolor='black')
+                ax.broken_barh([(stop, tear_down_time) for stop in machine.stop_times],
+                               (machine.machine_id - 0.4, 0.8), facecolors=colormap(1), edgecolor='black')
             for (start, stop) in zip(machine.start_times, machine.stop_times):
-                start_label = "set up"
-                stop_label = "tear down"
-                ax.broken_barh(
-                    [(start, set_up_time)],
-                    (machine.machine_id - 0.4, 0.8),
-                    facecolors=colormap(0),
-                    edgecolor='black'
-                )
-                ax.broken_barh(
-                    [(stop, tear_down_time)],
-                    (machine.machine_id - 0.4, 0.8),
-                    facecolors=colormap(1),
-                    edgecolor='black'
-                )
-                ax.text(
-                    start + set_up_time / 2.0,
-                    machine.machine_id,
-                    start_label,
-                    rotation=90,
-                    ha='center',
-                    va='center',
-                    fontsize=8
-                )
-                ax.text(
-                    stop + tear_down_time / 2.0,
-                    machine.machine_id,
-                    stop_label,
-                    rotation=90,
-                    ha='center',
-                    va='center',
-                    fontsize=8
-                )          
+                ax.text(start + set_up_time / 2.0, machine.machine_id, "set up",
+                        rotation=90, ha='center', va='center', fontsize=8)
+                ax.text(stop + tear_down_time / 2.0, machine.machine_id, "tear down",
+                        rotation=90, ha='center', va='center', fontsize=8)
 
         fig = ax.figure
         fig.set_size_inches(12, 6)
-    
+
         ax.set_yticks(range(self._instance.nb_machines))
         ax.set_yticklabels([f'M{machine_id+1}' for machine_id in range(self.inst.nb_machines)])
         ax.set_xlabel('Time')
         ax.set_ylabel('Machine')
         ax.set_title('Gantt Chart')
         ax.grid(True)
-    
+
         return plt
@@ -0,0 +1,81 @@
+'''
+Tests for the simulated annealing.
+
+@author: Vassilissa Lehoux
+'''
+import unittest
+import os
+import random
+from unittest import mock
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.solution import Solution
+from src.scheduling.optim.constructive import NonDeterminist
+from src.scheduling.optim.neighborhoods import MyNeighborhood1, MyNeighborhood2, CriticalPathNeighborhood
+from src.scheduling.optim.annealing import SimulatedAnnealing, cooling_schedule
+from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+
+
+class TestAnnealing(unittest.TestCase):
+
+    def setUp(self):
+        self.inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+
+    def test_cooling_schedule(self):
+        self.assertAlmostEqual(cooling_schedule('geometric', 10, 0.5)(2), 2.5)
+        self.assertAlmostEqual(cooling_schedule('linear', 10, 0.25)(2), 5)
+        self.assertEqual(cooling_schedule('linear', 10, 0.25)(8), 0)
+        self.assertAlmostEqual(cooling_schedule('logarithmic', 10, 1)(0), 10)
+        self.assertRaises(ValueError, cooling_schedule, 'unknown', 10, 0.5)
+
+    def test_random_move(self):
+        rng = random.Random(1)
+        sol = NonDeterminist({'seed': 1}).run(self.inst)
+        for Neighborhood in [MyNeighborhood1, MyNeighborhood2, CriticalPathNeighborhood]:
+            neighborhood = Neighborhood(self.inst)
+            keys = {move.key for move in neighborhood.moves(sol)}
+            for _ in range(20):
+                move = neighborhood.random_move(sol, rng)
+                if move is not None:
+                    self.assertIn(move.key, keys, 'the random move should be in the neighborhood')
+
+    def test_annealing(self):
+        values = []
+        params = {'seed': 3, 'max_iterations': 20, 'moves_per_level': 50,
+                  'callback': lambda step, s: values.append(s.objective)}
+        sol = SimulatedAnnealing().run(self.inst, NonDeterminist, [MyNeighborhood1, MyNeighborhood2], params)
+        self.assertEqual(sol.objective, min(values), 'the best solution should be returned')
+        self.assertLessEqual(sol.objective, values[0])
+        self.assertTrue(sol.is_feasible)
+
+    def test_batches(self):
+        # Le lot est évalué sur la solution courante : un lot de 1 ou de 256 mouvements donne
+        # une solution réalisable, et une même graine donne la même recherche
+        for batch_size in (1, 7, 256):
+            params = {'seed': 4, 'max_iterations': 10, 'moves_per_level': 64, 'batch_size': batch_size}
+            first = SimulatedAnnealing(params).run(self.inst, NonDeterminist, [MyNeighborhood1, MyNeighborhood2])
+            first = (first.objective, first.assignment)
+            second = SimulatedAnnealing(params).run(self.inst, NonDeterminist, [MyNeighborhood1, MyNeighborhood2])
+            self.assertEqual(first, (second.objective, second.assignment), 'the search should be reproducible')
+            self.assertTrue(second.is_feasible)
+
+    def test_acceptances(self):
+        # Les mouvements sont acceptés un à un : la taille des lots de seuils ne change pas la recherche
+        results = []
+        for batch_size in (1, None):
+            params = {'seed': 5, 'max_iterations': 20, 'moves_per_level': 100}
+            if batch_size is not None:
+                params['batch_size'] = batch_size
+            with mock.patch.object(Solution, 'apply', autospec=True, side_effect=Solution.apply) as apply, \
+                    mock.patch.object(Solution, 'delta', autospec=True, side_effect=Solution.delta) as delta:
+                sol = SimulatedAnnealing(params).run(self.inst, NonDeterminist, [MyNeighborhood1, MyNeighborhood2])
+            results.append((apply.call_count, delta.call_count, sol.objective))
+        (applied, scored, objective), (default_applied, default_scored, default_objective) = results
+        self.assertGreaterEqual(default_applied, applied, 'the default batch size should not accept fewer moves')
+        self.assertGreater(applied, 2 * 20, 'several moves should be accepted at each level')
+        self.assertEqual((default_scored, default_objective), (scored, objective))
+        self.assertLessEqual(scored, 20 * 100 + 256, 'only the considered moves should be scored')
+
+
+if __name__ == "__main__":
+    unittest.main()
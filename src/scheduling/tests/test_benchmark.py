@@ -0,0 +1,75 @@
+'''
+Tests for the benchmark of the heuristics.
+
+@author: Vassilissa Lehoux
+'''
+import unittest
+import io
+import os
+import multiprocessing
+import time
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.optim.constructive import Greedy
+from src.scheduling.benchmark import run_benchmark, summarize, compare, measure, resource, _print_summary
+from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+
+
+def _busy(duration: float):
+    end = time.process_time() + duration
+    while time.process_time() < end:
+        pass
+
+
+def _run_in_child(inst, seed):
+    # Le travail est fait dans un processus fils, comme pour les heuristiques multi-processus
+    child = multiprocessing.Process(target=_busy, args=(0.3,))
+    child.start()
+    child.join()
+    return Greedy().run(inst)
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.results = run_benchmark(['jsp1'], ['greedy', 'nondeterminist'], repeats=3,
+                                     data_folder=TEST_FOLDER_DATA)
+
+    def test_run(self):
+        records = self.results['records']
+        self.assertEqual(len(records), 4, 'the greedy heuristic should be run once')
+        self.assertEqual([r['seed'] for r in records if r['heuristic'] == 'nondeterminist'], [0, 1, 2])
+        for record in records:
+            self.assertGreater(record['peak_memory'], 0)
+            self.assertEqual(record['objective'], record['cmax'] + record['sum_ci'] + record['energy'])
+        summary = summarize(self.results)
+        self.assertEqual(summary[('jsp1', 'greedy')]['best_objective'], 290)
+        self.assertEqual(summary[('jsp1', 'nondeterminist')]['runs'], 3)
+
+    def test_compare(self):
+        self.assertEqual(compare(self.results, self.results), [], 'no regression expected')
+        worse = {'records': [dict(r) for r in self.results['records']]}
+        for record in worse['records']:
+            record['objective'] += 1
+            record['cpu_time'] = 10 * record['cpu_time'] + 1
+        regressions = compare(self.results, worse)
+        self.assertEqual(len(regressions), 4, 'objective and time regressions expected for both heuristics')
+        self.assertEqual(compare(worse, self.results), [], 'improvements are not regressions')
+
+    @unittest.skipIf(resource is None, "the cpu time of the child processes is not available")
+    def test_child_processes(self):
+        inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+        record = measure(_run_in_child, inst, 0, children=True)
+        self.assertGreaterEqual(record['cpu_time'], 0.25, 'the cpu time of the child should be counted')
+        self.assertIsNone(record['peak_memory'], 'the memory of the child processes is not measured')
+        self.assertLess(measure(_run_in_child, inst, 0, memory=False)['cpu_time'], 0.25)
+
+        results = run_benchmark(['jsp1'], ['multistart'], repeats=1, data_folder=TEST_FOLDER_DATA)
+        self.assertIsNone(results['records'][0]['peak_memory'])
+        out = io.StringIO()
+        _print_summary(results, out)
+        self.assertIn('multistart: runs in child processes', out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
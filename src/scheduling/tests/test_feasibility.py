@@ -0,0 +1,145 @@
+'''
+Tests for the feasibility checker.
+
+@author: Vassilissa Lehoux
+'''
+import unittest
+import os
+import random
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.optim.constructive import Greedy
+from src.scheduling.feasibility import Violation, totals
+from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+
+
+def reference_check(instance, assignment, cycles):
+    '''
+    Straightforward check of the constraints, one machine at a time:
+    returns the (kind, subject, magnitude) of the violations
+    '''
+    violations = []
+    ends = {}
+    for key, (machine_id, start) in assignment.items():
+        ends[key] = start + instance.operation(*key).machine_options[machine_id][0]
+    for job in instance.jobs:
+        previous = None
+        for op in job.operations:
+            key = (op.job_id, op.operation_id)
+            if key not in assignment:
+                violations.append(('unscheduled', key, 1))
+            elif previous in assignment and assignment[key][1] < ends[previous]:
+                violations.append(('precedence', key, ends[previous] - assignment[key][1]))
+            previous = key
+
+    for machine in instance.machines:
+        start_times, stop_times = cycles[machine.machine_id]
+        if len(start_times) != len(stop_times):
+            violations.append(('running', machine.machine_id, 1))
+        if start_times and start_times[0] < 0:
+            violations.append(('negative_start', machine.machine_id, -start_times[0]))
+        for i in range(1, len(start_times)):
+            if start_times[i] < stop_times[i - 1]:
+                violations.append(('cycle_overlap', machine.machine_id, stop_times[i - 1] - start_times[i]))
+        if stop_times and max(stop_times) > machine.end_time:
+            violations.append(('end_time', machine.machine_id, max(stop_times) - machine.end_time))
+        stops = list(stop_times) + [float('inf')] * (len(start_times) - len(stop_times))
+
+        operations = sorted((start, instance.operation(*key).index, key) for key, (machine_id, start)
+                            in assignment.items() if machine_id == machine.machine_id)
+        previous_end = None
+        for start, _, key in operations:
+            end = ends[key]
+            if previous_end is not None and start < previous_end:
+                violations.append(('overlap', key, previous_end - start))
+            previous_end = end if previous_end is None else max(previous_end, end)
+            cycle = next((i for i in range(len(start_times)) if start_times[i] <= start < stops[i]), None)
+            if cycle is None:
+                violations.append(('machine_off', key, end - start))
+                continue
+            if start < start_times[cycle] + machine.set_up_time:
+                violations.append(('set_up', key, start_times[cycle] + machine.set_up_time - start))
+            if end > stops[cycle] - machine.tear_down_time:
+                violations.append(('tear_down', key, end - stops[cycle] + machine.tear_down_time))
+    return violations
+
+
+class TestFeasibility(unittest.TestCase):
+
+    def setUp(self):
+        self.inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+        self.sol = Greedy().run(self.inst)
+        # op00 : M0 de 15 à 25, op01 : M2 de 25 à 29, op12 : M2 de 12 à 18, op13 : M2 de 18 à 25
+        self.assignment, self.cycles = self.sol.assignment, self.sol.cycles
+
+    def violations(self, assignment=dict(), cycles=dict()):
+        self.sol.load({**self.assignment, **assignment}, {**self.cycles, **cycles})
+        return self.sol.violations
+
+    def test_feasible(self):
+        self.assertEqual(self.sol.violations, [])
+        self.assertTrue(self.sol.is_feasible)
+
+    def test_operation_violations(self):
+        self.assertEqual(self.violations({(0, 1): (2, 22)}),
+                         [Violation('precedence', (0, 1), 3), Violation('overlap', (0, 1), 3)])
+        self.assertEqual(self.violations({(1, 2): (2, 5)}), [Violation('set_up', (1, 2), 7)])
+        self.assertEqual(self.violations(cycles={2: ([0], [30])}),
+                         [Violation('tear_down', (0, 1), 11), Violation('tear_down', (1, 3), 7)])
+        self.assertEqual(self.violations(cycles={0: ([0], [10])}), [Violation('machine_off', (0, 0), 10)])
+        self.assertFalse(self.sol.is_feasible)
+
+    def test_machine_off_gap(self):
+        # op00 (15-25) commence alors que M0 est arrêtée entre 12 et 30 : machine arrêtée, pas set-up
+        self.assertEqual(self.violations(cycles={0: ([0, 30], [12, 100])}), [Violation('machine_off', (0, 0), 10)])
+        self.assertEqual(self.sol.penalty, 10)
+        # Avant le premier démarrage de la machine
+        self.assertEqual(self.violations(cycles={0: ([20], [100])}), [Violation('machine_off', (0, 0), 10)])
+
+    def test_random_schedules(self):
+        # Plannings de Greedy perturbés, comparés à une vérification machine par machine
+        rng = random.Random(0)
+        gaps = 0
+        for _ in range(300):
+            assignment = {}
+            for key, (machine_id, start) in self.assignment.items():
+                if rng.random() < 0.05:
+                    continue
+                if rng.random() < 0.2:
+                    machine_id = rng.randrange(self.inst.nb_machines)
+                if rng.random() < 0.5:
+                    start = max(0, start + rng.randint(-10, 10))
+                assignment[key] = (machine_id, start)
+            cycles = {}
+            for machine in self.inst.machines:
+                times = sorted(rng.randint(-5, 140) for _ in range(2 * rng.randint(0, 3)))
+                start_times, stop_times = times[::2], times[1::2]
+                if start_times and rng.random() < 0.2:
+                    stop_times = stop_times[:-1]
+                cycles[machine.machine_id] = (start_times, stop_times)
+            self.sol.load(assignment, cycles)
+
+            expected = reference_check(self.inst, assignment, cycles)
+            violations = self.sol.violations
+            self.assertEqual(sorted((v.kind, v.subject, v.magnitude) for v in violations), sorted(expected),
+                             f'wrong violations for {assignment} and {cycles}')
+            self.assertEqual(self.sol.penalty, sum(v.magnitude for v in violations))
+            gaps += sum(1 for (job_id, operation_id), (machine_id, start) in assignment.items()
+                        if any(stop <= start < following for stop, following
+                               in zip(cycles[machine_id][1], cycles[machine_id][0][1:])))
+        self.assertGreater(gaps, 0, 'some operations should start while their machine is stopped')
+
+    def test_machine_violations(self):
+        self.assertEqual(self.violations(cycles={2: ([0], [150])}), [Violation('end_time', 2, 20)])
+        self.assertEqual(self.violations(cycles={0: ([0], [])}), [Violation('running', 0, 1)])
+        violations = self.violations(cycles={0: ([0, 35], [40, 100])})
+        self.assertEqual(violations, [Violation('cycle_overlap', 0, 5)])
+        self.assertEqual(totals(violations + violations), {'cycle_overlap': 10})
+
+    def test_unscheduled(self):
+        del self.assignment[(1, 3)]
+        self.assertEqual(self.violations(), [Violation('unscheduled', (1, 3), 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+'''
+Tests for the Gantt exporters.
+
+@author: Vassilissa Lehoux
+'''
+import unittest
+import os
+import json
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.optim.constructive import Greedy
+from src.scheduling.optim.moves import Swap
+from src.scheduling.gantt import gantt_data, to_json, to_svg
+from src.scheduling.tests.test_utils import TEST_FOLDER_DATA, TEST_FOLDER
+
+
+class TestGantt(unittest.TestCase):
+
+    def setUp(self):
+        self.inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+        self.sol = Greedy().run(self.inst)
+
+    def test_gantt_data(self):
+        data = gantt_data(self.sol)
+        self.assertEqual(data['objective'], self.sol.objective)
+        self.assertEqual(len(data['machines']), self.inst.nb_machines)
+        self.assertEqual(sum(len(machine['operations']) for machine in data['machines']), self.inst.nb_operations)
+        for machine in data['machines']:
+            for op in machine['operations']:
+                operation = self.inst.operation(op['job'], op['operation'])
+                self.assertEqual((op['start'], op['end']), (operation.start_time, operation.end_time))
+
+        # Le planning d'une copie inactive est lu par ses propriétés publiques
+        copy = self.sol.clone()
+        self.sol.apply(Swap(2, 1))
+        self.assertEqual(gantt_data(copy), data)
+        self.assertNotEqual(gantt_data(self.sol), data)
+
+    def test_exports(self):
+        filepath = TEST_FOLDER + os.path.sep + 'temp.json'
+        to_json(self.sol, filepath)
+        with open(filepath) as f:
+            self.assertEqual(json.load(f), gantt_data(self.sol))
+        os.remove(filepath)
+
+        filepath = TEST_FOLDER + os.path.sep + 'temp.svg'
+        to_svg(self.sol, filepath)
+        root = ET.parse(filepath).getroot()
+        rects = root.findall('.//{http://www.w3.org/2000/svg}rect')
+        cycles = sum(len(machine.start_times) for machine in self.inst.machines)
+        self.assertEqual(len(rects), self.inst.nb_operations + 2 * cycles)
+        os.remove(filepath)
+
+    def test_no_matplotlib_import(self):
+        code = "import sys; import src.scheduling.gantt; import src.scheduling.optim.local_search; " \
+               "print('matplotlib' in sys.modules)"
+        root = os.path.dirname(os.path.dirname(os.path.dirname(TEST_FOLDER)))
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), 'False', 'matplotlib should only be imported to plot')
+
+
+if __name__ == "__main__":
+    unittest.main()
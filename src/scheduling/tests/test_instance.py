@@ -5,8 +5,11 @@ Tests for the Instance class.
 '''
 import unittest
 import os
+import shutil
+import tempfile
 
 from src.scheduling.instance.instance import Instance
+from src.scheduling.instance import cache
 from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
 
 
@@ -27,7 +30,130 @@ class TestInstances(unittest.TestCase):
         self.assertEqual(len(self.inst.machines), 4, 'wrong nb of machines')
         self.assertEqual(len(self.inst.jobs), 2, 'wrong nb of jobs')
         self.assertEqual(str(self.inst), 'jsp1_M4_J2_O4', 'wrong string representation of the instance')
-        
+
+    def test_operation_lookup(self):
+        op = self.inst.operation(1, 3)
+        self.assertEqual((op.job_id, op.operation_id), (1, 3), 'wrong operation')
+        self.assertEqual(op.machine_options[2], (7, 15), 'wrong machine options')
+        self.assertIs(self.inst.get_operation(1, 3), op, 'lookups should agree')
+        self.assertIsNone(self.inst.operation(0, 3), 'operation 3 does not belong to job 0')
+        # Les précédences sont créées dans l'ordre du fichier
+        self.assertEqual(op.predecessors, [self.inst.operation(1, 2)], 'wrong predecessors')
+        self.assertEqual(self.inst.get_job(1).operations, [self.inst.operation(1, 2), op],
+                         'wrong job operations')
+
+    def test_reset_schedule(self):
+        ops = self.inst.operations
+        self.assertEqual([op.index for op in ops], list(range(len(ops))), 'wrong index in the schedule state')
+        machine = self.inst.get_machine(2)
+        machine.add_operation(self.inst.operation(1, 2))
+        op = self.inst.operation(1, 2)
+        self.assertEqual((op.assigned_to, op.start_time, op.end_time, op.energy), (2, 12, 18, 7))
+
+        self.inst.reset_schedule()
+        self.assertFalse(any(op.assigned for op in ops), 'operations should not be assigned anymore')
+        self.assertEqual((op.assigned_to, op.start_time, op.end_time), (-1, -1, -1))
+        self.assertEqual(machine.scheduled_operations, [])
+        machine.add_operation(op)
+        self.assertEqual(op.start_time, 12, 'operation should be scheduled again')
+
+    def test_as_arrays(self):
+        arrays = self.inst.as_arrays()
+        self.assertIs(self.inst.as_arrays(), arrays, 'arrays should be computed once')
+        self.assertEqual(arrays.processing_time.shape, (4, 4), 'wrong matrix shape')
+        self.assertEqual(list(arrays.op_job), [0, 0, 1, 1], 'wrong jobs')
+        self.assertEqual(list(arrays.op_rank), [0, 1, 0, 1], 'wrong ranks')
+        self.assertEqual(list(arrays.job_ops[arrays.job_ptr[1]:arrays.job_ptr[2]]), [2, 3],
+                         'wrong operations for job 1')
+        self.assertEqual(arrays.processing_time[3, 2], 7, 'wrong processing time')
+        self.assertEqual(arrays.energy[3, 2], 15, 'wrong energy')
+        self.assertEqual(list(arrays.end_time), [100, 120, 130, 110], 'wrong machine end times')
+        self.assertTrue(arrays.eligible.all(), 'all machines are eligible in jsp1')
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            folder = os.path.join(tmp_dir, "jsp1")
+            shutil.copytree(TEST_FOLDER_DATA + os.path.sep + "jsp1", folder,
+                            ignore=shutil.ignore_patterns(cache.CACHE_FOLDER))
+            self.assertIsNone(cache.load(folder), 'no cache before the first load')
+            Instance.from_file(folder, use_cache=True)
+            self.assertTrue(os.path.exists(cache.cache_filepath(folder)), 'cache should be built')
+
+            inst = Instance.from_file(folder, use_cache=True)
+            self.assertEqual(str(inst), 'jsp1_M4_J2_O4', 'wrong instance read from the cache')
+            self.assertEqual(inst.operation(1, 3).machine_options, self.inst.operation(1, 3).machine_options,
+                             'wrong machine options read from the cache')
+            self.assertEqual(inst.operation(1, 3).predecessors, [inst.operation(1, 2)],
+                             'wrong precedences read from the cache')
+            self.assertFalse(inst.as_arrays().processing_time.flags.writeable, 'arrays should be read-only')
+
+            # Modifier un csv invalide le cache
+            op_file = os.path.join(folder, "jsp1_op.csv")
+            with open(op_file, 'a') as f:
+                f.write("\n1,3,3,1,1")
+            self.assertIsNone(cache.load(folder), 'cache should be invalidated')
+            inst = Instance.from_file(folder, use_cache=True)
+            self.assertEqual(inst.operation(1, 3).machine_options[3], (1, 1), 'csv should be read again')
+
+    def test_no_cache_by_default(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            folder = os.path.join(tmp_dir, "jsp1")
+            shutil.copytree(TEST_FOLDER_DATA + os.path.sep + "jsp1", folder,
+                            ignore=shutil.ignore_patterns(cache.CACHE_FOLDER))
+            Instance.from_file(folder)
+            self.assertFalse(os.path.exists(os.path.join(folder, cache.CACHE_FOLDER)),
+                             'the data folder should not be written without use_cache')
+
+            # Une opération sur une machine inconnue : l'instance est lue mais pas mise en cache
+            with open(os.path.join(folder, "jsp1_op.csv"), 'a') as f:
+                f.write("\n1,3,7,1,1")
+            inst = Instance.from_file(folder, use_cache=True)
+            self.assertEqual(inst.operation(1, 3).machine_options[7], (1, 1), 'wrong machine options')
+            self.assertIsNone(cache.load(folder), 'instance with an unknown machine should not be cached')
+            self.assertRaises(ValueError, inst.as_arrays)
+
+    def test_precomputed_tables(self):
+        op00, op01, op13 = self.inst.operation(0, 0), self.inst.operation(0, 1), self.inst.operation(1, 3)
+        self.assertEqual(self.inst.fastest_machines(op00), [3, 0, 1, 2], 'wrong order by processing time')
+        # M0 et M3 consomment 15 : départage par la durée
+        self.assertEqual(self.inst.cheapest_machines(op00), [2, 1, 3, 0], 'wrong order by energy')
+        self.assertEqual(self.inst.min_processing_time(op01), 4)
+        self.assertEqual([self.inst.remaining_work(op) for op in self.inst.operations], [4, 0, 7, 0],
+                         'wrong remaining work')
+        self.assertEqual(self.inst.machine_load_bound(2), 0, 'all machines are eligible in jsp1')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            folder = os.path.join(tmp_dir, "jsp1")
+            shutil.copytree(TEST_FOLDER_DATA + os.path.sep + "jsp1", folder,
+                            ignore=shutil.ignore_patterns(cache.CACHE_FOLDER))
+            # op13 ne peut plus être exécutée que sur M2 (durée 7)
+            op_file = os.path.join(folder, "jsp1_op.csv")
+            with open(op_file) as f:
+                lines = [line for line in f.read().splitlines() if not line.startswith("1,3,") or line.startswith("1,3,2,")]
+            with open(op_file, 'w') as f:
+                f.write("\n".join(lines))
+            # Lecture du csv, puis construction et enfin lecture du cache
+            for use_cache in (False, True, True):
+                inst = Instance.from_file(folder, use_cache=use_cache)
+                self.assertEqual(inst.fastest_machines(inst.operation(1, 3)), [2])
+                self.assertEqual(inst.machine_load_bound(2), 7, 'op13 must be processed on M2')
+                self.assertEqual(inst.remaining_work(inst.operation(1, 2)), 7)
+
+    def test_operation_with_id(self):
+        self.assertIs(self.inst.operation_with_id(3), self.inst.operation(1, 3))
+        self.assertIsNone(self.inst.operation_with_id(7))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            folder = os.path.join(tmp_dir, "jsp1")
+            shutil.copytree(TEST_FOLDER_DATA + os.path.sep + "jsp1", folder,
+                            ignore=shutil.ignore_patterns(cache.CACHE_FOLDER))
+            # Le job 1 a aussi une opération 0 : l'identifiant 0 devient ambigu
+            with open(os.path.join(folder, "jsp1_op.csv"), 'a') as f:
+                f.write("\n1,0,2,1,1")
+            inst = Instance.from_file(folder)
+            self.assertRaisesRegex(ValueError, 'ambigu', inst.operation_with_id, 0)
+            self.assertIs(inst.operation_with_id(3), inst.operation(1, 3))
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
@@ -0,0 +1,79 @@
+'''
+Tests for the island model.
+
+@author: Vassilissa Lehoux
+'''
+import unittest
+import os
+import time
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.solution import Solution
+from src.scheduling.optim.constructive import NonDeterminist
+from src.scheduling.optim.heuristics import Heuristic
+from src.scheduling.optim.islands import IslandModel, Migrant
+from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+
+
+class _Failing(Heuristic):
+    '''
+    Heuristic whose runs fail, to test the islands that die
+    '''
+
+    def __init__(self, params=dict()):
+        self._params = params
+
+    def run(self, instance, InitClass, NeighborClass, params=dict()):
+        raise RuntimeError("run failed")
+
+
+class TestIslands(unittest.TestCase):
+
+    def setUp(self):
+        self.inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+
+    def test_migrant(self):
+        sol = NonDeterminist({'seed': 2}).run(self.inst)
+        migrant = Migrant(0, 0.0, sol)
+        assignment, cycles, objective = sol.assignment, sol.cycles, sol.objective
+        copy = Solution(self.inst)
+        migrant.load(copy)
+        self.assertEqual(copy.assignment, assignment)
+        self.assertEqual(copy.cycles, cycles)
+        self.assertEqual(copy.objective, objective)
+
+        # M0 toujours allumée : un démarrage de plus que d'arrêts
+        cycles[0] = ([0, 50], [40])
+        cycles[2] = ([0], [35])
+        copy.load(assignment, cycles)
+        Migrant(0, 0.0, copy).load(sol)
+        self.assertEqual(sol.cycles, cycles, 'the stop times should be read at their own offsets')
+
+    def test_islands(self):
+        received = []
+        best, trajectories = IslandModel().run_results(
+            self.inst, {'islands': 2, 'time_limit': 0.5, 'interval': 0.1, 'callback': received.append})
+        self.assertEqual(sorted(trajectories), [0, 1])
+        for trajectory in trajectories.values():
+            values = [objective for _, objective in trajectory]
+            self.assertEqual(values, sorted(values, reverse=True), 'the best solution of an island can only improve')
+        self.assertEqual(best.objective, min(trajectory[-1][1] for trajectory in trajectories.values()))
+        self.assertEqual(best.objective, min(migrant.objective for migrant in received))
+        sol = Solution(self.inst)
+        best.load(sol)
+        self.assertTrue(sol.is_feasible)
+        self.assertEqual(sol.objective, best.objective)
+
+    def test_failed_islands(self):
+        start = time.perf_counter()
+        best, trajectories = IslandModel({'heuristic': _Failing}).run_results(
+            self.inst, {'islands': 2, 'time_limit': 30, 'interval': 0.1})
+        self.assertLess(time.perf_counter() - start, 10, 'the coordinator should not wait for dead islands')
+        self.assertIsNone(best)
+        self.assertEqual(trajectories, {})
+        self.assertRaises(RuntimeError, IslandModel({'heuristic': _Failing, 'islands': 1, 'time_limit': 1}).run,
+                          self.inst)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+'''
+Tests for the local search heuristics.
+
+@author: Vassilissa Lehoux
+'''
+import unittest
+import os
+import random
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.optim.heuristics import Heuristic
+from src.scheduling.optim.constructive import Greedy, NonDeterminist, _candidates
+from src.scheduling.optim.local_search import FirstNeighborLocalSearch, BestNeighborLocalSearch
+from src.scheduling.optim.neighborhoods import Neighborhood, MoveNeighborhood, MyNeighborhood1, MyNeighborhood2, \
+    CriticalPathNeighborhood
+from src.scheduling.optim.moves import Swap, Reassign
+from src.scheduling.solution import Solution
+from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+
+
+class _Overlapping(Heuristic):
+    '''
+    Greedy solution in which op01 starts on M2 before the end of op00 and of op13
+    '''
+
+    def __init__(self, params=dict()):
+        self._params = params
+
+    def run(self, instance, params=dict()):
+        sol = Greedy().run(instance, {**self._params, **params})
+        assignment = sol.assignment
+        assignment[(0, 1)] = (2, 22)
+        sol.load(assignment, sol.cycles)
+        return sol
+
+
+class _Identity(Neighborhood):
+    '''
+    Neighborhood implementing only the methods of the base class
+    '''
+
+    def best_neighbor(self, sol):
+        return sol
+
+    def first_better_neighbor(self, sol):
+        return sol
+
+
+class _Adjacent(MoveNeighborhood):
+    '''
+    Swaps of the first two operations of the machines, without random moves
+    '''
+
+    def moves(self, sol):
+        for machine in self._instance.machines:
+            if len(machine.scheduled_operations) > 1:
+                yield Swap(machine.machine_id, 0)
+
+
+class TestLocalSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+
+    def test_iter_moves(self):
+        # Greedy : M2 = [op12, op13, op01], seul l'échange de op13 et op01 est possible
+        sol = Greedy().run(self.inst)
+        self.assertEqual(list(MyNeighborhood1(self.inst).iter_moves(sol)), [(Swap(2, 1), (7, 11, 0, 18))])
+        moves = MyNeighborhood2(self.inst).iter_moves(sol)
+        move, delta = next(moves)
+        self.assertEqual(delta, sol.delta(move), 'moves should be generated with their delta')
+        self.assertEqual(len(list(moves)) + 1, sum(1 for m in MyNeighborhood2(self.inst).moves(sol)
+                                                   if sol.delta(m) is not None))
+
+    def test_critical_path(self):
+        sol = Greedy().run(self.inst)
+        op01, op12, op13 = self.inst.operation(0, 1), self.inst.operation(1, 2), self.inst.operation(1, 3)
+        self.assertEqual(sol.critical_path(), [op12, op13, op01], 'path should end with op01 at cmax 29')
+
+        neighborhood = CriticalPathNeighborhood(self.inst)
+        moves = list(neighborhood.moves(sol))
+        # op12 et op13 sont du même job : seul l'échange de op13 et op01 est possible
+        self.assertEqual([m for m in moves if isinstance(m, Swap)], [Swap(2, 1)])
+        self.assertIn(Reassign(op13, 1, 0), moves)
+        self.assertTrue(all(m.operation in (op01, op12, op13) for m in moves if isinstance(m, Reassign)))
+
+        sol = neighborhood.best_neighbor(sol)
+        self.assertLess(sol.objective, 290, 'a move of the critical path improves the greedy solution')
+        self.assertEqual(neighborhood.critical_path(sol), sol.critical_path(), 'path should be updated')
+
+        # Mise à jour incrémentale du chemin après des mouvements aléatoires
+        rng = random.Random(0)
+        sol = NonDeterminist({'seed': 1}).run(self.inst)
+        neighborhood = CriticalPathNeighborhood(self.inst)
+        other = MyNeighborhood2(self.inst)
+        for _ in range(200):
+            move = other.random_move(sol, rng)
+            if move is None or sol.delta(move) is None:
+                continue
+            sol.apply(move)
+            path = neighborhood.critical_path(sol)
+            self.assertEqual(path, sol.critical_path(), f'wrong critical path after {move}')
+            for op, following in zip(path, path[1:]):
+                self.assertEqual(op.end_time, following.start_time, 'the path should not have idle time')
+
+    def test_anytime(self):
+        for heuristic, neighborhoods in ((FirstNeighborLocalSearch(), MyNeighborhood1),
+                                         (BestNeighborLocalSearch(), [MyNeighborhood1, MyNeighborhood2])):
+            values = []
+            sol = heuristic.run(self.inst, NonDeterminist, neighborhoods,
+                                {'seed': 3, 'callback': lambda step, s: values.append(s.objective)})
+            self.assertEqual(values[-1], sol.objective, 'the last incumbent should be returned')
+            self.assertEqual(values, sorted(values, reverse=True), 'incumbents should improve')
+
+            # Sans temps, la solution initiale est rendue
+            initial = NonDeterminist().run(self.inst, {'seed': 3}).objective
+            sol = heuristic.run(self.inst, NonDeterminist, neighborhoods, {'seed': 3, 'time_limit': 0})
+            self.assertEqual(sol.objective, initial)
+            sol = heuristic.run(self.inst, NonDeterminist, neighborhoods, {'seed': 3, 'max_iterations': 0})
+            self.assertEqual(sol.objective, initial)
+
+            incumbents = list(heuristic.iterate(self.inst, NonDeterminist, neighborhoods, {'seed': 3}))
+            self.assertEqual(len(incumbents), len(values))
+
+    def test_penalty_weight(self):
+        self.assertEqual(Greedy({'penalty_weight': 5}).run(self.inst).penalty_weight, 5)
+        values = []
+        sol = BestNeighborLocalSearch().run(self.inst, _Overlapping, [MyNeighborhood1, MyNeighborhood2],
+                                            {'penalty_weight': 100, 'callback': lambda step, s: values.append(s.value)})
+        self.assertEqual(sol.penalty_weight, 100, 'the weight should be given to the solution of the search')
+        self.assertEqual(sol.value, sol.objective + 100 * sol.penalty)
+        self.assertEqual(values, sorted(values, reverse=True), 'the weighted values should improve')
+        initial = _Overlapping().run(self.inst)
+        self.assertEqual(values[0], initial.objective + 100 * initial.penalty)
+        # Les violations pondérées orientent la recherche vers une autre solution
+        unweighted = BestNeighborLocalSearch().run(self.inst, _Overlapping, [MyNeighborhood1, MyNeighborhood2])
+        self.assertEqual(unweighted.penalty_weight, 0)
+        self.assertNotEqual(sol.assignment, unweighted.assignment)
+
+    def test_plan_cycles(self):
+        for heuristic, neighborhoods in ((FirstNeighborLocalSearch(), MyNeighborhood2),
+                                         (BestNeighborLocalSearch(), [MyNeighborhood1, MyNeighborhood2])):
+            sol = heuristic.run(self.inst, NonDeterminist, neighborhoods, {'seed': 3, 'plan_cycles': True})
+            self.assertTrue(sol.plans_cycles)
+            self.assertEqual(sol.plan_cycles(), 0, 'the machines should be stopped during their idle times')
+            self.assertTrue(sol.is_feasible)
+            unplanned = heuristic.run(self.inst, NonDeterminist, neighborhoods, {'seed': 3})
+            self.assertFalse(unplanned.plans_cycles)
+            self.assertGreater(unplanned.plan_cycles(), 0)
+
+    def test_rankings(self):
+        # Le choix glouton par les machines les plus rapides est celui du parcours de toutes les paires
+        for insertion in (False, True):
+            sol = Solution(self.inst)
+            candidates = _candidates(sol, insertion)
+            while candidates:
+                _, _, op, machine = min(candidates, key=lambda c: (c[0], c[1], c[2].operation_id, c[3].machine_id))
+                sol.schedule(op, machine, insertion)
+                candidates = _candidates(sol, insertion)
+            greedy = Greedy({'insertion': insertion}).run(self.inst)
+            self.assertEqual(greedy.assignment, sol.assignment)
+
+        # Les réaffectations d'une opération sont proposées de la machine la plus rapide à la plus lente
+        sol = Greedy().run(self.inst)
+        op00 = self.inst.operation(0, 0)
+        machine_ids = []
+        for move in MyNeighborhood2(self.inst).moves(sol):
+            if move.operation is op00 and move.key[2] not in machine_ids:
+                machine_ids.append(move.key[2])
+        self.assertEqual(machine_ids, [m for m in self.inst.fastest_machines(op00) if m != op00.assigned_to])
+
+    def test_neighborhood_classes(self):
+        # Un voisinage ne définissant que les méthodes de la classe de base reste utilisable
+        sol = FirstNeighborLocalSearch().run(self.inst, Greedy, _Identity)
+        self.assertEqual(sol.objective, 290)
+        # Un voisinage par mouvements n'a besoin que de moves pour les recherches locales
+        sol = BestNeighborLocalSearch().run(self.inst, Greedy, _Adjacent)
+        self.assertTrue(sol.is_feasible)
+        self.assertRaises(NotImplementedError, _Adjacent(self.inst).random_move, sol, random.Random(0))
+        self.assertRaises(TypeError, MoveNeighborhood, self.inst)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,6 +20,8 @@ class TestMachine(unittest.TestCase):
             min_consumption=2,  # Énergie par seconde quand la machine est à vide
             end_time=200
         )
+        # Les totaux incrémentaux sont vérifiés par un recalcul complet à chaque lecture
+        self.machine.check_aggregates = True
 
         # On crée des opérations prêtes à être planifiées
         self.op1 = Operation(job_id=0, operation_id=0)
@@ -84,6 +86,62 @@ class TestMachine(unittest.TestCase):
         # Énergie totale attendue = 70 + 220 + 0 = 290
         self.assertEqual(self.machine.total_energy_consumption, 290)
 
+    def testTimeline(self):
+        """Teste l'ordre des opérations, leur retrait et la recherche de trous."""
+        # op1 de 10 à 25, op2 de 40 à 60 : trou de 15 entre les deux
+        self.machine.add_operation(self.op1)
+        self.machine.add_operation(self.op2, start_time=40)
+        self.assertEqual(self.machine.scheduled_operations, [self.op1, self.op2])
+        self.assertEqual(self.machine.available_time, 60)
+
+        self.assertEqual(self.machine.earliest_gap(0, 15), 25, 'the gap between op1 and op2 is long enough')
+        self.assertEqual(self.machine.earliest_gap(0, 16), 60, 'the gap between op1 and op2 is too short')
+        self.assertEqual(self.machine.earliest_gap(30, 5), 30)
+        timeline = self.machine.timeline
+        self.assertEqual([timeline.index(self.op1), timeline.index(self.op2)], [0, 1])
+        self.assertEqual([timeline.rank(t) for t in (0, 10, 11, 40, 41)], [0, 0, 1, 1, 2],
+                         'rank should count the operations starting strictly before')
+
+        self.machine.remove_operation(self.op2)
+        self.assertFalse(self.op2.assigned, 'removed operation should be reset')
+        self.assertEqual(self.machine.scheduled_operations, [self.op1])
+        self.assertEqual(self.machine.available_time, 25)
+        self.assertEqual(self.machine.earliest_gap(0, 16), 25)
+
+
+    def testAggregatesUpdate(self):
+        """Teste la mise à jour des totaux lors des retraits et des reprises."""
+        self.machine.add_operation(self.op1)
+        self.machine.add_operation(self.op2)
+        self.machine.stop(at_time=50)
+        self.assertEqual(self.machine.total_energy_consumption, 290)
+
+        # La machine reprend après op2 et reste allumée jusqu'à t=100 : 50s à vide de plus
+        self.machine.cancel_stop()
+        self.assertEqual(self.machine.working_time, 45)
+        self.machine.stop(at_time=100)
+        self.assertEqual(self.machine.working_time, 100)
+        self.assertEqual(self.machine.total_energy_consumption, 290 + 50 * 2)
+
+        # Retirer op2 libère 20s de production, qui deviennent du temps à vide
+        self.machine.remove_operation(self.op2)
+        self.assertEqual(self.machine.total_energy_consumption, 290 + 50 * 2 - 120 + 20 * 2)
+
+        self.machine.reset()
+        self.assertEqual(self.machine.working_time, 0)
+        self.assertEqual(self.machine.total_energy_consumption, 0)
+
+    def testPlanCycles(self):
+        """Teste l'arrêt de la machine pendant les temps morts assez longs."""
+        # Arrêt puis redémarrage : 15s et 70 d'énergie, rentable pour un trou de plus de 35s à vide
+        starts, ends = [10, 40, 120], [25, 60, 130]
+        self.assertEqual(self.machine.plan_cycles(starts, ends), ([0, 110], [65, 135]))
+        self.assertEqual(self.machine.plan_cycles([10, 61], [25, 70]), ([0, 51], [30, 75]))
+        self.assertEqual(self.machine.plan_cycles([10, 60], [25, 70]), ([0], [75]))
+        self.assertEqual(self.machine.plan_cycles([], []), ([], []))
+        # 2 cycles, 15s à vide au lieu de 140s pour un seul cycle de 0 à la date de fin 200
+        self.assertEqual(self.machine.planned_energy(starts, ends, 45, 0), 2 * 70 + 15 * 2)
+        self.assertEqual(self.machine.cycle_energy(10, 130, 45, 0), 70 + 140 * 2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+'''
+Tests for the multi-start runner.
+
+@author: Vassilissa Lehoux
+'''
+import unittest
+import os
+import time
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.solution import Solution
+from src.scheduling.optim.constructive import NonDeterminist
+from src.scheduling.optim.multistart import MultiStart, RunResult, run_seeds
+from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+
+
+class TestMultiStart(unittest.TestCase):
+
+    def setUp(self):
+        self.inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+
+    def test_run_seeds(self):
+        # Les graines des premiers runs ne changent pas quand MultiStart en génère davantage
+        self.assertEqual(run_seeds(7, 1024), run_seeds(7, 2048)[:1024])
+        self.assertEqual(run_seeds(7, 3), run_seeds(7, 3), 'seeds should only depend on the seed')
+        self.assertNotEqual(run_seeds(7, 3), run_seeds(8, 3))
+        self.assertEqual(len(set(run_seeds(0, 100))), 100)
+
+    def test_best_of_runs(self):
+        best, nb_runs = MultiStart({'runs': 6, 'workers': 2, 'seed': 3}).run_results(self.inst)
+        self.assertEqual(nb_runs, 6)
+        results = [RunResult(run, seed, NonDeterminist().run(self.inst, {'seed': seed}))
+                   for run, seed in enumerate(run_seeds(3, 6))]
+        expected = min(results, key=lambda r: (not r.feasible, r.objective, r.run))
+        self.assertEqual((best.run, best.seed, best.objective), (expected.run, expected.seed, expected.objective))
+        self.assertEqual(best.assignment, expected.assignment)
+
+        sol = MultiStart({'runs': 6, 'workers': 2, 'seed': 3}).run(self.inst)
+        self.assertIsInstance(sol, Solution)
+        self.assertEqual(sol.objective, expected.objective)
+        self.assertTrue(sol.is_feasible)
+
+    def test_reproducible(self):
+        params = {'runs': 4, 'seed': 5}
+        first, _ = MultiStart({**params, 'workers': 2}).run_results(self.inst)
+        second, _ = MultiStart({**params, 'workers': 2}).run_results(self.inst)
+        serial, _ = MultiStart({**params, 'workers': 1}).run_results(self.inst)
+        for other in (second, serial):
+            self.assertEqual((other.run, other.seed, other.objective), (first.run, first.seed, first.objective),
+                             'the result should not depend on the run or on the number of processes')
+            self.assertEqual(other.assignment, first.assignment)
+            self.assertEqual(other.cycles, first.cycles)
+
+    def test_time_limit(self):
+        for workers in (1, 2):
+            start = time.perf_counter()
+            best, nb_runs = MultiStart({'runs': None, 'time_limit': 0.3, 'workers': workers}).run_results(self.inst)
+            self.assertLess(time.perf_counter() - start, 5, 'the runs should stop after the time limit')
+            self.assertGreater(nb_runs, 0)
+            self.assertEqual(best.seed, run_seeds(0, nb_runs)[best.run], 'the run i should use the i-th seed')
+
+
+if __name__ == "__main__":
+    unittest.main()
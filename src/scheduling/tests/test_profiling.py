@@ -0,0 +1,39 @@
+'''
+Tests for the instrumentation of the scheduling core.
+
+@author: Vassilissa Lehoux
+'''
+import unittest
+import os
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.instance.machine import Machine
+from src.scheduling.optim.constructive import Greedy
+from src.scheduling.optim.neighborhoods import MyNeighborhood1
+from src.scheduling.profiling import Profiler
+from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+
+    def test_profiler(self):
+        add_operation = Machine.add_operation
+        with Profiler() as profiler:
+            self.assertIsNot(Machine.add_operation, add_operation, 'add_operation should be instrumented')
+            sol = Greedy().run(self.inst)
+            MyNeighborhood1(self.inst).best_neighbor(sol)
+        self.assertIs(Machine.add_operation, add_operation, 'instrumentation should be removed')
+
+        self.assertEqual(profiler.calls['Machine.add_operation'], 4, 'one call per operation')
+        self.assertGreater(profiler.calls['Operation.min_start_time'], 0)
+        # Greedy : M2 = [op12, op13, op01], seul l'échange de op13 et op01 est possible
+        self.assertEqual(profiler.iterations[0][:4], ('MyNeighborhood1.best_neighbor', 1, 1, 0))
+        self.assertEqual(profiler.neighbors, (1, 1, 0))
+        self.assertIn('MyNeighborhood1.best_neighbor', profiler.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,9 +5,13 @@ Test of the Solution class.
 '''
 import unittest
 import os
+import tempfile
 
 from src.scheduling.instance.instance import Instance
 from src.scheduling.solution import Solution
+from src.scheduling.optim.constructive import Greedy
+from src.scheduling.optim.moves import Swap, Reassign
+from src.scheduling.optim.neighborhoods import MyNeighborhood1, MyNeighborhood2
 from src.scheduling.tests.test_utils import TEST_FOLDER_DATA, TEST_FOLDER
 
 
@@ -79,7 +83,52 @@ class TestSolution(unittest.TestCase):
         self.assertEqual(machine.stop_times[0], 100)
         self.assertTrue(sol.is_feasible, 'Solution should be feasible')
         plt = sol.gantt('tab20')
-        plt.savefig(TEST_FOLDER + os.path.sep +  'temp.png')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            plt.savefig(os.path.join(tmp_dir, 'temp.png'))
+
+    def test_available_operations(self):
+        sol = Solution(self.inst1)
+        sol.check_available_operations = True
+        op00, op01, op12 = self.inst1.operation(0, 0), self.inst1.operation(0, 1), self.inst1.operation(1, 2)
+        self.assertEqual(sol.available_operations, [op00, op12])
+        self.assertFalse(sol.is_available(op01), 'op01 waits for op00')
+
+        machine = self.inst1.get_machine(0)
+        sol.schedule(op00, machine)
+        self.assertEqual(sol.available_operations, [op01, op12])
+        sol.schedule(op01, machine)
+        self.assertEqual(sol.available_operations, [op12], 'job 0 is planned')
+
+        sol.unschedule(op01)
+        self.assertFalse(op01.assigned, 'operation should not be assigned anymore')
+        self.assertTrue(sol.is_available(op01), 'operation should be available again')
+        self.assertEqual(machine.scheduled_operations, [op00])
+        self.assertRaises(AssertionError, sol.unschedule, op12)
+        sol.unschedule(op00)
+        self.assertEqual(machine.start_times, [], 'machine without operation should not be started')
+        self.assertEqual(sorted(sol.available_operations, key=lambda op: op.operation_id), [op00, op12])
+
+    def test_schedule_insertion(self):
+        sol = Solution(self.inst1)
+        machine0 = self.inst1.get_machine(0)
+        machine2 = self.inst1.get_machine(2)
+        sol.schedule(self.inst1.operation(0, 0), machine0)   # de 15 à 25
+        sol.schedule(self.inst1.operation(1, 2), machine2)   # de 12 à 18
+        sol.schedule(self.inst1.operation(0, 1), machine2)   # attend op00 : de 25 à 29
+        # Trou de 18 à 25 sur la machine 2, op13 y tient (durée 7)
+        operation = self.inst1.operation(1, 3)
+        self.assertEqual(sol.earliest_start(operation, machine2), 29, 'wrong start time at the end of the planning')
+        self.assertEqual(sol.earliest_start(operation, machine2, insertion=True), 18, 'wrong start time in the gap')
+        sol.schedule(operation, machine2, insertion=True)
+        self.assertEqual(operation.start_time, 18, 'operation should fill the gap')
+        self.assertEqual(operation.end_time, 25, 'wrong operation end time')
+        self.assertEqual(machine2.scheduled_operations,
+                         [self.inst1.operation(1, 2), operation, self.inst1.operation(0, 1)],
+                         'operations should be ordered by start time')
+        self.assertEqual(machine2.start_times, [0])
+        self.assertEqual(machine2.stop_times, [130])
+        self.assertTrue(sol.is_feasible, 'Solution should be feasible')
+        self.assertEqual(sol.cmax, 29, 'wrong makespan')
 
     def test_evaluate(self):
         '''
@@ -166,6 +215,187 @@ class TestSolution(unittest.TestCase):
 
         self.assertEqual(objective_value, 33, "La valeur de l'objectif (énergie) est incorrecte")
 
+    def test_delta(self):
+        # Greedy : M0 = [op00], M2 = [op12 (12-18), op13 (18-25), op01 (25-29)]
+        sol = Greedy().run(self.inst1)
+        self.assertEqual((sol.cmax, sol.sum_ci, sol.total_energy_consumption), (29, 54, 207))
+
+        # Échanger op13 et op01 : op01 garde 25-29, op13 passe à 29-36
+        move = Swap(2, 1)
+        self.assertEqual(sol.delta(move), (7, 11, 0, 18), 'wrong delta for the swap')
+        self.assertEqual(sol.cmax, 29, 'delta should not modify the solution')
+        sol.apply(move)
+        self.assertEqual((sol.cmax, sol.sum_ci, sol.total_energy_consumption), (36, 65, 207))
+        self.assertEqual(self.inst1.operation(1, 3).start_time, 29, 'wrong start time after the move')
+
+        # op13 avant son prédécesseur op12 : le mouvement crée un cycle
+        move = Reassign(self.inst1.operation(1, 3), 2, 0)
+        self.assertIsNone(sol.delta(move), 'move creating a cycle should be rejected')
+        self.assertRaises(ValueError, sol.apply, move)
+
+        move = Reassign(self.inst1.operation(1, 3), 1, 0)
+        delta = sol.delta(move)
+        before = (sol.cmax, sol.sum_ci, sol.total_energy_consumption, sol.objective)
+        sol.apply(move)
+        after = (sol.cmax, sol.sum_ci, sol.total_energy_consumption, sol.objective)
+        self.assertEqual(delta, tuple(a - b for a, b in zip(after, before)), 'delta should match the applied move')
+        self.assertEqual(self.inst1.operation(1, 3).assigned_to, 1, 'operation should be reassigned')
+
+    def test_clone_restore(self):
+        sol = Greedy().run(self.inst1)
+        op13 = self.inst1.operation(1, 3)
+        values = (sol.cmax, sol.sum_ci, sol.total_energy_consumption)
+        snapshot = sol.snapshot()
+
+        clone = sol.clone()
+        self.assertTrue(sol.is_active, 'cloning should not restore the schedule')
+        self.assertFalse(clone.is_active, 'clone should only hold a snapshot')
+        self.assertEqual((clone.cmax, clone.sum_ci, clone.total_energy_consumption), values)
+
+        # Modifier le clone sauvegarde le planning de la solution
+        clone.apply(Swap(2, 1))
+        self.assertTrue(clone.is_active, 'modified clone should be active')
+        self.assertFalse(sol.is_active, 'solution should be stored in a snapshot')
+        self.assertEqual(op13.start_time, 29, 'operations should hold the schedule of the clone')
+        self.assertEqual(clone.cmax, 36)
+        self.assertEqual((sol.cmax, sol.sum_ci, sol.total_energy_consumption), values,
+                         'solution should not be modified by its clone')
+        # Seule la machine modifiée est copiée : les autres planifications sont partagées
+        self.assertIs(clone.snapshot().machines[0], snapshot.machines[0])
+        self.assertIsNot(clone.snapshot().machines[2], snapshot.machines[2])
+
+        self.assertEqual(sol.available_operations, [], 'solution is complete')
+        self.assertTrue(sol.is_active)
+        self.assertEqual(op13.start_time, 18, 'schedule of the solution should be restored')
+        self.assertEqual(self.inst1.get_machine(2).stop_times, [130])
+        self.assertTrue(sol.is_feasible)
+
+        sol.restore(clone.snapshot())
+        self.assertEqual(op13.start_time, 29)
+        sol.restore(snapshot)
+        self.assertEqual((sol.cmax, sol.sum_ci, sol.total_energy_consumption), values)
+        self.assertEqual(snapshot.assignment[op13], (2, 18))
+
+    def test_load(self):
+        sol = Greedy().run(self.inst1)
+        assignment, cycles = sol.assignment, sol.cycles
+        self.assertEqual(assignment[(1, 3)], (2, 18))
+        self.assertEqual(cycles[2], ([0], [130]))
+        values = (sol.cmax, sol.sum_ci, sol.total_energy_consumption)
+
+        # Le planning est rechargé dans une autre copie de l'instance
+        inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+        other = Solution(inst)
+        other.load(assignment, cycles)
+        self.assertEqual((other.cmax, other.sum_ci, other.total_energy_consumption), values)
+        self.assertEqual(other.available_operations, [], 'solution is complete')
+        self.assertTrue(other.is_feasible)
+
+    def test_csv(self):
+        sol = Greedy().run(self.inst1)
+        assignment, cycles = sol.assignment, sol.cycles
+        sol.to_csv(TEST_FOLDER, 'temp_op.csv', 'temp_mach.csv')
+        with open(TEST_FOLDER + os.path.sep + 'temp_op.csv') as f:
+            self.assertEqual(f.readline().strip(), "operation_id,machine_id,start_time")
+            self.assertIn("3,2,18", f.read().split())
+
+        inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+        other = Solution(inst)
+        other.from_csv(TEST_FOLDER, 'temp_op.csv', 'temp_mach.csv')
+        self.assertEqual(other.assignment, assignment)
+        self.assertEqual(other.cycles, cycles)
+        self.assertEqual(other.objective, sol.objective)
+
+        # En-tête inattendu ou opération inconnue : erreur explicite
+        with open(TEST_FOLDER + os.path.sep + 'temp_op.csv', 'w') as f:
+            f.write("job_id,operation_id,machine_id,start_time\n1,3,2,18\n")
+        with self.assertRaisesRegex(ValueError, 'operation_id,machine_id,start_time'):
+            other.from_csv(TEST_FOLDER, 'temp_op.csv', 'temp_mach.csv')
+        with open(TEST_FOLDER + os.path.sep + 'temp_op.csv', 'w') as f:
+            f.write("operation_id,machine_id,start_time\n7,2,18\n")
+        with self.assertRaisesRegex(ValueError, 'inconnue'):
+            other.from_csv(TEST_FOLDER, 'temp_op.csv', 'temp_mach.csv')
+        self.assertEqual(inst.folderpath, TEST_FOLDER_DATA + os.path.sep + "jsp1")
+        os.remove(TEST_FOLDER + os.path.sep + 'temp_op.csv')
+        os.remove(TEST_FOLDER + os.path.sep + 'temp_mach.csv')
+
+    def test_binary(self):
+        sol = Greedy().run(self.inst1)
+        sol.to_csv(TEST_FOLDER, 'temp_op.csv', 'temp_mach.csv')
+        sol.to_binary(TEST_FOLDER + os.path.sep + 'temp.bin')
+
+        # Le fichier binaire redonne les mêmes fichiers csv
+        inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+        other = Solution(inst)
+        other.from_binary(TEST_FOLDER + os.path.sep + 'temp.bin')
+        self.assertEqual(other.objective, sol.objective)
+        other.to_csv(TEST_FOLDER, 'temp_op2.csv', 'temp_mach2.csv')
+        for first, second in [('temp_op.csv', 'temp_op2.csv'), ('temp_mach.csv', 'temp_mach2.csv')]:
+            with open(TEST_FOLDER + os.path.sep + first) as f1, open(TEST_FOLDER + os.path.sep + second) as f2:
+                self.assertEqual(f1.read(), f2.read())
+        for filename in ['temp_op.csv', 'temp_mach.csv', 'temp_op2.csv', 'temp_mach2.csv', 'temp.bin']:
+            os.remove(TEST_FOLDER + os.path.sep + filename)
+
+    def test_penalty(self):
+        sol = Greedy().run(self.inst1)
+        self.assertEqual(sol.penalty, 0)
+        self.assertEqual(sol.evaluate, sol.objective)
+        # op01 commence sur M2 avant la fin de op00 (3) et de op13 (3), M0 s'arrête 20 après sa date de fin
+        assignment, cycles = sol.assignment, sol.cycles
+        assignment[(0, 1)] = (2, 22)
+        cycles[0] = ([0], [120])
+        sol.load(assignment, cycles)
+        self.assertEqual(sol.penalty, 26)
+        self.assertEqual(sol.penalties, ({0: 20, 1: 0, 2: 3, 3: 0}, {0: 3, 1: 0}))
+        self.assertEqual(sol.evaluate, sol.objective + Solution.INFEASIBILITY_PENALTY)
+
+        self.assertEqual(sol.value, sol.objective)
+        sol.configure({'penalty_weight': 10})
+        self.assertEqual(sol.value, sol.objective + 260)
+        self.assertEqual(sol.evaluate, sol.objective + 260 + Solution.INFEASIBILITY_PENALTY)
+        self.assertEqual(Solution(self.inst1).penalty_weight, 0, 'the weight should be set per solution')
+        # Les totaux mis à jour par apply sont ceux d'une vérification complète
+        for neighborhood in [MyNeighborhood1(self.inst1), MyNeighborhood2(self.inst1)]:
+            for move in neighborhood.moves(sol):
+                other = sol.clone()
+                self.assertEqual(other.penalty_weight, 10)
+                delta = other.delta(move)
+                if delta is None:
+                    continue
+                value = other.value
+                other.apply(move)
+                self.assertEqual(other.penalty, sum(violation.magnitude for violation in other.violations))
+                self.assertEqual(other.value - value, delta[3], f'wrong delta for {move}')
+
+    def test_plan_cycles(self):
+        # M0 reste allumée de 25 à sa date de fin 100 : arrêt à 40 après le tear down (60 à vide en moins)
+        # M2 reste allumée de 29 à 130 : arrêt à 41 (89 à vide en moins)
+        sol = Greedy().run(self.inst1)
+        self.assertEqual(sol.plan_cycles(), 60 * 1 + 89 * 1)
+        self.assertEqual(sol.cycles, {0: ([0], [40]), 1: ([], []), 2: ([0], [41]), 3: ([], [])})
+        self.assertTrue(sol.is_feasible)
+        self.assertEqual(sol.plan_cycles(), 0, 'planning twice should not save more energy')
+
+        sol.configure({'plan_cycles': True})
+        self.assertTrue(sol.plans_cycles)
+        for neighborhood in [MyNeighborhood1(self.inst1), MyNeighborhood2(self.inst1)]:
+            for move in neighborhood.moves(sol):
+                other = sol.clone()
+                delta = other.delta(move)
+                if delta is None:
+                    continue
+                before = (other.cmax, other.sum_ci, other.total_energy_consumption, other.value)
+                other.apply(move)
+                after = (other.cmax, other.sum_ci, other.total_energy_consumption, other.value)
+                self.assertEqual(delta, tuple(a - b for a, b in zip(after, before)), f'wrong delta for {move}')
+                self.assertEqual(other.plan_cycles(), 0, 'apply should plan the cycles of the machines')
+
+        # Le paramètre planifie aussi le planning courant
+        sol = Greedy().run(self.inst1)
+        sol.configure({'plan_cycles': True})
+        self.assertEqual(sol.cycles, {0: ([0], [40]), 1: ([], []), 2: ([0], [41]), 3: ([], [])})
+        self.assertFalse(Solution(self.inst1).plans_cycles)
+
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
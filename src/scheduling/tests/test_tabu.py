@@ -0,0 +1,46 @@
+'''
+Tests for the tabu search.
+
+@author: Vassilissa Lehoux
+'''
+import unittest
+import os
+
+from src.scheduling.instance.instance import Instance
+from src.scheduling.optim.constructive import NonDeterminist
+from src.scheduling.optim.local_search import BestNeighborLocalSearch
+from src.scheduling.optim.neighborhoods import MyNeighborhood1, MyNeighborhood2
+from src.scheduling.optim.tabu import TabuList, TabuSearch
+from src.scheduling.tests.test_utils import TEST_FOLDER_DATA
+
+
+class TestTabu(unittest.TestCase):
+
+    def setUp(self):
+        self.inst = Instance.from_file(TEST_FOLDER_DATA + os.path.sep + "jsp1")
+
+    def test_tabu_list(self):
+        tabu = TabuList(2)
+        tabu.add('a')
+        tabu.add('b')
+        self.assertIn('a', tabu)
+        tabu.add('a')
+        self.assertIn('a', tabu, 'a is still in the list')
+        tabu.add('c')
+        self.assertNotIn('b', tabu, 'b should have left the list')
+        self.assertEqual(len(tabu), 2)
+
+    def test_tabu_search(self):
+        neighborhoods = [MyNeighborhood1, MyNeighborhood2]
+        params = {'seed': 3, 'max_iterations': 50}
+        values = []
+        sol = TabuSearch().run(self.inst, NonDeterminist, neighborhoods,
+                               {**params, 'callback': lambda step, s: values.append(s.objective)})
+        self.assertEqual(sol.objective, min(values), 'the best solution should be returned')
+        self.assertTrue(sol.is_feasible)
+        descent = BestNeighborLocalSearch().run(self.inst, NonDeterminist, neighborhoods, params)
+        self.assertLessEqual(sol.objective, descent.objective, 'tabu search should not be worse than the descent')
+
+
+if __name__ == "__main__":
+    unittest.main()